@@ -0,0 +1,76 @@
+"""
+Commit-helper context benchmark on a synthetic large diff: a lockfile
+rewrite, a minified bundle, a binary and many source/test hunks. Compares the
+previous prompt (the whole raw diff) with diff_utils.build_context() packing
+into a token budget, and times the preprocessing itself.
+
+Usage:
+    python benchmarks/bench_diff_context.py [--files 200] [--hunks 8] [--budget 3000] [--runs 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jarvis.utils import diff_utils  # noqa: E402
+
+
+def file_header(path, new=False):
+    lines = [f"diff --git a/{path} b/{path}"]
+    if new:
+        lines.append("new file mode 100644")
+    lines.append("index 1111111..2222222 100644")
+    lines.append("--- /dev/null" if new else f"--- a/{path}")
+    lines.append(f"+++ b/{path}")
+    return lines
+
+
+def make_diff(files, hunks):
+    out = file_header("package-lock.json")
+    out.append("@@ -1,4000 +1,4000 @@")
+    for i in range(4000):
+        out.append(f'-    "dep{i}": {{"version": "1.0.{i}", "integrity": "sha512-{"a" * 64}"}},')
+        out.append(f'+    "dep{i}": {{"version": "1.1.{i}", "integrity": "sha512-{"b" * 64}"}},')
+    out += file_header("static/app.min.js", new=True) + ["@@ -0,0 +1 @@", "+" + "var a=1;" * 20000]
+    out += ["diff --git a/docs/logo.png b/docs/logo.png", "Binary files a/docs/logo.png and b/docs/logo.png differ"]
+    for f in range(files):
+        path = f"tests/test_mod{f}.py" if f % 4 == 0 else f"pkg/mod{f}.py"
+        out += file_header(path)
+        for h in range(hunks):
+            start = 1 + h * 40
+            out.append(f"@@ -{start},8 +{start},9 @@ class Mod{f}:")
+            out += [f"     line {k} of context" for k in range(3)]
+            if h % 3 == 0:
+                out.append(f"+    def handler_{h}(self, request):")
+            out.append(f"-        return self.old_value_{h}")
+            out.append(f"+        return self.new_value_{h} + {f}")
+            out += [f"     line {k} of context" for k in range(3, 6)]
+    return "\n".join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200, help="source/test files in the diff")
+    parser.add_argument("--hunks", type=int, default=8, help="hunks per source file")
+    parser.add_argument("--budget", type=int, default=diff_utils.TOKEN_BUDGET)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    diff = make_diff(args.files, args.hunks)
+    best = float("inf")
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        context = diff_utils.build_context(diff, budget=args.budget)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"Synthetic diff: {len(diff) / 1024:.0f} KB, {context.files} files, {context.hunks_total} source hunks")
+    print(f"{'previous (raw diff)':<22} ~{diff_utils.estimate_tokens(diff):>9,} tokens")
+    print(f"{'packed context':<22} ~{context.tokens:>9,} tokens   budget {args.budget:,}   "
+          f"{context.hunks_sent} hunks sent, {context.summarized} files summarized")
+    print(f"{'preprocessing':<22} {best * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Loopback throughput benchmark: legacy single-socket protocol vs. the v3
+multi-stream protocol used by `file-transfer` network mode.
+
+Usage:
+    python benchmarks/bench_lan_transfer.py [--size-mb 512] [--streams 1 2 4 8] [--runs 3]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jarvis.utils import lan_utils  # noqa: E402
+
+
+def _digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def run_once(source, dest_dir, send):
+    receiver = lan_utils.Receiver(dest_dir, port=0, host="127.0.0.1")
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("path", receiver.serve_one()))
+    thread.start()
+    start = time.perf_counter()
+    try:
+        send("127.0.0.1", receiver.port)
+        thread.join()
+    finally:
+        receiver.close()
+    return time.perf_counter() - start, result["path"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--runs", type=int, default=3, help="Runs per case (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "payload.bin")
+        with open(source, "wb") as f:
+            # First byte is not a digit: the legacy header has no terminator
+            f.write(b"\0")
+            remaining = args.size_mb * 1024 * 1024 - 1
+            while remaining > 0:
+                block = os.urandom(min(remaining, 1 << 20))
+                f.write(block)
+                remaining -= len(block)
+        expected = _digest(source)
+        size = os.path.getsize(source)
+
+        cases = [("legacy (1 socket, 4 KiB)", lambda ip, port: lan_utils.send_legacy(source, ip, port))]
+        for n in args.streams:
+            cases.append((f"v3 ({n} stream{'s' if n > 1 else ''}, sendfile)",
+                          lambda ip, port, n=n: lan_utils.send(source, ip, port, streams=n)))
+
+        print(f"Payload: {size / 2**20:.0f} MiB over loopback, best of {args.runs}")
+        baseline = None
+        for case_no, (label, send) in enumerate(cases):
+            best = None
+            for i in range(args.runs):
+                dest = os.path.join(tmp, f"out-{case_no}-{i}")
+                os.makedirs(dest)
+                elapsed, path = run_once(source, dest, send)
+                if _digest(path) != expected:
+                    raise SystemExit(f"{label}: checksum mismatch")
+                os.remove(path)
+                best = elapsed if best is None else min(best, elapsed)
+            rate = size / best / 2**20
+            baseline = baseline or rate
+            print(f"{label:<32} {best:7.3f} s  {rate:9.1f} MiB/s  x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Local copy benchmark: shutil.copytree vs. the incremental, parallel
+`file-transfer` local mode, cold (empty destination) and warm (nothing changed),
+then one large file: shutil.copy2 vs. local_transfer cold.
+
+Usage:
+    python benchmarks/bench_local_copy.py [--files 20000] [--file-size 4096] [--large-mb 512] [--workers 8] [--runs 3]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jarvis.utils import file_utils, journal_utils  # noqa: E402
+
+
+def make_tree(root, files, file_size, per_dir=500):
+    payload = os.urandom(file_size)
+    for i in range(files):
+        d = os.path.join(root, f"d{i // per_dir:04d}")
+        if i % per_dir == 0:
+            os.makedirs(d)
+        with open(os.path.join(d, f"f{i:06d}.bin"), "wb") as f:
+            f.write(payload)
+
+
+def best_of(runs, setup, func):
+    best = None
+    for _ in range(runs):
+        setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--file-size", type=int, default=4096)
+    parser.add_argument("--large-mb", type=int, default=512, help="Size of the large-file case (0 to skip)")
+    parser.add_argument("--workers", type=int, default=file_utils.LOCAL_WORKERS)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per case (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_utils.JOURNAL_DIR = Path(tmp) / "journals"  # keep ~/.jarvis untouched
+        src, dst = os.path.join(tmp, "src"), os.path.join(tmp, "dst")
+        make_tree(src, args.files, args.file_size)
+        total_mb = args.files * args.file_size / 1e6
+
+        def clean():
+            shutil.rmtree(dst, ignore_errors=True)
+            shutil.rmtree(journal_utils.JOURNAL_DIR, ignore_errors=True)
+
+        def transfer():
+            file_utils.local_transfer(src, dst, workers=args.workers)
+
+        cases = [
+            ("copytree (serial)", clean, lambda: shutil.copytree(src, dst, dirs_exist_ok=True)),
+            (f"local_transfer cold ({args.workers} workers)", clean, transfer),
+            ("local_transfer warm (no changes)", lambda: None, transfer),
+            ("copytree again (no changes)", lambda: None, lambda: shutil.copytree(src, dst, dirs_exist_ok=True)),
+        ]
+        print(f"Tree: {args.files} files x {args.file_size} B, best of {args.runs}")
+        for label, setup, func in cases:
+            elapsed = best_of(args.runs, setup, func)
+            print(f"{label:<40} {elapsed:7.3f} s  {args.files / elapsed:10,.0f} files/s  "
+                  f"{total_mb / elapsed:8.1f} MB/s")
+
+        if args.large_mb:
+            big, big_dst = os.path.join(tmp, "large.bin"), os.path.join(tmp, "large-copy", "large.bin")
+            with open(big, "wb") as f:
+                chunk = os.urandom(8 * 1024 * 1024)
+                for _ in range(args.large_mb // 8 or 1):
+                    f.write(chunk)
+            large_mb = os.path.getsize(big) / 1e6
+
+            def clean_large():
+                shutil.rmtree(os.path.dirname(big_dst), ignore_errors=True)
+                shutil.rmtree(journal_utils.JOURNAL_DIR, ignore_errors=True)
+                os.makedirs(os.path.dirname(big_dst))
+
+            large_cases = [
+                ("copy2", clean_large, lambda: shutil.copy2(big, big_dst)),
+                ("local_transfer cold", clean_large, lambda: file_utils.local_transfer(big, big_dst)),
+            ]
+            print(f"Large file: {large_mb:,.0f} MB, best of {args.runs}")
+            for label, setup, func in large_cases:
+                elapsed = best_of(args.runs, setup, func)
+                print(f"{label:<40} {elapsed:7.3f} s  {large_mb / elapsed:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
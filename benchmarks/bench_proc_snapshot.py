@@ -0,0 +1,163 @@
+"""
+Process-table benchmark on a synthetic /proc with thousands of processes, so
+it runs anywhere (Linux only: psutil is pointed at the fake tree through
+psutil.PROCFS_PATH). Compares the previous lookups, which rebuild their view
+through psutil on every query, with a snapshot_utils snapshot queried through
+its indexes.
+
+Usage:
+    python benchmarks/bench_proc_snapshot.py [--procs 10000] [--sockets 4] [--runs 3]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jarvis.utils import snapshot_utils  # noqa: E402
+
+NAMES = ["python3", "gunicorn", "celery", "postgres", "nginx", "node", "java", "bash", "sshd", "redis-server"]
+TCP_HEADER = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+
+
+def make_proc(root, procs, sockets):
+    """A /proc tree psutil can read: stat, status, cmdline, fd/ socket links, net/tcp"""
+    with open(os.path.join(root, "stat"), "w") as f:
+        f.write("cpu  1 1 1 1 1 1 1 1 1 1\nbtime 1700000000\n")
+    os.makedirs(os.path.join(root, "net"))
+    tcp_lines = [TCP_HEADER]
+    inode = 100000
+    uid = os.getuid()
+    for i in range(procs):
+        pid = 1000 + i
+        name = NAMES[i % len(NAMES)]
+        ppid = 1000 + (i - 1) // 10 if i else 1  # a 10-ary tree under pid 1000
+        d = os.path.join(root, str(pid))
+        os.makedirs(os.path.join(d, "fd"))
+        with open(os.path.join(d, "stat"), "w") as f:
+            f.write(f"{pid} ({name}) S {ppid} {pid} {pid} 0 -1 4194560 1 0 0 0 5 3 0 0 20 0 1 0 "
+                    f"{100 + i} 10000000 500 18446744073709551615 0 0 0 0 0 0 0 0 0 0 0 0 17 0 0 0 0 0 0\n")
+        with open(os.path.join(d, "status"), "w") as f:
+            f.write(f"Name:\t{name}\nState:\tS (sleeping)\nPPid:\t{ppid}\n"
+                    f"Uid:\t{uid}\t{uid}\t{uid}\t{uid}\nGid:\t0\t0\t0\t0\n")
+        with open(os.path.join(d, "cmdline"), "w") as f:
+            f.write(f"/usr/bin/{name}\0--worker\0{i}\0")
+        for fd in range(sockets):
+            inode += 1
+            os.symlink(f"socket:[{inode}]", os.path.join(d, "fd", str(fd + 3)))
+            port = 10000 + (inode % 50000)
+            state = "0A" if fd == 0 else "01"
+            tcp_lines.append(f"   0: 0100007F:{port:04X} 00000000:0000 {state} 00000000:00000000 00:00000000 "
+                             f"00000000  {uid}        0 {inode} 1 0000000000000000 100 0 0 10 0\n")
+    with open(os.path.join(root, "net", "tcp"), "w") as f:
+        f.writelines(tcp_lines)
+    for proto in ("tcp6", "udp", "udp6"):
+        with open(os.path.join(root, "net", proto), "w") as f:
+            f.write(TCP_HEADER)
+    return [10000 + ((100000 + k) % 50000) for k in range(1, procs * sockets, max(1, procs * sockets // 20))]
+
+
+# ----------------- previous implementations ----------------- #
+
+def legacy_search_by_name(name):
+    results = []
+    for proc in psutil.process_iter(attrs=["pid", "name", "username", "status"]):
+        try:
+            if name and name.lower() in proc.info["name"].lower():
+                results.append(proc.info)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return results
+
+
+def legacy_search_by_port(port):
+    matches = []
+    for conn in psutil.net_connections(kind="inet"):
+        if conn.laddr and conn.laddr.port == port and conn.pid is not None:
+            try:
+                proc = psutil.Process(conn.pid)
+                matches.append({"pid": conn.pid, "name": proc.name(), "user": proc.username(),
+                                "status": proc.status()})
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+    return matches
+
+
+def legacy_tree(pid):
+    return [pid] + [c.pid for c in psutil.Process(pid).children(recursive=True)]
+
+
+# ----------------- snapshot implementations ----------------- #
+
+def snapshot_search_by_name(root, name):
+    table = snapshot_utils.take(proc_root=root)
+    needle = name.lower()
+    return [table.info(r) for n, rows in table.by_name.items() if needle in n.lower() for r in rows]
+
+
+def snapshot_search_by_ports(root, ports):
+    table = snapshot_utils.take(sockets=True, proc_root=root, ports=ports)
+    return {port: [table.info(r) for r in rows if r is not None]
+            for port, rows in table.rows_for_ports(ports).items()}
+
+
+def snapshot_tree(root, pid):
+    table = snapshot_utils.take(proc_root=root)
+    return [table.pids[r] for r in table.descendants([table.row_of[pid]])]
+
+
+def timed(func, runs):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", type=int, default=10000)
+    parser.add_argument("--sockets", type=int, default=4, help="sockets per process")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    if not sys.platform.startswith("linux"):
+        sys.exit("needs Linux (psutil reads the synthetic tree through PROCFS_PATH)")
+
+    with tempfile.TemporaryDirectory() as root:
+        ports = make_proc(root, args.procs, args.sockets)
+        psutil.PROCFS_PATH = root
+        print(f"Synthetic /proc: {args.procs} processes, {args.procs * args.sockets} sockets")
+
+        def row(label, legacy, snapshot, check=None):
+            t_old, r_old = timed(legacy, args.runs)
+            t_new, r_new = timed(snapshot, args.runs)
+            if check:
+                assert check(r_old) == check(r_new), label
+            print(f"{label:<34} previous {t_old * 1000:9.1f} ms   snapshot {t_new * 1000:9.1f} ms   "
+                  f"x{t_old / t_new:6.1f}")
+
+        row("search by name 'celery'", lambda: legacy_search_by_name("celery"),
+            lambda: snapshot_search_by_name(root, "celery"), check=lambda r: sorted(p["pid"] for p in r))
+        row("1 port", lambda: legacy_search_by_port(ports[0]),
+            lambda: snapshot_search_by_ports(root, [ports[0]])[ports[0]], check=lambda r: sorted(p["pid"] for p in r))
+        row(f"{len(ports)} ports", lambda: {p: legacy_search_by_port(p) for p in ports},
+            lambda: snapshot_search_by_ports(root, ports),
+            check=lambda r: {p: sorted(x["pid"] for x in v) for p, v in r.items()})
+        row("process tree of pid 1000", lambda: legacy_tree(1000), lambda: snapshot_tree(root, 1000),
+            check=sorted)
+
+        table = snapshot_utils.take(sockets=True, proc_root=root)
+        pattern = re.compile("^(celery|gunicorn)$")
+        t, _ = timed(lambda: table.match_names(pattern), args.runs)
+        print(f"{'regex query on a taken snapshot':<34} {t * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+SFTP upload benchmark against an in-process paramiko SFTP server on loopback,
+so it runs offline. Compares the previous remote_transfer behaviour (new SSH
+session + sftp.put per file) with sftp_utils.upload (one cached session,
+concurrent pipelined channels with a large window).
+
+Usage:
+    python benchmarks/bench_sftp_upload.py [--files 200] [--file-size 65536] [--big-mb 64] [--channels 1 4]
+"""
+import argparse
+import logging
+import os
+import posixpath
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import paramiko
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jarvis.utils import sftp_utils  # noqa: E402
+
+USER, PASSWORD = "bench", "bench"
+
+
+# ----------------- in-process SFTP server ----------------- #
+
+class _Server(paramiko.ServerInterface):
+    def check_auth_password(self, username, password):
+        if (username, password) == (USER, PASSWORD):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+
+class _Handle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def chattr(self, attr):
+        paramiko.SFTPServer.set_file_attr(self.filename, attr)
+        return paramiko.SFTP_OK
+
+
+class _SFTP(paramiko.SFTPServerInterface):
+    root = None
+
+    def _local(self, path):
+        return os.path.join(self.root, self.canonicalize(path).lstrip("/"))
+
+    def canonicalize(self, path):
+        return posixpath.normpath("/" + path)
+
+    def _call(self, func, *args):
+        try:
+            func(*args)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def list_folder(self, path):
+        local = self._local(path)
+        try:
+            return [paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(local, n)), n) for n in os.listdir(local)]
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def open(self, path, flags, attr):
+        local = self._local(path)
+        try:
+            fd = os.open(local, flags | getattr(os, "O_BINARY", 0), 0o644)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        f = os.fdopen(fd, mode)
+        handle = _Handle(flags)
+        handle.filename = local
+        handle.readfile = handle.writefile = f
+        return handle
+
+    def remove(self, path):
+        return self._call(os.remove, self._local(path))
+
+    def rename(self, old, new):
+        return self._call(os.rename, self._local(old), self._local(new))
+
+    def posix_rename(self, old, new):
+        return self._call(os.replace, self._local(old), self._local(new))
+
+    def mkdir(self, path, attr):
+        return self._call(os.mkdir, self._local(path))
+
+    def rmdir(self, path):
+        return self._call(os.rmdir, self._local(path))
+
+    def chattr(self, path, attr):
+        return self._call(paramiko.SFTPServer.set_file_attr, self._local(path), attr)
+
+
+def start_server(root):
+    """Serve SFTP for root on 127.0.0.1; returns the port"""
+    _SFTP.root = root
+    host_key = paramiko.RSAKey.generate(2048)
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+
+    def serve():
+        while True:
+            conn, _ = listener.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(host_key)
+            transport.use_compression(True)  # like OpenSSH, accept zlib when the client asks
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _SFTP)
+            transport.start_server(server=_Server())
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+# ----------------- cases ----------------- #
+
+def legacy_upload(port, files, destination):
+    """What remote_transfer did before: one SSH session and sftp.put per file"""
+    for path in files:
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh.connect("127.0.0.1", port=port, username=USER, password=PASSWORD,
+                    allow_agent=False, look_for_keys=False)
+        sftp = ssh.open_sftp()
+        sftp.put(path, posixpath.join(destination, os.path.basename(path)))
+        sftp.close()
+        ssh.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--file-size", type=int, default=64 * 1024)
+    parser.add_argument("--big-mb", type=int, default=64)
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)  # client disconnects are not errors here
+
+    with tempfile.TemporaryDirectory() as tmp:
+        remote_root = os.path.join(tmp, "remote")
+        os.makedirs(remote_root)
+        port = start_server(remote_root)
+
+        tree = os.path.join(tmp, "tree")
+        os.makedirs(tree)
+        for i in range(args.files):
+            with open(os.path.join(tree, f"f{i:05d}.bin"), "wb") as f:
+                f.write(os.urandom(args.file_size))
+        big = os.path.join(tmp, "big.bin")
+        with open(big, "wb") as f:
+            for _ in range(args.big_mb):
+                f.write(os.urandom(1 << 20))
+
+        def session():
+            sftp_utils.close_sessions()
+            return sftp_utils.get_session("127.0.0.1", USER, PASSWORD, port=port)
+
+        def run(label, nbytes, func):
+            shutil.rmtree(remote_root)
+            os.makedirs(remote_root)
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<44} {elapsed:7.2f} s  {nbytes / elapsed / 2**20:7.1f} MiB/s")
+
+        tree_files = sorted(os.path.join(tree, n) for n in os.listdir(tree))
+        tree_bytes = args.files * args.file_size
+        print(f"Tree: {args.files} x {args.file_size // 1024} KiB")
+        run("per-file session + put (previous)", tree_bytes, lambda: legacy_upload(port, tree_files, "/"))
+        for n in args.channels:
+            run(f"cached session, {n} channel(s)", tree_bytes,
+                lambda n=n: sftp_utils.upload(session(), "127.0.0.1", tree, "/", channels=n))
+
+        print(f"Single file: {args.big_mb} MiB")
+        run("session + put (previous)", args.big_mb << 20, lambda: legacy_upload(port, [big], "/"))
+        run("cached session, tuned window", args.big_mb << 20,
+            lambda: sftp_utils.upload(session(), "127.0.0.1", big, "/"))
+        sftp_utils.close_sessions()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Startup import-budget benchmark for the jarvis CLI.
+
+Runs each scenario in a fresh interpreter under `python -X importtime` and
+checks that the total import time stays under a fixed budget and that none of
+the heavy optional dependencies are pulled in.
+
+Usage:
+    python benchmarks/bench_startup.py [--budget-ms 200] [--runs 5]
+
+Exits non-zero if any scenario is over budget.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "jarvis --help": ["--help"],
+    "jarvis git-manager list-branches": ["git-manager", "list-branches"],
+}
+
+# Modules that must never be imported for the scenarios above
+FORBIDDEN = ("paramiko", "smbprotocol", "psutil", "openai", "psycopg2", "pygments")
+
+
+def measure(argv, cwd):
+    """Return (total_import_us, set_of_imported_modules) for one CLI run"""
+    code = "import sys; from jarvis.cli import cli; cli(sys.argv[1:], prog_name='jarvis')"
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code, *argv],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+
+    total_us = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        modules.add(name.strip())
+        # Only top-level entries: their cumulative time already covers children
+        if not name.startswith("  ", 1):
+            total_us += int(cumulative)
+    return total_us, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=200.0, help="Max total import time per scenario")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per scenario (best is reported)")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as cwd:  # keep branches.db out of the repo
+        for label, argv in SCENARIOS.items():
+            results = [measure(argv, cwd) for _ in range(args.runs)]
+            best_us = min(r[0] for r in results)
+            loaded = set().union(*(r[1] for r in results))
+            heavy = sorted(m for m in loaded if m.split(".")[0] in FORBIDDEN)
+
+            ok = best_us / 1000 <= args.budget_ms and not heavy
+            failed |= not ok
+            status = "OK  " if ok else "FAIL"
+            print(f"{status} {label:<40} {best_us / 1000:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+            if heavy:
+                print(f"     heavy modules imported: {', '.join(heavy)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,66 @@
 import os
 import socket
+import importlib
 import click
 from rich.console import Console
 
-# Import command groups
-from jarvis.commands import (
-    git_manager,
-    port_checker,
-    process_killer,
-    system_monitor,
-    file_transfer,
-    commit_helper,
-    db_explorer,
-)
-
 console = Console()
 
 
-@click.group()
+# ----------------- LAZY COMMAND GROUPS ----------------- #
+# name -> (module path, attribute, short help). The short help is kept here so
+# `jarvis --help` can list every group without importing any of them.
+LAZY_COMMANDS = {
+    "git-manager": ("jarvis.commands.git_manager", "git_manager", "Manage your Git branches with metadata"),
+    "port-checker": ("jarvis.commands.port_checker", "port_checker", "Check port usage on your system"),
+    "process-killer": ("jarvis.commands.process_killer", "process_killer", "Search and kill processes (cross-platform)."),
+    "system-monitor": ("jarvis.commands.system_monitor", "system_monitor", "Monitor system resources in real-time"),
+    "file-transfer": ("jarvis.commands.file_transfer", "file_transfer", "Send and receive files across local machine, LAN, or remote"),
+    "commit-helper": ("jarvis.commands.commit_helper", "commit_helper", "AI-powered Commit Message Generator"),
+    "db-explorer": ("jarvis.commands.db_explorer", "db_explorer", "Explore SQLite and Postgres databases"),
+}
+
+
+class LazyGroup(click.Group):
+    """click.Group that imports a command module only when it is invoked"""
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_path, attr, _ = self.lazy_commands[cmd_name]
+            module = importlib.import_module(module_path)
+            self.add_command(getattr(module, attr), name=cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        """List commands using the registered short help, without importing modules"""
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                cmd = self.commands[name]
+                if cmd.hidden:
+                    continue
+                rows.append((name, cmd.get_short_help_str(formatter.width)))
+            else:
+                rows.append((name, self.lazy_commands[name][2]))
+
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
 def cli():
     """[bold cyan]Jarvis – Your Development Assistant[/bold cyan]"""
     pass
 
 
-# ----------------- REGISTER COMMAND GROUPS ----------------- #
-cli.add_command(git_manager.git_manager, name="git-manager")
-cli.add_command(port_checker.port_checker, name="port-checker")
-cli.add_command(process_killer.process_killer, name="process-killer")
-cli.add_command(system_monitor.system_monitor, name="system-monitor")
-cli.add_command(file_transfer.file_transfer, name="file-transfer")
-cli.add_command(commit_helper.commit_helper, name="commit-helper")
-cli.add_command(db_explorer.db_explorer, name="db-explorer")
-
-
 # ----------------- BASIC COMMANDS ----------------- #
 @cli.command()
 def hello():
@@ -100,15 +128,25 @@ def diagnostics(verbose):
     if verbose:
         console.print("\n[bold cyan]Running extended configuration checks...[/bold cyan]")
 
-        # File-transfer config checks
+        # File-transfer config checks (every saved profile; all endpoints probed at once)
         try:
-            from jarvis.utils import file_utils
+            from jarvis.utils import file_utils, probe_utils
 
-            ft_cfg = file_utils.load_config()
-            if not ft_cfg:
+            profiles = file_utils.list_profiles()
+            if not profiles:
                 console.print("[yellow]ℹ No file-transfer config saved. Skipping file-transfer checks.[/yellow]")
-            else:
-                console.print(f"[cyan]File-transfer config found (mode={ft_cfg.get('mode')}):[/cyan] { {k: ('********' if k=='password' else v) for k,v in ft_cfg.items()} }")
+
+            endpoints = {}
+            for name, ft_cfg in profiles.items():
+                ip = ft_cfg.get("ip")
+                if ip and ft_cfg.get("mode") == "network":
+                    endpoints[name] = (ip, 5001)
+                elif ip and ft_cfg.get("mode") == "remote":
+                    endpoints[name] = (ip, 445 if ft_cfg.get("protocol", "sftp").lower() == "smb" else 22)
+            reach = probe_utils.probe(endpoints.values(), timeout=2, use_cache=False) if endpoints else {}
+
+            for name, ft_cfg in profiles.items():
+                console.print(f"[cyan]File-transfer profile '{name}' (mode={ft_cfg.get('mode')}):[/cyan] { {k: ('********' if k=='password' else v) for k,v in ft_cfg.items()} }")
 
                 # basic validations per mode
                 if ft_cfg.get("mode") == "local":
@@ -127,21 +165,21 @@ def diagnostics(verbose):
 
                 elif ft_cfg.get("mode") == "network":
                     ip = ft_cfg.get("ip")
-                    try:
-                        s2 = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                        s2.settimeout(2)
-                        if ip and s2.connect_ex((ip, 5001)) == 0:
-                            console.print(f"[green]✔ File-transfer network: {ip}:5001 is reachable[/green]")
-                        else:
-                            console.print(f"[yellow]! File-transfer network: {ip}:5001 not reachable (will depend on receiver) [/yellow]")
-                        s2.close()
-                    except Exception as e:
-                        console.print(f"[red]✘ File-transfer network check failed: {e}[/red]")
+                    result = reach.get(endpoints.get(name))
+                    if result and result.state == "open":
+                        console.print(f"[green]✔ File-transfer network: {ip}:5001 is reachable ({result.latency * 1000:.1f} ms)[/green]")
+                    else:
+                        state = result.state if result else "no ip"
+                        console.print(f"[yellow]! File-transfer network: {ip}:5001 not reachable ({state}; will depend on receiver) [/yellow]")
 
                 elif ft_cfg.get("mode") == "remote":
                     ip = ft_cfg.get("ip")
                     proto = ft_cfg.get("protocol", "sftp")
-                    if proto.lower() == "sftp":
+                    result = reach.get(endpoints.get(name))
+                    if not result or result.state != "open":
+                        state = result.state if result else "no ip"
+                        console.print(f"[red]✘ File-transfer remote ({proto.upper()}): {ip}:{endpoints.get(name, ('', '?'))[1]} not reachable ({state})[/red]")
+                    elif proto.lower() == "sftp":
                         try:
                             import paramiko
 
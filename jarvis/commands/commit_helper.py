@@ -1,8 +1,8 @@
 import click
 from rich.console import Console
-from rich.syntax import Syntax
 from jarvis.utils import commit_utils
 import subprocess
+import time
 
 console = Console()
 
@@ -18,7 +18,11 @@ def commit_helper():
 @click.option("--scope", help="Optional commit scope (e.g., cli, db, api)")
 @click.option("--commit", is_flag=True, help="Run 'git commit -m <message>' automatically")
 @click.option("--show-diff", is_flag=True, help="Display the git diff being analyzed")
-def generate(all_changes, scope, commit, show_diff):
+@click.option("--show-context", is_flag=True, help="Display exactly what is sent to the AI model")
+@click.option("--max-tokens", type=click.IntRange(min=200), default=commit_utils.diff_utils.TOKEN_BUDGET,
+              show_default=True, help="Approximate token budget for the diff sent to the AI model")
+@click.option("--no-cache", is_flag=True, help="Always ask the AI model, ignoring cached messages")
+def generate(all_changes, scope, commit, show_diff, show_context, max_tokens, no_cache):
     """Generate a commit message using AI (with fallback if AI unavailable)"""
     diff = commit_utils.get_git_diff(all_changes)
 
@@ -28,14 +32,34 @@ def generate(all_changes, scope, commit, show_diff):
 
     # Optional: Show the diff before analysis
     if show_diff:
+        from rich.syntax import Syntax  # pulls in pygments; only needed here
+
         console.print("[bold magenta]Git Diff Being Analyzed:[/bold magenta]")
         syntax = Syntax(diff, "diff", theme="monokai", line_numbers=False)
         console.print(syntax)
 
+    context = None
+    if show_context:
+        context = commit_utils.diff_context(diff, max_tokens)
+        console.print("[bold magenta]Context Sent to AI:[/bold magenta]")
+        console.print(context.text, markup=False, highlight=False)
+        console.print(
+            f"[cyan]{context.files} file(s), {context.summarized} summarized; "
+            f"{context.hunks_sent}/{context.hunks_total} hunk(s) included; "
+            f"~{context.tokens} tokens (raw diff ~{context.raw_tokens})[/cyan]"
+        )
+
+    # Same diff/scope as an earlier run: reuse its message without calling the API
+    cached = None if no_cache else commit_utils.cached_commit_message(diff, scope, max_tokens)
+
     # Try AI first
-    message = commit_utils.ai_commit_message(diff, scope=scope)
+    message = cached or commit_utils.ai_commit_message(diff, scope=scope, context=context,
+                                                       token_budget=max_tokens, use_cache=not no_cache)
 
-    if not message:
+    if cached:
+        console.print(f"[bold cyan]Suggested Commit Message:[/bold cyan] {message} [dim](cached)[/dim]")
+
+    elif not message:
         console.print("[yellow]⚠ No API key found. Falling back to rule-based commit message[/yellow]")
         message = commit_utils.rule_based_commit(diff)
 
@@ -57,3 +81,32 @@ def generate(all_changes, scope, commit, show_diff):
             console.print(f"[green]✔ Commit created:[/green] {message}")
         except subprocess.CalledProcessError as e:
             console.print(f"[red]✘ Failed to commit: {e}[/red]")
+
+
+@commit_helper.group("cache")
+def cache():
+    """Inspect or clear cached AI commit messages"""
+    pass
+
+
+@cache.command("stats")
+def cache_stats():
+    """Show commit-message cache usage"""
+    stats = commit_utils.cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f" ({stats['hits'] / lookups:.0%} hit rate)" if lookups else ""
+    console.print(f"[cyan]Cache file:[/cyan] {stats['path']} ({stats['size']:,} bytes)")
+    console.print(f"[cyan]Entries:[/cyan] {stats['entries']} of {stats['max_entries']} "
+                  f"(+{stats['expired']} expired), kept for {stats['ttl'] / 86400:g} days")
+    console.print(f"[cyan]Lookups:[/cyan] {stats['hits']} hits, {stats['misses']} misses{hit_rate}")
+    if stats["oldest"] is not None:
+        fmt = "%Y-%m-%d %H:%M:%S"
+        console.print(f"[cyan]Oldest / newest:[/cyan] {time.strftime(fmt, time.localtime(stats['oldest']))} / "
+                      f"{time.strftime(fmt, time.localtime(stats['newest']))}")
+
+
+@cache.command("clear")
+def cache_clear():
+    """Delete all cached commit messages"""
+    count = commit_utils.clear_cache()
+    console.print(f"[green]✔ Cleared {count} cached commit message(s)[/green]")
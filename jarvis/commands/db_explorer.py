@@ -63,23 +63,52 @@ def tables():
 
 
 # ---------------- query ---------------- #
+PREVIEW_ROWS = 50  # on-screen cap when the row limit is lifted
+
+
 @db_explorer.command("query")
 @click.argument("sql", required=True)
-@click.option("--limit", type=int, default=50, help="Rows to fetch (SELECT)")
-@click.option("--export", type=click.Choice(["csv", "json"], case_sensitive=False), required=False)
+@click.option("--limit", type=int, default=50, help="Rows to fetch (SELECT); 0 = no limit")
+@click.option("--all", "fetch_all", is_flag=True, help="Fetch every row (same as --limit 0)")
+@click.option("--export", type=click.Choice(["csv", "json", "ndjson"], case_sensitive=False), required=False)
 @click.option("--out", help="Export file path (if --export used)")
 @click.option("--show-sql", is_flag=True, help="Show SQL before running")
-def query(sql, limit, export, out, show_sql):
+def query(sql, limit, fetch_all, export, out, show_sql):
     """Run SQL against the configured DB (provide a SELECT to return rows)"""
     try:
         if show_sql:
             console.print("[bold]SQL to run:[/bold]")
             console.print(Syntax(sql, "sql", line_numbers=False))
 
-        cols, rows = db_utils.run_query(sql, fetch_limit=limit)
-        if not cols:
-            console.print("[green]Query executed (no rows returned).[ /green]")
-            return
+        if fetch_all:
+            limit = 0
+        preview_limit = limit if limit else PREVIEW_ROWS
+
+        if export:
+            if not out:
+                out = click.prompt("Export file path", type=str)
+            # Stream rows from the cursor straight into the file, keeping only the preview in memory
+            preview, exported = [], 0
+            with db_utils.stream_query(sql, fetch_limit=limit) as (cols, rows):
+                if not cols:
+                    console.print("[green]Query executed (no rows returned).[ /green]")
+                    return
+
+                def _tee(rows):
+                    nonlocal exported
+                    for r in rows:
+                        if len(preview) < preview_limit:
+                            preview.append(r)
+                        exported += 1
+                        yield r
+
+                outpath = db_utils.export_results(cols, _tee(rows), out, export)
+            rows = preview
+        else:
+            cols, rows = db_utils.run_query(sql, fetch_limit=preview_limit)
+            if not cols:
+                console.print("[green]Query executed (no rows returned).[ /green]")
+                return
 
         # show limited preview
         t = Table(show_header=True, header_style="bold magenta")
@@ -90,10 +119,7 @@ def query(sql, limit, export, out, show_sql):
         console.print(t)
 
         if export:
-            if not out:
-                out = click.prompt("Export file path", type=str)
-            outpath = db_utils.export_results(cols, rows, out, export)
-            console.print(f"[green]Exported to {outpath}[/green]")
+            console.print(f"[green]Exported {exported} rows to {outpath}[/green]")
 
     except Exception as e:
         console.print(f"[red]Query failed: {e}[/red]")
@@ -103,23 +129,186 @@ def query(sql, limit, export, out, show_sql):
 @db_explorer.command("search")
 @click.argument("keyword", required=True)
 @click.option("--limit", default=10, help="Rows per table to return")
-def search(keyword, limit):
+@click.option("--workers", default=db_utils.SEARCH_WORKERS, show_default=True, help="Tables scanned concurrently")
+@click.option("--timeout", type=float, help="Stop the whole search after this many seconds")
+@click.option("--statement-timeout", type=float, help="Abort any single table scan after this many seconds")
+def search(keyword, limit, workers, timeout, statement_timeout):
     """Search keyword across textual columns in all tables"""
+    matched = 0
     try:
-        results = db_utils.search_keyword(keyword, limit_per_table=limit)
-        if not results:
-            console.print("[yellow]No matches found.[/yellow]")
-            return
-        for table_name, (cols, rows) in results.items():
-            console.print(f"\n[bold cyan]Table:[/bold cyan] {table_name}  —  [green]{len(rows)} rows matched[/green]")
+        # Tables are printed as soon as their scan finishes
+        for res in db_utils.iter_search_keyword(
+            keyword, limit_per_table=limit, workers=workers, timeout=timeout, statement_timeout=statement_timeout
+        ):
+            if res.error:
+                console.print(f"[yellow]! Table {res.table} skipped: {res.error}[/yellow]")
+                continue
+            matched += 1
+            via = "FTS index" if res.method == "fts" else "LIKE scan"
+            console.print(f"\n[bold cyan]Table:[/bold cyan] {res.table}  —  [green]{len(res.rows)} rows matched[/green] [dim](via {via})[/dim]")
             t = Table(show_header=True, header_style="bold magenta")
-            for c in cols:
+            for c in res.columns:
                 t.add_column(str(c))
-            for r in rows:
+            for r in res.rows:
                 t.add_row(*[str(c) for c in r])
             console.print(t)
+    except TimeoutError as e:
+        console.print(f"[yellow]⚠ Search stopped: {e} (results above are partial)[/yellow]")
     except Exception as e:
         console.print(f"[red]Search failed: {e}[/red]")
+        return
+
+    if not matched:
+        console.print("[yellow]No matches found.[/yellow]")
+
+
+# ---------------- full-text index (SQLite) ---------------- #
+@db_explorer.group("index")
+def index():
+    """Manage SQLite FTS5 indexes used by search"""
+    pass
+
+
+@index.command("build")
+@click.argument("tables", nargs=-1)
+def index_build(tables):
+    """Build or rebuild the full-text index for TABLES (default: all tables)"""
+    try:
+        built = db_utils.build_fts_index(list(tables) or None)
+        for t, cols in built.items():
+            console.print(f"[green]✔ Indexed {t}[/green] ({', '.join(cols)})")
+        if not built:
+            console.print("[yellow]No tables with text columns to index.[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Index build failed: {e}[/red]")
+
+
+@index.command("list")
+def index_list():
+    """List tables that have a full-text index"""
+    try:
+        tbls = db_utils.list_fts_indexes()
+        if not tbls:
+            console.print("[yellow]No full-text indexes.[/yellow]")
+        for t in tbls:
+            console.print(f"[cyan]{t}[/cyan]")
+    except Exception as e:
+        console.print(f"[red]Error listing indexes: {e}[/red]")
+
+
+@index.command("drop")
+@click.argument("tables", nargs=-1)
+def index_drop(tables):
+    """Drop the full-text index for TABLES (default: all)"""
+    try:
+        dropped = db_utils.drop_fts_index(list(tables) or None)
+        console.print(f"[green]Dropped {len(dropped)} index(es).[/green]")
+    except Exception as e:
+        console.print(f"[red]Index drop failed: {e}[/red]")
+
+
+# ---------------- shell ---------------- #
+SHELL_HELP = """Enter SQL terminated by ';' (multi-line is fine). Meta commands:
+  .tables            list tables
+  .search KEYWORD    search text columns in all tables
+  .limit N           rows to show per query (0 = all, current: {limit})
+  .help              show this help
+  .quit / .exit      leave the shell"""
+
+
+def _print_rows(cols, rows):
+    t = Table(show_header=True, header_style="bold magenta")
+    for c in cols:
+        t.add_column(str(c))
+    for r in rows:
+        t.add_row(*[str(c) for c in r])
+    console.print(t)
+
+
+@db_explorer.command("shell")
+@click.option("--limit", type=int, default=50, help="Rows to show per query (0 = all)")
+def shell(limit):
+    """Interactive SQL shell that keeps pooled connections warm between statements"""
+    import time
+
+    try:
+        import readline  # noqa: F401  (line editing + history where available)
+    except ImportError:
+        pass
+
+    cfg = db_utils.load_db_config()
+    if not cfg:
+        console.print("[red]No DB config found. Run connect first.[/red]")
+        return
+
+    try:
+        # Open the pool up front so the first statement doesn't pay the connect cost
+        with db_utils.pooled_connection(cfg):
+            pass
+    except Exception as e:
+        console.print(f"[red]Connection failed: {e}[/red]")
+        return
+
+    target = cfg.get("path") or f"{cfg.get('user')}@{cfg.get('host')}/{cfg.get('dbname')}"
+    console.print(f"[bold cyan]Jarvis DB shell[/bold cyan] — {cfg['type']} {target}  (.help for commands)")
+
+    buffer = []
+    while True:
+        try:
+            line = input("...> " if buffer else "db> ")
+        except (EOFError, KeyboardInterrupt):
+            console.print()
+            break
+
+        stripped = line.strip()
+        if not buffer and stripped.startswith("."):
+            cmd, _, arg = stripped.partition(" ")
+            if cmd in (".quit", ".exit"):
+                break
+            elif cmd == ".help":
+                console.print(SHELL_HELP.format(limit=limit or "all"))
+            elif cmd == ".tables":
+                try:
+                    for name in db_utils.list_tables(cfg):
+                        console.print(f"[cyan]{name}[/cyan]")
+                except Exception as e:
+                    console.print(f"[red]Error listing tables: {e}[/red]")
+            elif cmd == ".search" and arg:
+                try:
+                    for res in db_utils.iter_search_keyword(arg.strip(), cfg, limit_per_table=limit or 50):
+                        if res.error:
+                            console.print(f"[yellow]! Table {res.table} skipped: {res.error}[/yellow]")
+                        else:
+                            console.print(f"[bold cyan]Table:[/bold cyan] {res.table}")
+                            _print_rows(res.columns, res.rows)
+                except Exception as e:
+                    console.print(f"[red]Search failed: {e}[/red]")
+            elif cmd == ".limit" and arg.strip().isdigit():
+                limit = int(arg)
+            else:
+                console.print(f"[yellow]Unknown command: {stripped} (try .help)[/yellow]")
+            continue
+
+        if stripped:
+            buffer.append(line)
+        if not buffer or not stripped.endswith(";"):
+            continue
+
+        sql, buffer = "\n".join(buffer), []
+        start = time.perf_counter()
+        try:
+            cols, rows = db_utils.run_query(sql, cfg, fetch_limit=limit)
+        except Exception as e:
+            console.print(f"[red]Query failed: {e}[/red]")
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        if cols:
+            _print_rows(cols, rows)
+            console.print(f"[dim]{len(rows)} row(s) in {elapsed:.1f} ms[/dim]")
+        else:
+            console.print(f"[green]OK[/green] [dim]({elapsed:.1f} ms)[/dim]")
+
+    db_utils.close_pools()
 
 
 # ---------------- show-config & reset ---------------- #
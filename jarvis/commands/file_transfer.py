@@ -1,6 +1,6 @@
 import click
 from rich.console import Console
-from jarvis.utils import file_utils
+from jarvis.utils import compress_utils, file_utils, lan_utils, probe_utils, queue_utils
 
 console = Console()
 
@@ -29,7 +29,22 @@ def file_transfer():
 @click.option("--ip", help="Target IP (required for network/remote)")
 @click.option("--username", help="Username (required for remote)")
 @click.option("--password", hide_input=True, help="Password (required for remote)")
-def setup(mode, protocol, source, destination, ip, username, password):
+@click.option("--streams", type=click.IntRange(1, 64), help="Parallel TCP connections for network mode (default 4)")
+@click.option("--buffer-size", type=int, help="Socket buffer size in bytes for network mode (default 1 MiB)")
+@click.option("--delta", is_flag=True, help="Only send the changed blocks of files that already exist at the destination")
+@click.option("--workers", type=click.IntRange(1, 128), help="Parallel copies for local mode (default 8)")
+@click.option("--checksum", is_flag=True, help="Local mode: compare file contents, not just size and mtime")
+@click.option("--channels", type=click.IntRange(1, 32), help="Concurrent SFTP channels for remote mode (default 4)")
+@click.option(
+    "--compress",
+    type=click.Choice(compress_utils.CODECS, case_sensitive=False),
+    default="none",
+    help="Compress network/remote transfers; auto skips data that does not compress",
+)
+@click.option("--profile", default=file_utils.DEFAULT_PROFILE, show_default=True,
+              help="Save this setup under a name (run it with transfer --profile or queue jobs)")
+def setup(mode, protocol, source, destination, ip, username, password, streams, buffer_size, delta, workers,
+          checksum, channels, compress, profile):
     """Configure a transfer setup once"""
 
     if mode == "local":
@@ -39,6 +54,8 @@ def setup(mode, protocol, source, destination, ip, username, password):
     elif mode == "network":
         if not ip:
             ip = click.prompt("Target IP (e.g. 192.168.103.156)", type=str)
+        if not probe_utils.is_open(ip, 5001, use_cache=False):  # a receiver may have just started
+            console.print(f"[yellow]No receiver listening on {ip}:5001 yet (start `file-transfer receive` there).[/yellow]")
 
     elif mode == "remote":
         if not ip:
@@ -64,100 +81,193 @@ def setup(mode, protocol, source, destination, ip, username, password):
                 )
 
     config = file_utils.setup_transfer(
-        mode, source, destination, ip, username, password, protocol or "sftp"
+        mode, source, destination, ip, username, password, protocol or "sftp",
+        streams=streams, buffer_size=buffer_size, delta=delta, workers=workers, checksum=checksum,
+        channels=channels, compress=compress, profile=profile,
     )
-    console.print(f"[green]Transfer setup saved[/green]: {config}")
+    console.print(f"[green]Transfer setup saved as '{profile}'[/green]: {config}")
 
 
 @file_transfer.command("transfer")
-def transfer():
+@click.option("--profile", default=file_utils.DEFAULT_PROFILE, show_default=True, help="Saved setup to run")
+@click.option(
+    "--compress",
+    type=click.Choice(compress_utils.CODECS, case_sensitive=False),
+    help="Override the compression saved by setup",
+)
+def transfer(profile, compress):
     """Execute transfer based on saved setup"""
-    config = file_utils.load_config()
+    config = file_utils.load_config(profile)
     if not config:
-        console.print("[red]No transfer config found. Run 'setup' first.[/red]")
+        console.print(f"[red]No transfer config found for profile '{profile}'. Run 'setup' first.[/red]")
+        return
+
+    try:
+        result = file_utils.run_transfer(config, compress=compress, log=console.print)
+    except Exception as e:
+        console.print(f"[red]Transfer failed: {e}[/red]")
         return
 
-    mode = config["mode"]
-    protocol = config.get("protocol", "sftp")
+    if result.mode == "local":
+        stats = result.stats
+        console.print(f"[green]File copied locally → {config['destination']}[/green]")
+        elapsed = max(stats.seconds, 1e-9)
+        console.print(
+            f"{stats.copied} copied, {stats.skipped} unchanged in {stats.seconds:.2f}s "
+            f"({(stats.copied + stats.skipped) / elapsed:,.0f} files/s, "
+            f"{stats.bytes / elapsed / 1e6:,.1f} MB/s)"
+        )
+    elif result.mode == "network":
+        console.print(f"[green]Sent {config['source']} to {config['ip']} successfully![/green]")
+    else:
+        console.print(f"[green]File transferred via {result.protocol.upper()} → {result.path}[/green]")
+
+
+@file_transfer.command("queue")
+@click.argument("jobs_file", required=False, type=click.File("r"))
+@click.option("--job", "job_specs", multiple=True, metavar="PROFILE=SOURCE", help="Add a job (repeatable)")
+@click.option("--resume", is_flag=True, help="Continue the unfinished jobs of the last queue")
+@click.option("--concurrency", type=click.IntRange(1, 64), default=queue_utils.QUEUE_CONCURRENCY, show_default=True,
+              help="Jobs running at once")
+@click.option("--per-host", type=click.IntRange(1, 64), default=queue_utils.PER_HOST_LIMIT, show_default=True,
+              help="Jobs running at once against the same host")
+@click.option("--bwlimit", help="Total bandwidth cap in bytes/s, e.g. 500K, 20M")
+@click.option("--retries", type=click.IntRange(0, 20), default=queue_utils.MAX_RETRIES, show_default=True,
+              help="Retries per job (exponential backoff)")
+def queue(jobs_file, job_specs, resume, concurrency, per_host, bwlimit, retries):
+    """Run many transfers from saved profiles: JOBS_FILE lines are 'PROFILE SOURCE'"""
+    from rich.progress import BarColumn, DownloadColumn, Progress, TextColumn, TransferSpeedColumn
 
     try:
-        if mode == "local":
-            file_utils.local_transfer(config["source"], config["destination"])
-            console.print(f"[green]File copied locally → {config['destination']}[/green]")
-
-        elif mode == "network":
-            file_utils.send_file_network(config["source"], config["ip"])
-            console.print(f"[green]File sent to {config['ip']} successfully![/green]")
-
-        elif mode == "remote":
-            try:
-                remote_path = file_utils.remote_transfer(
-                    config["source"],
-                    config["destination"],
-                    config["ip"],
-                    config["username"],
-                    config["password"],
-                    protocol,
-                )
-                console.print(f"[green]File transferred via {protocol.upper()} → {remote_path}[/green]")
-
-            except Exception as e:
-                console.print(f"[yellow]Transfer via {protocol.upper()} failed: {e}[/yellow]")
-
-                # 🔄 Fallback: try the other protocol
-                fallback = "smb" if protocol == "sftp" else "sftp"
-                console.print(f"[cyan]Trying fallback protocol: {fallback.upper()}[/cyan]")
-
-                try:
-                    remote_path = file_utils.remote_transfer(
-                        config["source"],
-                        config["destination"],
-                        config["ip"],
-                        config["username"],
-                        config["password"],
-                        fallback,
-                    )
-                    console.print(f"[green]File transferred via fallback {fallback.upper()} → {remote_path}[/green]")
-                except Exception as e2:
-                    console.print(f"[red]Transfer failed with both protocols: {e2}[/red]")
+        jobs = queue_utils.parse_jobs(jobs_file) if jobs_file else []
+        for spec in job_specs:
+            profile, sep, source = spec.partition("=")
+            if not sep or not profile or not source:
+                raise ValueError(f"--job expects PROFILE=SOURCE, got {spec!r}")
+            jobs.append({"profile": profile, "source": source})
+        rate = queue_utils.parse_rate(bwlimit)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+
+    runner = queue_utils.TransferQueue(concurrency, per_host, rate, retries)
+    if resume:
+        if jobs:
+            console.print("[red]Use either --resume or new jobs, not both.[/red]")
+            return
+        if not runner.resume():
+            console.print("[yellow]No unfinished queue to resume.[/yellow]")
+            return
+    elif jobs:
+        missing = sorted({j["profile"] for j in jobs} - set(file_utils.list_profiles()))
+        if missing:
+            console.print(f"[red]Unknown profile(s): {', '.join(missing)}. Create them with 'setup --profile'.[/red]")
+            return
+        runner.create(jobs)
+    else:
+        console.print("[yellow]No jobs given. Pass a JOBS_FILE or --job PROFILE=SOURCE.[/yellow]")
+        return
+
+    progress = Progress(
+        TextColumn("{task.description}"),
+        BarColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        TextColumn("{task.fields[status]}"),
+        console=console,
+    )
+    tasks = {
+        job["id"]: progress.add_task(f"#{job['id']} {job['profile']}: {job['source']}", total=None, status="queued")
+        for job in runner.jobs if job["status"] == "pending"
+    }
+
+    def on_start(job, total):
+        progress.reset(tasks[job["id"]], total=total or None, status=f"running (try {job['attempts']})")
+
+    def on_bytes(job, n):
+        progress.advance(tasks[job["id"]], n)
 
+    def on_retry(job, delay):
+        progress.update(tasks[job["id"]], status=f"[yellow]retry in {delay:.0f}s: {job['error']}[/yellow]")
+
+    def on_finish(job):
+        task = tasks[job["id"]]
+        if job["status"] == "done":
+            total = progress.tasks[task].total
+            progress.update(task, completed=total or 0, status="[green]done[/green]")
         else:
-            console.print("[red]Invalid transfer mode[/red]")
+            progress.update(task, status=f"[red]failed: {job['error']}[/red]")
 
-    except Exception as e:
-        console.print(f"[red]Transfer failed: {e}[/red]")
+    hooks = {"on_start": on_start, "on_bytes": on_bytes, "on_retry": on_retry, "on_finish": on_finish}
+    try:
+        with progress:
+            done, failed = runner.run(hooks)
+    except KeyboardInterrupt:
+        console.print("[yellow]Queue interrupted. Run 'file-transfer queue --resume' to continue.[/yellow]")
+        return
+
+    color = "green" if not failed else "red"
+    console.print(f"[{color}]{done} job(s) done, {failed} failed.[/{color}]")
+    if failed:
+        console.print("[yellow]Run 'file-transfer queue --resume' to retry the failed jobs.[/yellow]")
 
 
 @file_transfer.command("receive")
 @click.option("--save-dir", default=".", help="Directory to save incoming files")
 @click.option("--port", default=5001, help="Port to listen on (default: 5001)")
-def receive(save_dir, port):
+@click.option("--buffer-size", type=int, default=lan_utils.BUFFER_SIZE, help="Receive buffer size in bytes")
+@click.option("--daemon", is_flag=True, help="Keep running and accept transfers from many senders")
+def receive(save_dir, port, buffer_size, daemon):
     """Start a receiver for network transfers"""
+    if daemon:
+        def on_complete(result):
+            if isinstance(result, Exception):
+                console.print(f"[red]Receive failed: {result}[/red]")
+            else:
+                console.print(f"[green]Received → {result}[/green]")
+
+        console.print(f"[cyan]Receiver listening on port {port} (Ctrl+C to stop)[/cyan]")
+        try:
+            file_utils.receive_network_daemon(save_dir, port, buffer_size=buffer_size, on_complete=on_complete)
+        except KeyboardInterrupt:
+            console.print("[yellow]Receiver stopped.[/yellow]")
+        except Exception as e:
+            console.print(f"[red]Receiver failed: {e}[/red]")
+        return
+
     try:
-        filepath = file_utils.receive_file_network(save_dir, port)
+        filepath = file_utils.receive_file_network(save_dir, port, buffer_size=buffer_size)
         console.print(f"[green]File received successfully → {filepath}[/green]")
     except Exception as e:
         console.print(f"[red]Receive failed: {e}[/red]")
 
 
 @file_transfer.command("show-config")
-def show_config():
-    """Show current transfer configuration"""
-    config = file_utils.load_config()
-    if not config:
+@click.option("--profile", help="Show one profile (default: all)")
+def show_config(profile):
+    """Show saved transfer configurations"""
+    profiles = file_utils.list_profiles()
+    if profile:
+        profiles = {profile: profiles[profile]} if profile in profiles else {}
+    if not profiles:
         console.print("[yellow]No transfer configuration found.[/yellow]")
-    else:
-        console.print("[cyan]Current transfer setup:[/cyan]")
+        return
+    for name, config in profiles.items():
+        console.print(f"[cyan]Profile '{name}':[/cyan]")
         for k, v in config.items():
             console.print(f" - {k}: {v if v else '-'}")
 
 
 @file_transfer.command("reset")
-def reset_config():
+@click.option("--profile", help="Remove one profile (default: all)")
+def reset_config(profile):
     """Clear saved transfer configuration"""
-    from pathlib import Path
-
-    if file_utils.CONFIG_FILE.exists():
+    if profile:
+        if file_utils.delete_profile(profile):
+            console.print(f"[green]Profile '{profile}' removed.[/green]")
+        else:
+            console.print(f"[yellow]No profile named '{profile}'.[/yellow]")
+    elif file_utils.CONFIG_FILE.exists():
         file_utils.CONFIG_FILE.unlink()
         console.print("[green]Transfer configuration reset.[/green]")
     else:
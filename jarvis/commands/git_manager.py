@@ -24,10 +24,25 @@ def add_branch(name, commit_hash, issue, desc):
     console.print(f"[green]Branch '{name}' added successfully![/green]")
 
 @git_manager.command("list-branches")
-def list_branches():
+@click.option("--status", type=click.Choice(["open", "merged", "closed"], case_sensitive=False), help="Only branches with this status")
+@click.option("--issue", help="Only branches linked to this issue ID")
+@click.option("--name-prefix", help="Only branches whose name starts with this prefix")
+@click.option("--limit", type=int, help="Maximum rows to return")
+@click.option("--offset", type=int, default=0, help="Rows to skip (prefer --after-id for deep pages)")
+@click.option("--after-id", type=int, help="Keyset paging: only rows with ID greater than this")
+@click.option("--format", "fmt", type=click.Choice(["table", "tsv", "json"], case_sensitive=False), default="table",
+              help="Output format; tsv/json stream rows without table layout")
+def list_branches(status, issue, name_prefix, limit, offset, after_id, fmt):
     """List all branches with metadata"""
     from jarvis.utils import git_utils
-    branches = git_utils.list_branches()
+    filters = dict(status=status and status.lower(), issue_id=issue, name_prefix=name_prefix,
+                   after_id=after_id, limit=limit, offset=offset)
+
+    if fmt != "table":
+        _stream_branches(git_utils.get_store().iter(**filters), fmt)
+        return
+
+    branches = git_utils.list_branches(**filters)
 
     if not branches:
         console.print("[yellow]No branches found![/yellow]")
@@ -68,6 +83,27 @@ def list_branches():
 
     console.print(table)
 
+
+BRANCH_FIELDS = ("id", "name", "commit_hash", "issue_id", "description", "status")
+
+
+def _stream_branches(rows, fmt):
+    """Write rows one at a time as TSV or a JSON array (no rich layout)"""
+    import json
+
+    if fmt == "tsv":
+        click.echo("\t".join(BRANCH_FIELDS))
+        for row in rows:
+            click.echo("\t".join("" if v is None else str(v).replace("\t", " ").replace("\n", " ") for v in row))
+    else:
+        click.echo("[", nl=False)
+        sep = "\n  "
+        for row in rows:
+            click.echo(sep + json.dumps(dict(zip(BRANCH_FIELDS, row))), nl=False)
+            sep = ",\n  "
+        click.echo("\n]")
+
+
 @git_manager.command("delete-branch")
 @click.argument("branch_id", type=int)
 def delete_branch(branch_id):
@@ -84,3 +120,40 @@ def update_status(branch_id, status):
     """Update status of a branch"""
     git_utils.update_branch_status(branch_id, status)
     console.print(f"[cyan]Branch {branch_id} status updated to '{status}'.[/cyan]")
+
+
+@git_manager.command("sync")
+@click.option("--repo", default=".", type=click.Path(exists=True, file_okay=False), help="Path to the git repository")
+def sync(repo):
+    """Sync branch names and head commits from the real repository"""
+    import subprocess
+
+    try:
+        refs = git_utils.read_git_refs(repo)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        detail = getattr(e, "stderr", None) or e
+        console.print(f"[red]Failed to read git refs: {str(detail).strip()}[/red]")
+        return
+
+    added, updated, unchanged = git_utils.get_store().sync_refs(refs)
+    console.print(f"[green]Synced {len(refs)} branch(es): {added} added, {updated} updated, {unchanged} unchanged.[/green]")
+
+
+@git_manager.command("import")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+def import_branches(file):
+    """Bulk add branches / update statuses from a CSV or JSON file
+
+    Columns: name, commit_hash, issue_id, description, status (new branches)
+    or id, status (status updates).
+    """
+    try:
+        new_branches, status_updates = git_utils.read_branch_records(file)
+    except (ValueError, KeyError) as e:
+        console.print(f"[red]Invalid import file: {e}[/red]")
+        return
+
+    store = git_utils.get_store()
+    added = store.add_many(new_branches) if new_branches else 0
+    updated = store.update_status_many(status_updates) if status_updates else 0
+    console.print(f"[green]Imported {added} branch(es), updated {updated} status(es).[/green]")
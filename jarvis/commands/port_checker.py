@@ -1,6 +1,10 @@
+import socket
+import time
+
 import click
 from rich.console import Console
-from jarvis.utils import system_utils
+from rich.table import Table
+from jarvis.utils import probe_utils, system_utils, watch_utils
 
 console = Console()
 
@@ -9,13 +13,157 @@ def port_checker():
     """Check port usage on your system"""
     pass
 
+
+def _watch_ports(ports, listening, interval):
+    """Print sockets opening/closing on the ports (None = all) until Ctrl+C"""
+    watcher = watch_utils.PortWatch(ports, listening=listening)
+    console.print(f"[cyan]Watching for changes every {interval:g}s (Ctrl+C to stop)...[/cyan]")
+    try:
+        while True:
+            time.sleep(interval)
+            opened, closed = watcher.poll()
+            for entry, owner in opened:
+                console.print(f"{watch_utils.stamp()} [yellow]+ opened[/yellow] {entry.proto}:{entry.port} {watch_utils.owner_label(owner)}")
+            for entry, owner in closed:
+                console.print(f"{watch_utils.stamp()} [green]- closed[/green] {entry.proto}:{entry.port} {watch_utils.owner_label(owner)}")
+    except KeyboardInterrupt:
+        pass
+
+
 @port_checker.command("check")
-@click.argument("port", type=int)
-def check(port):
-    """Check which process is using a specific port"""
-    result = system_utils.check_port(port)
-    if result:
-        console.print(f"[yellow]Port {port} is in use[/yellow]")
-        console.print(f"PID: {result['pid']}, Name: {result['name']}, User: {result['user']}, Status: {result['status']}")
-    else:
-        console.print(f"[green]Port {port} is free[/green]")
+@click.argument("ports", type=int, nargs=-1)
+@click.option("--watch", is_flag=True, help="Keep running and report sockets on the ports opening/closing")
+@click.option("--interval", type=click.FloatRange(min=0.05), default=watch_utils.WATCH_INTERVAL,
+              show_default=True, help="Seconds between checks in --watch/--until-free mode")
+@click.option("--until-free", type=int, metavar="PORT", help="Wait until PORT is free, then exit")
+@click.option("--timeout", type=float, help="Give up --until-free after this many seconds (exit status 1)")
+@click.pass_context
+def check(ctx, ports, watch, interval, until_free, timeout):
+    """Check which processes are using one or more ports"""
+    if until_free is not None:
+        if watch_utils.port_is_free(until_free):
+            console.print(f"[green]Port {until_free} is free[/green]")
+            return
+        console.print(f"[cyan]Waiting for port {until_free} to be free...[/cyan]")
+        try:
+            freed = watch_utils.wait_until_free(until_free, timeout=timeout, interval=interval)
+        except KeyboardInterrupt:
+            ctx.exit(130)
+        if not freed:
+            console.print(f"[red]Port {until_free} is still in use after {timeout:g}s[/red]")
+            ctx.exit(1)
+        console.print(f"[green]Port {until_free} is free[/green]")
+        return
+    if not ports:
+        console.print("[red]Give one or more ports, or --until-free PORT.[/red]")
+        ctx.exit(2)
+
+    _report_usage(ports)
+    if watch:
+        _watch_ports(ports, False, interval)
+
+
+def _report_usage(ports):
+    usage = system_utils.check_ports(ports)
+    if len(ports) == 1:
+        port, users = ports[0], usage[ports[0]]
+        if users:
+            console.print(f"[yellow]Port {port} is in use[/yellow]")
+            for result in users:
+                console.print(f"PID: {result['pid'] or '?'}, Name: {result['name']}, User: {result['user']}, Status: {result['status']}")
+        else:
+            console.print(f"[green]Port {port} is free[/green]")
+        return
+
+    table = Table(title="Port usage")
+    table.add_column("Port", justify="right", style="cyan")
+    table.add_column("State")
+    table.add_column("PID")
+    table.add_column("Name", style="green")
+    table.add_column("User", style="blue")
+    table.add_column("Status", style="magenta")
+    for port, users in usage.items():
+        if not users:
+            table.add_row(str(port), "[green]free[/green]", "", "", "", "")
+        for result in users:
+            table.add_row(str(port), "[yellow]in use[/yellow]", str(result["pid"] or "?"), result["name"],
+                          result["user"], result["status"])
+    console.print(table)
+
+
+@port_checker.command("list")
+@click.option("--listening", is_flag=True, help="Only listening TCP sockets and bound UDP sockets")
+@click.option("--watch", is_flag=True, help="Keep running and report ports opening/closing")
+@click.option("--interval", type=click.FloatRange(min=0.05), default=watch_utils.WATCH_INTERVAL,
+              show_default=True, help="Seconds between checks in --watch mode")
+def list_ports(listening, watch, interval):
+    """List local ports and the processes holding them"""
+    _list_table(listening)
+    if watch:
+        _watch_ports(None, listening, interval)
+
+
+def _list_table(listening):
+    rows = system_utils.list_ports(listening=listening)
+    if not rows:
+        console.print("[yellow]No ports found.[/yellow]")
+        return
+
+    table = Table(title="Listening ports" if listening else "Local ports")
+    table.add_column("Proto")
+    table.add_column("Address")
+    table.add_column("Port", justify="right", style="cyan")
+    table.add_column("State")
+    table.add_column("PID")
+    table.add_column("Name", style="green")
+    table.add_column("User", style="blue")
+    for row in rows:
+        table.add_row(row["proto"], row["address"], str(row["port"]), row["state"], str(row["pid"] or "?"),
+                      row["name"], row["user"])
+    console.print(table)
+
+
+@port_checker.command("scan")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Host name or IP to scan")
+@click.option("--ports", default="1-1024", show_default=True, help="Ports and ranges, e.g. 22,80,8000-8100")
+@click.option("--timeout", type=float, default=probe_utils.PROBE_TIMEOUT, show_default=True,
+              help="Seconds to wait for each port")
+@click.option("--concurrency", type=int, default=probe_utils.PROBE_CONCURRENCY, show_default=True,
+              help="Ports probed at the same time")
+@click.option("--all", "show_all", is_flag=True, help="Also list closed/filtered ports")
+@click.option("--cache", "use_cache", is_flag=True,
+              help=f"Reuse results up to {probe_utils.CACHE_TTL:g}s old instead of probing every port again")
+def scan(host, ports, timeout, concurrency, show_all, use_cache):
+    """Scan a host for open TCP ports"""
+    try:
+        port_list = probe_utils.parse_ports(ports)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+
+    start = time.perf_counter()
+    results = probe_utils.probe([(host, p) for p in port_list], timeout=timeout,
+                                concurrency=concurrency, use_cache=use_cache)
+    elapsed = time.perf_counter() - start
+
+    rows = [r for r in sorted(results.values(), key=lambda r: r.port) if show_all or r.state == "open"]
+    if rows:
+        table = Table(title=f"Ports on {host}")
+        table.add_column("Port", justify="right")
+        table.add_column("State")
+        table.add_column("Service")
+        table.add_column("Latency", justify="right")
+        colors = {"open": "green", "closed": "red", "filtered": "yellow", "unreachable": "red"}
+        for r in rows:
+            try:
+                service = socket.getservbyport(r.port, "tcp")
+            except OSError:
+                service = ""
+            latency = f"{r.latency * 1000:.1f} ms" if r.latency is not None else "-"
+            table.add_row(str(r.port), f"[{colors[r.state]}]{r.state}[/{colors[r.state]}]", service, latency)
+        console.print(table)
+
+    n_open = sum(r.state == "open" for r in results.values())
+    if n_open == 0 and all(r.state == "unreachable" for r in results.values()):
+        console.print(f"[red]Host {host} is unreachable[/red]")
+    console.print(f"[cyan]Scanned {len(port_list)} port(s) on {host} in {elapsed:.2f}s: {n_open} open[/cyan]")
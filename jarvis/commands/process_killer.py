@@ -1,20 +1,54 @@
+import re
+import time
+
 import click
 from rich.console import Console
 from rich.table import Table
-from jarvis.utils import system_utils
+from jarvis.utils import system_utils, watch_utils
 
 console = Console()
 
+MAX_ROWS = 50  # matches listed before confirming
+
 @click.group()
 def process_killer():
     """Search and kill processes (cross-platform)."""
     pass
 
 
+def _watch(poll, interval):
+    """Call poll() every interval seconds until Ctrl+C"""
+    console.print(f"[cyan]Watching for changes every {interval:g}s (Ctrl+C to stop)...[/cyan]")
+    try:
+        while True:
+            time.sleep(interval)
+            poll()
+    except KeyboardInterrupt:
+        pass
+
+
 @process_killer.command("search-name")
 @click.argument("name", type=str)
-def search_by_name(name):
+@click.option("--watch", is_flag=True, help="Keep running and report matching processes starting/exiting")
+@click.option("--interval", type=click.FloatRange(min=0.05), default=watch_utils.WATCH_INTERVAL,
+              show_default=True, help="Seconds between checks in --watch mode")
+def search_by_name(name, watch, interval):
     """Search processes by name"""
+    if watch:
+        needle = name.lower()
+        watcher = watch_utils.ProcessWatch(match=lambda info: needle in info["name"].lower())
+        _print_processes(f"Processes matching '{name}'", watcher.known.values(), "user")
+
+        def poll():
+            started, exited = watcher.poll()
+            for info in started:
+                console.print(f"{watch_utils.stamp()} [green]+ started[/green] {info['pid']} {info['name']} ({info['user']})")
+            for info in exited:
+                console.print(f"{watch_utils.stamp()} [red]- exited[/red]  {info['pid']} {info['name']} ({info['user']})")
+
+        _watch(poll, interval)
+        return
+
     results = system_utils.search_process_by_name(name)
     if not results:
         console.print(f"[yellow]No processes found with name '{name}'.[/yellow]")
@@ -34,8 +68,26 @@ def search_by_name(name):
 
 @process_killer.command("search-port")
 @click.argument("port", type=int)
-def search_by_port(port):
+@click.option("--watch", is_flag=True, help="Keep running and report sockets on the port opening/closing")
+@click.option("--interval", type=click.FloatRange(min=0.05), default=watch_utils.WATCH_INTERVAL,
+              show_default=True, help="Seconds between checks in --watch mode")
+def search_by_port(port, watch, interval):
     """Search process by port"""
+    if watch:
+        watcher = watch_utils.PortWatch([port])
+        owners = {o["pid"]: o for o in watcher.in_use().get(port, []) if o}
+        _print_processes(f"Processes using port {port}", owners.values(), "user")
+
+        def poll():
+            opened, closed = watcher.poll()
+            for entry, owner in opened:
+                console.print(f"{watch_utils.stamp()} [yellow]+ opened[/yellow] {entry.proto}:{entry.port} {watch_utils.owner_label(owner)}")
+            for entry, owner in closed:
+                console.print(f"{watch_utils.stamp()} [green]- closed[/green] {entry.proto}:{entry.port} {watch_utils.owner_label(owner)}")
+
+        _watch(poll, interval)
+        return
+
     results = system_utils.search_process_by_port(port)
     if not results:
         console.print(f"[green]No process found using port {port}[/green]")
@@ -53,6 +105,21 @@ def search_by_port(port):
     console.print(table)
 
 
+def _print_processes(title, infos, user_key):
+    infos = list(infos)
+    if not infos:
+        console.print(f"[yellow]{title}: none yet[/yellow]")
+        return
+    table = Table(title=title)
+    table.add_column("PID", style="cyan")
+    table.add_column("Name", style="green")
+    table.add_column("User", style="blue")
+    table.add_column("Status", style="magenta")
+    for info in infos:
+        table.add_row(str(info["pid"]), info["name"], info[user_key], info["status"])
+    console.print(table)
+
+
 @process_killer.command("kill")
 @click.argument("pid", type=int)
 def kill_process(pid):
@@ -62,3 +129,50 @@ def kill_process(pid):
         console.print(f"[red]Process {pid} killed successfully![/red]")
     else:
         console.print(f"[bold yellow]Failed to kill process {pid}[/bold yellow]")
+
+
+@process_killer.command("kill-matching")
+@click.option("--name", "name", default=None, help="Regex matched against the process name")
+@click.option("--cmdline", default=None, help="Regex matched against the full command line")
+@click.option("--user", default=None, help="Only processes owned by this user")
+@click.option("--port", "ports", type=int, multiple=True, help="Only processes with a socket on this port (repeatable)")
+@click.option("--tree", is_flag=True, help="Also stop every descendant of a matching process")
+@click.option("--timeout", type=float, default=5.0, show_default=True,
+              help="Seconds to wait after SIGTERM before sending SIGKILL")
+@click.option("--dry-run", is_flag=True, help="Only list what would be stopped")
+@click.option("--yes", "-y", is_flag=True, help="Do not ask for confirmation")
+def kill_matching(name, cmdline, user, ports, tree, timeout, dry_run, yes):
+    """Gracefully stop every process matching the filters (SIGTERM, then SIGKILL)"""
+    if not any((name, cmdline, user, ports)):
+        console.print("[red]Give at least one filter: --name, --cmdline, --user or --port[/red]")
+        return
+    try:
+        procs = system_utils.find_processes(name=name, cmdline=cmdline, user=user, ports=ports, tree=tree)
+    except re.error as e:
+        console.print(f"[red]Invalid regex: {e}[/red]")
+        return
+    if not procs:
+        console.print("[yellow]No matching processes.[/yellow]")
+        return
+
+    table = Table(title=f"{len(procs)} matching process(es)")
+    table.add_column("PID", style="cyan")
+    table.add_column("Name", style="green")
+    table.add_column("User", style="blue")
+    for proc in procs[:MAX_ROWS]:
+        table.add_row(str(proc.pid), proc.info["name"], proc.info["username"])
+    console.print(table)
+    if len(procs) > MAX_ROWS:
+        console.print(f"... and {len(procs) - MAX_ROWS} more")
+
+    if dry_run:
+        return
+    if not yes and not click.confirm(f"Stop {len(procs)} process(es)?"):
+        return
+
+    terminated, killed, failed = system_utils.terminate_processes(procs, timeout=timeout)
+    console.print(f"[green]{len(terminated)} exited after SIGTERM[/green], "
+                  f"[red]{len(killed)} killed with SIGKILL[/red]")
+    if failed:
+        console.print(f"[bold yellow]{len(failed)} could not be stopped: "
+                      f"{', '.join(str(p.pid) for p in failed[:20])}[/bold yellow]")
@@ -1,15 +1,23 @@
 import time
-import psutil
+from datetime import datetime
+
 import click
-from rich.console import Console
-from rich.table import Table
+import psutil
+from rich.console import Console, Group
 from rich.live import Live
 from rich.progress import BarColumn, TextColumn, Progress
 from rich.layout import Layout
 from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+from jarvis.utils import metrics_utils, monitor_utils
 
 console = Console()
 
+GB = 1024 ** 3
+MIN_INTERVAL = 0.05
+
 
 @click.group()
 def system_monitor():
@@ -17,53 +25,301 @@ def system_monitor():
     pass
 
 
-def make_progress_bar(label: str, value: float, total: float, unit: str) -> Progress:
-    """Helper to create a progress bar"""
+def make_progress_bar() -> Progress:
+    """Progress bar whose label and value text come from the task fields"""
     return Progress(
-        TextColumn(f"[bold]{label}[/bold]", justify="right"),
+        TextColumn("[bold]{task.description}[/bold]", justify="right"),
         BarColumn(bar_width=40),
-        TextColumn(f"{value:.1f}/{total:.1f} {unit}" if total else f"{value:.1f} {unit}"),
+        TextColumn("{task.fields[detail]}"),
         expand=True,
     )
 
 
+class TableView:
+    """Table whose rows are replaced on update; the Table is only assembled when rendered"""
+
+    def __init__(self, *columns):
+        self.columns = columns
+        self.rows = []
+
+    def __rich__(self):
+        table = Table(expand=True, box=None, header_style="bold magenta")
+        for name in self.columns:
+            left = name in ("Name", "Device", "Interface", "User")
+            table.add_column(name, justify="left" if left else "right", no_wrap=not left)
+        for row in self.rows:
+            table.add_row(*row)
+        return table
+
+
+class Dashboard:
+    """
+    The live view. Renderables are built once; update() only changes task
+    values and text, so a tick costs one render instead of rebuilding the
+    layout, bars and tables.
+    """
+
+    def __init__(self, cores=0, disks=False, nics=False, top=0, sort="cpu"):
+        self.cpu = make_progress_bar()
+        self.cpu_task = self.cpu.add_task("CPU %", total=100, detail="")
+        self.mem = make_progress_bar()
+        self.mem_task = self.mem.add_task("Memory", total=1, detail="")
+        self.disk = make_progress_bar()
+        self.disk_task = self.disk.add_task("Disk", total=1, detail="")
+        self.net = Text()
+        self.footer = Text(style="dim")
+
+        self.cores = make_progress_bar() if cores else None
+        self.core_tasks = [self.cores.add_task(f"cpu{i}", total=100, detail="") for i in range(cores)]
+        self.disks = TableView("Device", "Read IOPS", "Write IOPS", "Read/s", "Write/s") if disks else None
+        self.nics = TableView("Interface", "Sent/s", "Received/s") if nics else None
+        self.procs = TableView("PID", "Name", "User", "CPU %", "RSS") if top else None
+
+        self.layout = Layout()
+        main = [
+            Layout(Panel(self.cpu, title="CPU", border_style="cyan")),
+            Layout(Panel(self.mem, title="Memory", border_style="magenta")),
+            Layout(Panel(self.disk, title="Disk", border_style="green")),
+            Layout(Panel(Group(self.net, self.footer), title="Network", border_style="yellow")),
+        ]
+        details = []
+        if self.cores is not None:
+            details.append(Layout(Panel(self.cores, title="Cores", border_style="cyan"), size=cores + 2))
+        if self.disks:
+            details.append(Layout(Panel(self.disks, title="Disk I/O", border_style="green")))
+        if self.nics:
+            details.append(Layout(Panel(self.nics, title="Interfaces", border_style="yellow")))
+        if self.procs:
+            details.append(Layout(Panel(self.procs, title=f"Top {top} by {sort.upper()}", border_style="red"),
+                                  size=top + 3))
+        if details:
+            left, right = Layout(), Layout()
+            left.split_column(*main)
+            right.split_column(*details)
+            self.layout.split_row(left, right)
+        else:
+            self.layout.split_column(*main)
+
+    def update(self, sample, overhead=None, max_overhead=None, procs=None):
+        self.cpu.update(self.cpu_task, completed=sample.cpu, detail=f"{sample.cpu:.1f}/100.0 %")
+        self.mem.update(self.mem_task, total=sample.mem_total, completed=sample.mem_used,
+                        detail=f"{sample.mem_used / GB:.1f}/{sample.mem_total / GB:.1f} GB")
+        self.disk.update(self.disk_task, total=sample.disk_total, completed=sample.disk_used,
+                         detail=f"{sample.disk_used / GB:.1f}/{sample.disk_total / GB:.1f} GB")
+        fmt = monitor_utils.format_rate
+        self.net.plain = (
+            f"Sent: {fmt(sample.net_sent_rate):>12}   Received: {fmt(sample.net_recv_rate):>12}   "
+            f"(total {monitor_utils.format_bytes(sample.net_sent)} / {monitor_utils.format_bytes(sample.net_recv)})"
+        )
+        if self.cores is not None and sample.percpu:
+            for task, value in zip(self.core_tasks, sample.percpu):
+                self.cores.update(task, completed=value, detail=f"{value:5.1f} %")
+        if self.disks and sample.disks is not None:
+            self.disks.rows = [
+                (name, f"{d.read_iops:.0f}", f"{d.write_iops:.0f}", fmt(d.read_rate), fmt(d.write_rate))
+                for name, d in sorted(sample.disks.items())
+            ]
+        if self.nics and sample.nics is not None:
+            self.nics.rows = [
+                (name, fmt(n.sent_rate), fmt(n.recv_rate))
+                for name, n in sorted(sample.nics.items(), key=lambda item: -sum(item[1]))
+            ]
+        if self.procs and procs is not None:
+            self.procs.rows = [
+                (str(p.pid), p.name, p.user, f"{p.cpu:.1f}", monitor_utils.format_bytes(p.rss)) for p in procs
+            ]
+        if overhead is not None:
+            over = max_overhead is not None and overhead > max_overhead
+            limit = f" (limit {max_overhead:.1f}%)" if max_overhead is not None else ""
+            self.footer.plain = f"monitor overhead: {overhead:.1f}% CPU{limit}"
+            self.footer.style = "bold red" if over else "dim"
+
+
 @system_monitor.command("live")
-@click.option("--interval", default=1, help="Refresh interval in seconds")
-def live_monitor(interval):
+@click.option("--interval", type=click.FloatRange(min=MIN_INTERVAL), default=1.0, show_default=True,
+              help="Sampling interval in seconds (sub-second values allowed)")
+@click.option("--fps", type=click.FloatRange(min=0.1, max=30), default=4.0, show_default=True,
+              help="Maximum screen refreshes per second")
+@click.option("--max-overhead", type=float, default=None,
+              help="CPU% the monitor itself may use; above it the refresh rate backs off")
+@click.option("--per-cpu", is_flag=True, help="Show a bar per CPU core")
+@click.option("--disks", is_flag=True, help="Show read/write IOPS and throughput per disk")
+@click.option("--nics", is_flag=True, help="Show send/receive rates per network interface")
+@click.option("--top", type=click.IntRange(min=0), default=0, help="Show the top N processes")
+@click.option("--sort", type=click.Choice(["cpu", "rss"]), default="cpu", show_default=True,
+              help="Sort key for --top")
+def live_monitor(interval, fps, max_overhead, per_cpu, disks, nics, top, sort):
     """Display live system monitor (CPU, Memory, Disk, Network)"""
-    with Live(refresh_per_second=4, console=console, screen=True) as live:
-        while True:
-            layout = Layout()
-
-            # CPU
-            cpu_percent = psutil.cpu_percent(interval=None)
-            cpu_bar = make_progress_bar("CPU %", cpu_percent, 100, "%")
-            cpu_bar.add_task("", total=100, completed=cpu_percent)
-
-            # Memory
-            mem = psutil.virtual_memory()
-            mem_bar = make_progress_bar("Memory", mem.used / (1024**3), mem.total / (1024**3), "GB")
-            mem_bar.add_task("", total=mem.total, completed=mem.used)
-
-            # Disk
-            disk = psutil.disk_usage("/")
-            disk_bar = make_progress_bar("Disk", disk.used / (1024**3), disk.total / (1024**3), "GB")
-            disk_bar.add_task("", total=disk.total, completed=disk.used)
-
-            # Network
-            net = psutil.net_io_counters()
-            net_table = Table(title="Network I/O", show_header=True, header_style="bold magenta")
-            net_table.add_column("Sent (MB)", justify="right")
-            net_table.add_column("Received (MB)", justify="right")
-            net_table.add_row(f"{net.bytes_sent / (1024**2):.2f}", f"{net.bytes_recv / (1024**2):.2f}")
-
-            # Layout
-            layout.split_column(
-                Layout(Panel(cpu_bar, title="CPU", border_style="cyan")),
-                Layout(Panel(mem_bar, title="Memory", border_style="magenta")),
-                Layout(Panel(disk_bar, title="Disk", border_style="green")),
-                Layout(Panel(net_table, title="Network", border_style="yellow")),
-            )
-
-            live.update(layout)
-            time.sleep(interval)
+    collector = monitor_utils.Collector(percpu=per_cpu, disks=disks, nics=nics)
+    sampler = monitor_utils.ProcessSampler(top, sort) if top else None
+    meter = monitor_utils.OverheadMeter()
+    cores = (psutil.cpu_count() or 1) if per_cpu else 0
+    dashboard = Dashboard(cores=cores, disks=disks, nics=nics, top=top, sort=sort)
+    procs = None
+    render_every = 1 / fps
+    sample = None
+    dirty = False
+    peak = 0.0
+    rendered = False
+
+    with Live(dashboard.layout, console=console, screen=True, auto_refresh=False) as live:
+        next_sample = next_render = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= next_sample:
+                    sample = collector.sample()
+                    dirty = True
+                    # Skip missed ticks rather than bursting to catch up
+                    next_sample = max(next_sample + interval, now)
+                if dirty and now >= next_render:
+                    overhead = meter.update()
+                    if rendered:  # the first reading includes start-up and is not representative
+                        peak = max(peak, overhead)
+                    rendered = True
+                    if max_overhead is not None:
+                        # Render less often while over budget, recover towards --fps when well under
+                        if overhead > max_overhead:
+                            render_every = min(render_every * 2, 2.0)
+                        elif overhead < max_overhead / 2:
+                            render_every = max(render_every / 2, 1 / fps)
+                    if sampler:
+                        # Sampled per render rather than per tick: the table is the costliest view
+                        procs = sampler.sample()
+                    dashboard.update(sample, overhead, max_overhead, procs)
+                    live.refresh()
+                    dirty = False
+                    next_render = now + render_every
+                wake = next_sample if not dirty else min(next_sample, next_render)
+                time.sleep(max(0.0, wake - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+
+    average = meter.average()
+    if max_overhead is not None and average > max_overhead:
+        console.print(f"[red]Monitor overhead {average:.1f}% CPU exceeded --max-overhead {max_overhead:.1f}% "
+                      f"(peak {peak:.1f}%)[/red]")
+    else:
+        console.print(f"[cyan]Monitor overhead: {average:.1f}% CPU on average (peak {peak:.1f}%)[/cyan]")
+
+
+def _parse_time(value):
+    """ISO 8601 date/time -> epoch seconds"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise click.BadParameter(f"expected an ISO date/time like 2024-05-01T14:30, got {value!r}")
+
+
+def _window(path, since, until, last):
+    """Resolve --since/--until/--last to epoch bounds (--last counts back from the end of the recording)"""
+    since = _parse_time(since) if since else None
+    until = _parse_time(until) if until else None
+    if last:
+        end = until
+        if end is None:
+            end = metrics_utils.last_timestamp(path) or time.time()
+        since = end - metrics_utils.parse_duration(last)
+    return since, until
+
+
+@system_monitor.command("record")
+@click.option("--interval", type=click.FloatRange(min=MIN_INTERVAL), default=1.0, show_default=True,
+              help="Sampling interval in seconds")
+@click.option("--out", "out", default="metrics.bin", show_default=True, help="Metrics file to append to")
+@click.option("--duration", default=None, help="Stop after this long (e.g. 90s, 10m, 2h); default: until Ctrl+C")
+@click.option("--max-size", type=click.IntRange(min=1), default=metrics_utils.MAX_FILE_SIZE // 2**20,
+              show_default=True, help="Rotate the file when it reaches this many MB")
+@click.option("--keep", type=click.IntRange(min=0), default=metrics_utils.KEEP_FILES, show_default=True,
+              help="Rotated files to keep")
+def record(interval, out, duration, max_size, keep):
+    """Record system metrics to a compact binary file (no terminal UI)"""
+    stop_at = time.monotonic() + metrics_utils.parse_duration(duration) if duration else None
+    collector = monitor_utils.Collector()
+    writer = metrics_utils.MetricsWriter(out, interval, max_size=max_size * 2**20, keep=keep)
+    console.print(f"[cyan]Recording every {interval:g}s to {out} (Ctrl+C to stop)[/cyan]")
+    next_sample = time.monotonic() + interval  # the first CPU reading needs one interval to mean anything
+    try:
+        while stop_at is None or time.monotonic() < stop_at:
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+            writer.append(collector.sample())
+            next_sample = max(next_sample + interval, time.monotonic())
+    except KeyboardInterrupt:
+        pass
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+    finally:
+        writer.close()
+    console.print(f"[green]Recorded {writer.rows} sample(s) to {out}[/green]")
+
+
+@system_monitor.command("replay")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--speed", type=click.FloatRange(min=0.01), default=1.0, show_default=True,
+              help="Playback speed multiplier")
+@click.option("--since", default=None, help="Start at this ISO date/time")
+@click.option("--until", default=None, help="Stop at this ISO date/time")
+@click.option("--last", default=None, help="Only the last part of the recording (e.g. 10m)")
+def replay(path, speed, since, until, last):
+    """Play a recording back through the live dashboard"""
+    try:
+        series = metrics_utils.read_series(path, *_window(path, since, until, last))
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    cols = series.columns
+    if not cols["ts"]:
+        console.print("[yellow]No samples in that window.[/yellow]")
+        return
+
+    dashboard = Dashboard()
+    names = [name for name, _ in metrics_utils.COLUMNS]
+    start_ts, start = cols["ts"][0], time.monotonic()
+    with Live(dashboard.layout, console=console, screen=True, auto_refresh=False) as live:
+        try:
+            for i in range(len(cols["ts"])):
+                values = {name: cols[name][i] for name in names}
+                sample = monitor_utils.Sample(mem_total=series.meta["mem_total"],
+                                              disk_total=series.meta["disk_total"], **values)
+                time.sleep(max(0.0, start + (values["ts"] - start_ts) / speed - time.monotonic()))
+                dashboard.update(sample)
+                dashboard.footer.plain = f"replay {datetime.fromtimestamp(values['ts']):%Y-%m-%d %H:%M:%S}  x{speed:g}"
+                live.refresh()
+        except KeyboardInterrupt:
+            pass
+
+
+@system_monitor.command("summarize")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--since", default=None, help="Start of the window (ISO date/time)")
+@click.option("--until", default=None, help="End of the window (ISO date/time)")
+@click.option("--last", default=None, help="Only the last part of the recording (e.g. 10m)")
+def summarize(path, since, until, last):
+    """Show min/avg/p95/p99/max of a recording"""
+    try:
+        series = metrics_utils.read_series(path, *_window(path, since, until, last))
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    ts = series.columns["ts"]
+    if not ts:
+        console.print("[yellow]No samples in that window.[/yellow]")
+        return
+
+    labels = {
+        "cpu": ("CPU %", lambda v: f"{v:.1f}"),
+        "mem_used": ("Memory", monitor_utils.format_bytes),
+        "disk_used": ("Disk used", monitor_utils.format_bytes),
+        "net_sent_rate": ("Net sent", monitor_utils.format_rate),
+        "net_recv_rate": ("Net received", monitor_utils.format_rate),
+    }
+    start, end = datetime.fromtimestamp(ts[0]), datetime.fromtimestamp(ts[-1])
+    table = Table(title=f"{len(ts)} samples, {start:%Y-%m-%d %H:%M:%S} → {end:%H:%M:%S} "
+                        f"({series.meta.get('host', '?')})")
+    table.add_column("Metric", style="cyan")
+    for stat in ("min", "avg", "p95", "p99", "max"):
+        table.add_column(stat, justify="right")
+    for name, stats in metrics_utils.summarize(series).items():
+        label, fmt = labels[name]
+        table.add_row(label, *(fmt(stats[s]) for s in ("min", "avg", "p95", "p99", "max")))
+    console.print(table)
@@ -1,6 +1,20 @@
+import hashlib
+import json
 import os
 import subprocess
 import re
+import time
+from pathlib import Path
+
+from jarvis.utils import diff_utils
+
+AI_MODEL = "gpt-4o-mini"  # try "gpt-3.5-turbo" if not available
+
+# Generated messages are cached by a hash of (normalized diff, model, scope, token budget)
+CACHE_FILE = Path.home() / ".jarvis" / "commit_cache.json"
+CACHE_TTL = 7 * 24 * 3600.0
+CACHE_MAX_ENTRIES = 256
+CACHE_STATS_FILE = Path.home() / ".jarvis" / "commit_cache_stats.json"
 
 
 def get_git_diff(all_changes=False):
@@ -59,14 +73,138 @@ def rule_based_commit(diff: str) -> str:
     return f"{commit_type}: {message}"
 
 
-def ai_commit_message(diff: str, scope=None) -> str:
-    """Use AI (if API key available) to generate commit message"""
+# ----------------- message cache ----------------- #
+
+def _normalize_diff(diff):
+    """Drop what does not change the meaning of a diff: line endings, trailing blanks, index lines"""
+    lines = (line.rstrip() for line in diff.splitlines())
+    return "\n".join(line for line in lines if not line.startswith("index ")).strip()
+
+
+def cache_key(diff, scope=None, token_budget=diff_utils.TOKEN_BUDGET, model=AI_MODEL):
+    h = hashlib.sha256()
+    for part in (model, scope or "", str(token_budget), _normalize_diff(diff)):
+        h.update(part.encode("utf-8", "surrogateescape"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _read_json(path):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return data
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def _write_json(path, data):
+    try:
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")  # concurrent runs never share a temp file
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # the cache is an optimisation only
+
+
+def _load_cache():
+    entries = _read_json(CACHE_FILE).get("entries")
+    return {"entries": entries if isinstance(entries, dict) else {}}
+
+
+def _save_cache(cache):
+    """Drop expired entries, evict least recently used ones beyond CACHE_MAX_ENTRIES, write atomically"""
+    now = time.time()
+    entries = {k: v for k, v in cache["entries"].items() if now - v[1] < CACHE_TTL}
+    if len(entries) > CACHE_MAX_ENTRIES:
+        newest = sorted(entries.items(), key=lambda kv: kv[1][2], reverse=True)[:CACHE_MAX_ENTRIES]
+        entries = dict(newest)
+    cache["entries"] = entries
+    _write_json(CACHE_FILE, cache)
+
+
+def _count(counter):
+    """Hit/miss counters live in their own small file so lookups never rewrite the messages"""
+    stats = _read_json(CACHE_STATS_FILE)
+    stats[counter] = stats.get(counter, 0) + 1
+    _write_json(CACHE_STATS_FILE, stats)
+
+
+def cached_commit_message(diff: str, scope=None, token_budget=diff_utils.TOKEN_BUDGET):
+    """A previously generated message for the same diff/model/scope, or None"""
+    cache = _load_cache()
+    key = cache_key(diff, scope, token_budget)
+    entry = cache["entries"].get(key)
+    now = time.time()
+    if entry is None or now - entry[1] >= CACHE_TTL:
+        _count("misses")
+        if any(now - v[1] >= CACHE_TTL for v in cache["entries"].values()):
+            _save_cache(cache)  # only worth a write when there is something to drop
+        return None
+    entry[2] = now  # [message, created, last used]: refreshes its LRU position
+    _save_cache(cache)
+    _count("hits")
+    return entry[0]
+
+
+def store_commit_message(diff: str, message: str, scope=None, token_budget=diff_utils.TOKEN_BUDGET):
+    cache = _load_cache()
+    now = time.time()
+    cache["entries"][cache_key(diff, scope, token_budget)] = [message, now, now]
+    _save_cache(cache)
+
+
+def cache_stats():
+    cache = _load_cache()
+    counters = _read_json(CACHE_STATS_FILE)
+    now = time.time()
+    live = [v for v in cache["entries"].values() if now - v[1] < CACHE_TTL]
+    return {
+        "path": str(CACHE_FILE),
+        "entries": len(live),
+        "expired": len(cache["entries"]) - len(live),
+        "max_entries": CACHE_MAX_ENTRIES,
+        "ttl": CACHE_TTL,
+        "size": CACHE_FILE.stat().st_size if CACHE_FILE.exists() else 0,
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+        "oldest": min((v[1] for v in live), default=None),
+        "newest": max((v[1] for v in live), default=None),
+    }
+
+
+def clear_cache():
+    """Remove every cached message; returns how many there were"""
+    count = len(_load_cache()["entries"])
+    for path in (CACHE_FILE, CACHE_STATS_FILE):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    return count
+
+
+def diff_context(diff: str, token_budget=diff_utils.TOKEN_BUDGET):
+    """The size-bounded view of the diff that is sent to the model (a DiffContext)"""
+    return diff_utils.build_context(diff, budget=token_budget)
+
+
+def ai_commit_message(diff: str, scope=None, context=None, token_budget=diff_utils.TOKEN_BUDGET,
+                      use_cache=True) -> str:
+    """Use AI (if API key available) to generate commit message; successful results are cached"""
     api_key = os.getenv("OPENAI_API_KEY")
     project = os.getenv("OPENAI_PROJECT")  # optional project-scoped key
 
     if not api_key:
         return None  # No API key
 
+    if context is None:
+        context = diff_context(diff, token_budget)
+
     try:
         from openai import OpenAI
         client = OpenAI(api_key=api_key, project=project) if project else OpenAI(api_key=api_key)
@@ -76,12 +214,15 @@ def ai_commit_message(diff: str, scope=None) -> str:
         in Conventional Commit format (type(scope): message).
         Use: feat, fix, docs, style, refactor, test, chore.
 
+        Lockfiles, binaries and generated files are listed but not shown,
+        and low-priority hunks may be left out to keep the diff short.
+
         Diff:
-        {diff}
+        {context.text}
         """
 
         response = client.chat.completions.create(
-            model="gpt-4o-mini",  # try "gpt-3.5-turbo" if not available
+            model=AI_MODEL,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=60,
             temperature=0.3,
@@ -95,6 +236,8 @@ def ai_commit_message(diff: str, scope=None) -> str:
                 rf"\1({scope}):",
                 message,
             )
+        if use_cache:
+            store_commit_message(diff, message, scope, token_budget)
         return message
 
     except Exception as e:
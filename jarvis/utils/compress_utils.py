@@ -0,0 +1,89 @@
+"""
+Per-chunk compression for file transfers.
+
+Codecs: "zstd" (needs the optional `zstandard` package) and "gzip" (DEFLATE
+via zlib, always available). "auto" picks zstd when it is installed, else
+gzip, and skips chunks whose first COMPRESS_SAMPLE bytes do not shrink below
+SKIP_RATIO (JPEGs, archives, video...), so incompressible data costs one
+small trial compression instead of a full one.
+"""
+import zlib
+
+CODECS = ("auto", "zstd", "gzip", "none")
+COMPRESS_SAMPLE = 64 * 1024
+SKIP_RATIO = 0.9        # auto: sample must compress to under 90% of its size
+ZLIB_LEVEL = 3
+ZSTD_LEVEL = 3
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_codecs():
+    return ["zstd", "gzip"] if _zstd() is not None else ["gzip"]
+
+
+def resolve(compress, supported=None):
+    """
+    Map a --compress value to a codec ("zstd"/"gzip") or None, given the codecs
+    both ends support. Raises ValueError for an explicit codec that is missing.
+    """
+    if not compress or compress == "none":
+        return None
+    supported = [c for c in available_codecs() if supported is None or c in supported]
+    if compress == "auto":
+        return supported[0] if supported else None
+    if compress not in supported:
+        if compress == "zstd" and _zstd() is None:
+            raise ValueError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+        raise ValueError(f"{compress} compression is not supported by the receiver")
+    return compress
+
+
+def sample_ratio(data):
+    """Compressed/raw size of the first COMPRESS_SAMPLE bytes at a fast level"""
+    sample = bytes(data[:COMPRESS_SAMPLE])
+    if not sample:
+        return 1.0
+    return len(zlib.compress(sample, 1)) / len(sample)
+
+
+class Compressor:
+    """Compresses whole chunks; not thread-safe, make one per sending thread"""
+
+    def __init__(self, codec, auto=False):
+        self.codec = codec
+        self.auto = auto
+        self._zstd = _zstd().ZstdCompressor(level=ZSTD_LEVEL) if codec == "zstd" else None
+
+    def compress(self, data):
+        """Return the compressed chunk, or None when sending it raw is better"""
+        if self.auto and sample_ratio(data) > SKIP_RATIO:
+            return None
+        if self._zstd is not None:
+            out = self._zstd.compress(data)
+        else:
+            out = zlib.compress(data, ZLIB_LEVEL)
+        return out if len(out) < len(data) else None
+
+
+def decompress(codec, payload, raw_len):
+    """Decompress one chunk, refusing output larger than raw_len"""
+    if codec == "zstd":
+        zstd = _zstd()
+        if zstd is None:
+            raise ValueError("received zstd data but the 'zstandard' package is not installed")
+        out = zstd.ZstdDecompressor().decompress(payload, max_output_size=raw_len)
+    else:
+        d = zlib.decompressobj()
+        out = d.decompress(payload, raw_len)
+        if d.unconsumed_tail:
+            raise ValueError("compressed chunk is larger than announced")
+    if len(out) != raw_len:
+        raise ValueError(f"compressed chunk decoded to {len(out)} bytes, expected {raw_len}")
+    return out
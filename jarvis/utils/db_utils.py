@@ -1,12 +1,19 @@
 import os
+import atexit
 import json
 import sqlite3
 import csv
 import json as _json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from contextlib import contextmanager, ExitStack
 from pathlib import Path
-from typing import Tuple, List, Optional, Any
+from collections import namedtuple
+from typing import Tuple, List, Optional, Any, Iterable, Iterator
 
 CONFIG_PATH = Path.home() / ".jarvis" / "db_config.json"
+STREAM_BATCH_SIZE = 1000  # rows pulled from the cursor per fetchmany() when streaming
 
 
 # ----------------- config management ----------------- #
@@ -35,7 +42,9 @@ def clear_db_config():
 # ----------------- connection helpers ----------------- #
 
 def _get_sqlite_conn(path: str):
-    conn = sqlite3.connect(path)
+    # check_same_thread=False: pooled connections move between threads (never
+    # concurrently) and search timeouts interrupt them from the caller's thread.
+    conn = sqlite3.connect(path, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -67,14 +76,120 @@ def get_connection(config: Optional[dict] = None):
         raise ValueError("Unsupported db type")
 
 
+# ----------------- connection pooling ----------------- #
+POOL_MAX_CONN = 16
+
+
+class _SqlitePool:
+    """Cache of idle SQLite connections with the getconn/putconn API of psycopg2 pools"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def getconn(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _get_sqlite_conn(self.path)
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.close()
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    def closeall(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class ConnectionManager:
+    """
+    Hands out pooled connections keyed by config: a psycopg2 ThreadedConnectionPool
+    for Postgres and a cache of open connections for SQLite. Connections go back
+    to the pool with any open transaction rolled back.
+    """
+
+    def __init__(self, maxconn: int = POOL_MAX_CONN):
+        self.maxconn = maxconn
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, cfg: dict):
+        key = _json.dumps(cfg, sort_keys=True)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                if cfg["type"] == "sqlite":
+                    pool = _SqlitePool(cfg["path"])
+                elif cfg["type"] == "postgres":
+                    try:
+                        from psycopg2.pool import ThreadedConnectionPool
+                        pool = ThreadedConnectionPool(
+                            1, self.maxconn, host=cfg["host"], port=int(cfg.get("port", 5432)),
+                            user=cfg["user"], password=cfg["password"], dbname=cfg["dbname"],
+                        )
+                    except Exception as e:
+                        raise RuntimeError(f"Failed to import/connect to Postgres: {e}")
+                else:
+                    raise ValueError("Unsupported db type")
+                self._pools[key] = pool
+            return pool
+
+    @contextmanager
+    def connection(self, config: Optional[dict] = None):
+        """Borrow a connection for the duration of the with-block"""
+        cfg = config or load_db_config()
+        if not cfg:
+            raise RuntimeError("No DB config found. Run connect first.")
+        pool = self._pool(cfg)
+        conn = pool.getconn()
+        broken = False
+        try:
+            yield conn
+        finally:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True  # e.g. server went away; don't hand it out again
+            pool.putconn(conn, close=broken)
+
+    def close_all(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.closeall()
+
+
+_manager = ConnectionManager()
+atexit.register(_manager.close_all)
+
+
+def pooled_connection(config: Optional[dict] = None):
+    """Borrow a pooled connection: `with pooled_connection(cfg) as conn: ...`"""
+    return _manager.connection(config)
+
+
+def close_pools():
+    """Close every pooled connection (also runs at interpreter exit)"""
+    _manager.close_all()
+
+
 # ----------------- utility functions ----------------- #
 
 def list_tables(config: Optional[dict] = None) -> List[str]:
-    conn = get_connection(config)
-    try:
-        cfg = config or load_db_config()
+    cfg = config or load_db_config()
+    with pooled_connection(cfg) as conn:
         if cfg["type"] == "sqlite":
-            cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;")
+            cur = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' "
+                "AND name NOT LIKE 'jarvis\\_fts\\_%' ESCAPE '\\' ORDER BY name;"
+            )
             return [row["name"] for row in cur.fetchall()]
         else:  # postgres
             cur = conn.cursor()
@@ -85,17 +200,13 @@ def list_tables(config: Optional[dict] = None) -> List[str]:
                 ORDER BY table_name;
             """)
             return [row[0] for row in cur.fetchall()]
-    finally:
-        conn.close()
 
 
 def run_query(sql: str, config: Optional[dict] = None, fetch_limit: Optional[int] = 500) -> Tuple[List[str], List[Tuple[Any, ...]]]:
     """
     Run a query. Returns (columns, rows). If it's not a SELECT, returns ([], []) and executes DML.
     """
-    conn = get_connection(config)
-    try:
-        cfg = config or load_db_config()
+    with pooled_connection(config) as conn:
         cur = conn.cursor()
         cur.execute(sql)
         # decide if results
@@ -107,73 +218,315 @@ def run_query(sql: str, config: Optional[dict] = None, fetch_limit: Optional[int
             # DML statement executed
             conn.commit()
             return [], []
-    finally:
-        conn.close()
 
 
-def _sqlite_text_columns(conn: sqlite3.Connection, table: str) -> List[str]:
-    cur = conn.execute(f"PRAGMA table_info('{table}')")
-    cols = []
-    for row in cur.fetchall():
-        name = row["name"] if isinstance(row, sqlite3.Row) else row[1]
-        coltype = row["type"] if isinstance(row, sqlite3.Row) else row[2]
-        if coltype and any(t in coltype.upper() for t in ("CHAR", "CLOB", "TEXT")):
-            cols.append(name)
-    return cols
+SEARCH_WORKERS = 8
+FTS_PREFIX = "jarvis_fts_"  # FTS5 shadow index for table T is named jarvis_fts_T
+
+# One per table yielded by iter_search_keyword; method is "fts" or "like"
+SearchResult = namedtuple("SearchResult", ["table", "columns", "rows", "error", "method"])
 
 
-def _postgres_text_columns(conn, table: str) -> List[str]:
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT column_name, data_type
-        FROM information_schema.columns
-        WHERE table_schema = 'public' AND table_name = %s;
-    """, (table,))
-    cols = []
-    for name, data_type in cur.fetchall():
-        if data_type and any(t in data_type for t in ("character varying", "text", "varchar", "char")):
-            cols.append(name)
-    return cols
+def _is_text_type(coltype: Optional[str]) -> bool:
+    coltype = (coltype or "").upper()
+    return any(t in coltype for t in ("CHAR", "CLOB", "TEXT"))
 
 
-def search_keyword(keyword: str, config: Optional[dict] = None, limit_per_table: int = 50) -> dict:
+def text_columns_by_table(conn, db_type: str) -> dict:
     """
-    Search keyword across textual columns in all tables.
-    Returns dict { table_name: (columns, rows) } for matches (rows limited).
+    Return {table: [text columns]} for every table using a single catalog query.
     """
-    cfg = config or load_db_config()
-    conn = get_connection(config)
-    results = {}
-    keyword_like = f"%{keyword}%"
+    if db_type == "sqlite":
+        cur = conn.execute("""
+            SELECT m.name, p.name, p.type
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+              AND m.name NOT LIKE 'jarvis\\_fts\\_%' ESCAPE '\\'
+            ORDER BY m.name, p.cid;
+        """)
+    else:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT c.table_name, c.column_name, c.data_type
+            FROM information_schema.columns c
+            JOIN information_schema.tables t
+              ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+            WHERE c.table_schema = 'public' AND t.table_type = 'BASE TABLE'
+            ORDER BY c.table_name, c.ordinal_position;
+        """)
+    result = {}
+    for table, column, coltype in cur.fetchall():
+        if _is_text_type(coltype):
+            result.setdefault(table, []).append(column)
+    return result
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _scan_table(conn, db_type: str, table: str, text_cols: List[str], keyword: str,
+                limit_per_table: int, statement_timeout: Optional[float] = None, use_fts: bool = False):
+    if use_fts:
+        # Trigram FTS MATCH on a quoted phrase gives the same substring semantics as LIKE
+        method = "fts"
+        fts = _quote_ident(FTS_PREFIX + table)
+        sql = (f"SELECT t.* FROM {_quote_ident(table)} t JOIN {fts} ON {fts}.rowid = t.rowid "
+               f"WHERE {fts} MATCH ? LIMIT {int(limit_per_table)};")
+        params = ['"' + keyword.replace('"', '""') + '"']
+    else:
+        method = "like"
+        placeholder = "?" if db_type == "sqlite" else "%s"
+        where_clauses = " OR ".join([f"{_quote_ident(col)} LIKE {placeholder}" for col in text_cols])
+        sql = f"SELECT * FROM {_quote_ident(table)} WHERE {where_clauses} LIMIT {int(limit_per_table)};"
+        params = [f"%{keyword}%"] * len(text_cols)
+
     try:
-        tables = list_tables(config)
-        for t in tables:
-            text_cols = []
-            if cfg["type"] == "sqlite":
-                text_cols = _sqlite_text_columns(conn, t)
-                placeholder = "?"
+        cur = conn.cursor()
+        if statement_timeout:
+            # Abort this scan if it runs longer than statement_timeout seconds
+            if db_type == "postgres":
+                cur.execute("SET LOCAL statement_timeout = %s", (int(statement_timeout * 1000),))
             else:
-                text_cols = _postgres_text_columns(conn, t)
-                placeholder = "%s"
+                deadline = time.monotonic() + statement_timeout
+                conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cols = [d[0] for d in cur.description]
+        return cols, rows, method
+    finally:
+        if db_type == "postgres":
+            conn.rollback()  # end the read transaction (and SET LOCAL) so the session stays reusable
+        elif statement_timeout:
+            conn.set_progress_handler(None, 0)
 
-            if not text_cols:
-                continue
 
-            where_clauses = " OR ".join([f"{col} LIKE {placeholder}" for col in text_cols])
-            sql = f"SELECT * FROM {t} WHERE {where_clauses} LIMIT {limit_per_table};"
-            params = [keyword_like] * len(text_cols)
-            cur = conn.cursor()
-            cur.execute(sql, params)
-            rows = cur.fetchall()
+def iter_search_keyword(keyword: str, config: Optional[dict] = None, limit_per_table: int = 50,
+                        workers: int = SEARCH_WORKERS, timeout: Optional[float] = None,
+                        statement_timeout: Optional[float] = None):
+    """
+    Search keyword across textual columns in all tables concurrently.
+    Text columns come from one catalog query; per-table scans run on a bounded
+    thread pool, each worker holding one pooled connection. On SQLite, tables with an FTS5
+    index (see build_fts_index) are searched with MATCH instead of a LIKE scan.
+    Yields a SearchResult as each table finishes (error is None on success; only
+    tables with matches or errors are yielded). Raises TimeoutError once `timeout`
+    seconds have elapsed, after cancelling the scans still in flight.
+    """
+    cfg = config or load_db_config()
+    if not cfg:
+        raise RuntimeError("No DB config found. Run connect first.")
+    db_type = cfg["type"]
+
+    with pooled_connection(cfg) as conn:
+        columns = text_columns_by_table(conn, db_type)
+        # Trigram tokens need at least 3 characters; shorter keywords use LIKE
+        fts_tables = set(_fts_indexed_tables(conn)) if db_type == "sqlite" and len(keyword) >= 3 else set()
+    if not columns:
+        return
+
+    local = threading.local()
+    worker_conns = []
+    borrowed = ExitStack()  # returns every worker connection to the pool at the end
+    lock = threading.Lock()
+
+    def _worker_conn():
+        if not hasattr(local, "conn"):
+            with lock:
+                local.conn = borrowed.enter_context(pooled_connection(cfg))
+                worker_conns.append(local.conn)
+        return local.conn
+
+    def _task(table, text_cols):
+        return _scan_table(_worker_conn(), db_type, table, text_cols, keyword, limit_per_table,
+                           statement_timeout, use_fts=table in fts_tables)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(columns), _manager.maxconn)))
+    futures = {pool.submit(_task, t, cols): t for t, cols in columns.items()}
+    try:
+        for fut in as_completed(futures, timeout=timeout):
+            table = futures[fut]
+            try:
+                cols, rows, method = fut.result()
+            except Exception as e:
+                yield SearchResult(table, [], [], str(e), "fts" if table in fts_tables else "like")
+                continue
             if rows:
-                cols = [d[0] for d in cur.description]
-                results[t] = (cols, rows)
-        return results
+                yield SearchResult(table, cols, rows, None, method)
+    except FuturesTimeout:
+        raise TimeoutError(f"search timed out after {timeout}s")
     finally:
-        conn.close()
+        if not all(fut.done() for fut in futures):
+            # Timed out or the caller stopped early: drop queued scans, abort running ones
+            for fut in futures:
+                fut.cancel()
+            with lock:
+                for c in worker_conns:
+                    try:
+                        c.cancel() if db_type == "postgres" else c.interrupt()
+                    except Exception:
+                        pass
+        pool.shutdown(wait=True)
+        borrowed.close()
+
+
+def search_keyword(keyword: str, config: Optional[dict] = None, limit_per_table: int = 50, **kwargs) -> dict:
+    """
+    Search keyword across textual columns in all tables.
+    Returns dict { table_name: (columns, rows) } for matches (rows limited).
+    """
+    results = {}
+    for res in iter_search_keyword(keyword, config, limit_per_table, **kwargs):
+        if res.error is None:
+            results[res.table] = (res.columns, res.rows)
+    return results
+
+
+# ----------------- SQLite full-text index ----------------- #
+
+def _fts_indexed_tables(conn) -> List[str]:
+    """Base tables that have a jarvis FTS5 shadow index"""
+    cur = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND sql LIKE 'CREATE VIRTUAL TABLE%' "
+        "AND name LIKE 'jarvis\\_fts\\_%' ESCAPE '\\'"
+    )
+    return [row[0][len(FTS_PREFIX):] for row in cur.fetchall()]
+
+
+def _require_sqlite(cfg: Optional[dict]) -> dict:
+    cfg = cfg or load_db_config()
+    if not cfg:
+        raise RuntimeError("No DB config found. Run connect first.")
+    if cfg["type"] != "sqlite":
+        raise RuntimeError("Full-text indexes are only supported for SQLite")
+    return cfg
+
+
+def _drop_fts(conn, table: str):
+    fts = FTS_PREFIX + table
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {_quote_ident(fts + '_' + suffix)}")
+    conn.execute(f"DROP TABLE IF EXISTS {_quote_ident(fts)}")
 
 
-def export_results(columns: List[str], rows: List[tuple], outpath: str, format: str = "csv"):
+def build_fts_index(tables: Optional[List[str]] = None, config: Optional[dict] = None) -> dict:
+    """
+    Create (or rebuild) an FTS5 trigram index over the text columns of each table.
+    The index is an external-content table kept current by insert/update/delete
+    triggers, so it only needs rebuilding when the table's columns change.
+    Returns {table: [indexed columns]}.
+    """
+    cfg = _require_sqlite(config)
+    with pooled_connection(cfg) as conn:
+        columns = text_columns_by_table(conn, "sqlite")
+        targets = tables or sorted(columns)
+        built = {}
+        with conn:
+            for table in targets:
+                cols = columns.get(table)
+                if not cols:
+                    raise ValueError(f"Table '{table}' not found or has no text columns")
+                fts = _quote_ident(FTS_PREFIX + table)
+                base = _quote_ident(table)
+                col_list = ", ".join(_quote_ident(c) for c in cols)
+                new_vals = ", ".join(f"new.{_quote_ident(c)}" for c in cols)
+                old_vals = ", ".join(f"old.{_quote_ident(c)}" for c in cols)
+
+                _drop_fts(conn, table)
+                try:
+                    conn.execute(
+                        f"CREATE VIRTUAL TABLE {fts} USING fts5({col_list}, "
+                        f"content={_quote_ident(table)}, content_rowid='rowid', tokenize='trigram')"
+                    )
+                except sqlite3.OperationalError as e:
+                    raise RuntimeError(f"SQLite FTS5 with the trigram tokenizer is not available: {e}")
+                conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+                trig = FTS_PREFIX + table
+                conn.execute(
+                    f"CREATE TRIGGER {_quote_ident(trig + '_ai')} AFTER INSERT ON {base} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_vals}); END"
+                )
+                conn.execute(
+                    f"CREATE TRIGGER {_quote_ident(trig + '_ad')} AFTER DELETE ON {base} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_vals}); END"
+                )
+                conn.execute(
+                    f"CREATE TRIGGER {_quote_ident(trig + '_au')} AFTER UPDATE ON {base} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_vals}); "
+                    f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_vals}); END"
+                )
+                built[table] = cols
+        return built
+
+
+def list_fts_indexes(config: Optional[dict] = None) -> List[str]:
+    cfg = _require_sqlite(config)
+    with pooled_connection(cfg) as conn:
+        return sorted(_fts_indexed_tables(conn))
+
+
+def drop_fts_index(tables: Optional[List[str]] = None, config: Optional[dict] = None) -> List[str]:
+    """Drop the FTS index (and its triggers) for the given tables, or all of them"""
+    cfg = _require_sqlite(config)
+    with pooled_connection(cfg) as conn:
+        existing = _fts_indexed_tables(conn)
+        targets = [t for t in (tables or existing) if t in existing]
+        with conn:
+            for table in targets:
+                _drop_fts(conn, table)
+        return targets
+
+
+@contextmanager
+def stream_query(sql: str, config: Optional[dict] = None, fetch_limit: Optional[int] = None,
+                 batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Tuple[List[str], Iterator[tuple]]]:
+    """
+    Run a SELECT and yield (columns, rows) where rows is a lazy iterator that
+    pulls batch_size rows at a time, so memory stays flat for any result size.
+    Postgres uses a named (server-side) cursor; SQLite cursors already stream.
+    fetch_limit of None/0 means unbounded.
+
+        with stream_query("SELECT * FROM sales") as (cols, rows):
+            export_results(cols, rows, "sales.csv")
+    """
+    cfg = config or load_db_config()
+    with pooled_connection(cfg) as conn:
+        if cfg["type"] == "postgres":
+            cur = conn.cursor(name="jarvis_stream")
+            cur.itersize = batch_size
+        else:
+            cur = conn.cursor()
+        try:
+            cur.execute(sql)
+
+            # Named cursors only expose description after the first fetch
+            first = cur.fetchmany(batch_size)
+            cols = [col[0] for col in cur.description] if cur.description else []
+
+            def _rows():
+                remaining = fetch_limit or None
+                batch = first
+                while batch:
+                    if remaining is not None:
+                        batch = batch[:remaining]
+                        remaining -= len(batch)
+                    for row in batch:
+                        yield row
+                    if remaining == 0:
+                        return
+                    batch = cur.fetchmany(batch_size)
+
+            yield cols, _rows()
+        finally:
+            cur.close()
+
+
+def export_results(columns: List[str], rows: Iterable[tuple], outpath: str, format: str = "csv"):
+    """
+    Write rows to outpath as csv, json (array) or ndjson (one object per line).
+    Rows are consumed one at a time, so rows may be a stream_query() iterator.
+    """
     outpath = Path(outpath)
     if format == "csv":
         with open(outpath, "w", newline="", encoding="utf-8") as f:
@@ -182,11 +535,21 @@ def export_results(columns: List[str], rows: List[tuple], outpath: str, format:
             for r in rows:
                 writer.writerow([_serialize_cell(c) for c in r])
     elif format == "json":
-        arr = [dict(zip(columns, [_serialize_cell(c) for c in r])) for r in rows]
         with open(outpath, "w", encoding="utf-8") as f:
-            _json.dump(arr, f, indent=2, default=str)
+            f.write("[")
+            sep = "\n  "
+            for r in rows:
+                f.write(sep)
+                f.write(_json.dumps(dict(zip(columns, [_serialize_cell(c) for c in r])), default=str))
+                sep = ",\n  "
+            f.write("\n]\n")
+    elif format == "ndjson":
+        with open(outpath, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(_json.dumps(dict(zip(columns, [_serialize_cell(c) for c in r])), default=str))
+                f.write("\n")
     else:
-        raise ValueError("Unsupported export format; choose csv or json.")
+        raise ValueError("Unsupported export format; choose csv, json or ndjson.")
     return outpath
 
 
@@ -0,0 +1,169 @@
+"""
+Block signatures and rsync-style deltas for file transfers.
+
+A signature is one (weak, strong) pair per BLOCK_SIZE block of a file: weak
+is Adler-32 (the rolling checksum rsync's is based on, computed by zlib at C
+speed), strong a 64-bit BLAKE2b digest. compute_delta()
+scans a new file against the signature of an old one and yields copy/data
+operations; only the data operations need to cross the wire.
+
+The scan first checks the block at the current position directly (one C-speed
+hash per block, which covers unchanged files and in-place edits). Only on a
+miss does it roll the weak checksum byte by byte through the next block to
+find shifted content (insertions and deletions). Rolling is pure Python, so
+after ROLL_GIVE_UP consecutive misses the region is treated as new data and
+rolling pauses until a block matches again.
+"""
+import hashlib
+import os
+import zlib
+from itertools import accumulate
+
+BLOCK_SIZE = 128 * 1024
+ROLL_GIVE_UP = 8
+_ADLER_MOD = 65521
+
+
+def strong_hash(data) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def weak_sum(data) -> int:
+    return zlib.adler32(data)
+
+
+def file_signature(path, block_size: int = BLOCK_SIZE):
+    """Return [(weak, strong)] for each block of path"""
+    sig = []
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sig.append((weak_sum(block), strong_hash(block)))
+    return sig
+
+
+def block_hashes(path, block_size: int = BLOCK_SIZE):
+    """Strong hash per block only (what journals store for remote delta)"""
+    with open(path, "rb") as f:
+        return [strong_hash(block) for block in iter(lambda: f.read(block_size), b"")]
+
+
+def _roll_search(window, block_size, weak_index, strong_of, limit):
+    """
+    Find the first offset k in [1, limit] where window[k:k+block_size] matches a
+    signature block. Adler-32 of every window comes from prefix sums built with
+    itertools.accumulate (A = 1 + sum x, B = n + sum (n - i) x_i), so the
+    per-offset Python work is a few integer ops.
+    Returns (k, old_block_index) or None.
+    """
+    n = len(window)
+    limit = min(limit, n - block_size)
+    if limit < 1:
+        return None
+    p = [0, *accumulate(window)]
+    q = [0, *accumulate(i * x for i, x in enumerate(window))]
+    for k in range(1, limit + 1):
+        end = k + block_size
+        s = p[end] - p[k]
+        a = (1 + s) % _ADLER_MOD
+        b = (block_size + end * s - (q[end] - q[k])) % _ADLER_MOD
+        candidates = weak_index.get(a | (b << 16))
+        if candidates:
+            strong = strong_of(k)
+            for idx in candidates:
+                if strong == idx[1]:
+                    return k, idx[0]
+    return None
+
+
+def compute_delta(path, signature, block_size: int = BLOCK_SIZE):
+    """
+    Yield ("copy", new_offset, length, old_offset) and ("data", new_offset, length)
+    operations that rebuild path from the file described by signature.
+    Adjacent operations of the same kind are merged.
+    """
+    strong_to_block = {}
+    weak_index = {}
+    for i, (weak, strong) in enumerate(signature):
+        strong_to_block.setdefault(strong, i)
+        weak_index.setdefault(weak, []).append((i, strong))
+
+    size = os.path.getsize(path)
+    pending = None  # op being extended
+
+    def emit(op):
+        nonlocal pending
+        if pending and pending[0] == op[0]:
+            if op[0] == "data" and pending[1] + pending[2] == op[1]:
+                pending = ("data", pending[1], pending[2] + op[2])
+                return None
+            if op[0] == "copy" and pending[1] + pending[2] == op[1] and pending[3] + pending[2] == op[3]:
+                pending = ("copy", pending[1], pending[2] + op[2], pending[3])
+                return None
+        out, pending = pending, op
+        return out
+
+    with open(path, "rb") as f:
+        buf = b""
+        buf_start = 0  # file offset of buf[0]
+        pos = 0
+        misses = 0
+        while pos < size:
+            # Keep at least two blocks ahead of pos in memory
+            if pos - buf_start + 2 * block_size > len(buf):
+                buf = buf[pos - buf_start:] + f.read(8 * block_size)
+                buf_start = pos
+            rel = pos - buf_start
+            block = buf[rel:rel + block_size]
+            length = len(block)
+
+            # A short tail block can only equal the old file's (short) last block
+            old = strong_to_block.get(strong_hash(block))
+            if old is not None:
+                out = emit(("copy", pos, length, old * block_size))
+                if out:
+                    yield out
+                pos += length
+                misses = 0
+                continue
+
+            found = None
+            if misses < ROLL_GIVE_UP and length == block_size:
+                window = buf[rel:rel + 2 * block_size]
+                found = _roll_search(window, block_size, weak_index,
+                                     lambda k: strong_hash(window[k:k + block_size]), block_size)
+            if found:
+                k, old = found
+                for op in (("data", pos, k), ("copy", pos + k, block_size, old * block_size)):
+                    out = emit(op)
+                    if out:
+                        yield out
+                pos += k + block_size
+                misses = 0
+            else:
+                out = emit(("data", pos, length))
+                if out:
+                    yield out
+                pos += length
+                misses += 1
+    if pending:
+        yield pending
+
+
+def apply_delta(new_path, old_path, out_path, ops):
+    """Write out_path from ops: copies come from old_path, data from new_path"""
+    with open(new_path, "rb") as new, open(old_path, "rb") as old, open(out_path, "wb") as out:
+        for op in ops:
+            if op[0] == "copy":
+                _, _, length, old_offset = op
+                old.seek(old_offset)
+                src = old
+            else:
+                _, offset, length = op
+                new.seek(offset)
+                src = new
+            while length:
+                chunk = src.read(min(length, 1024 * 1024))
+                if not chunk:
+                    raise IOError("source shorter than expected while applying delta")
+                out.write(chunk)
+                length -= len(chunk)
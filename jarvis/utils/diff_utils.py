@@ -0,0 +1,258 @@
+"""
+Diff preprocessing for `commit-helper generate`.
+
+parse_diff() walks a unified diff once, line by line, and splits it into
+per-file FileDiff records holding their hunks and +/- counts. build_context()
+turns those into the text sent to the model within a token budget:
+
+  * lockfiles, binaries and generated/vendored files are reduced to a
+    one-line summary (path and line counts);
+  * every other file gets a header line, so the model sees the full list of
+    touched files even when most hunks are left out;
+  * hunks are ranked (source over tests over docs/config, definitions and
+    small focused hunks first) and packed greedily until the budget is used,
+    then printed back in diff order.
+
+Token counts come from estimate_tokens(), a length-based estimate that is
+close enough for budgeting and needs no tokenizer.
+"""
+import os
+import re
+from collections import namedtuple
+
+TOKEN_BUDGET = 3000
+CHARS_PER_TOKEN = 4
+
+LOCKFILES = {
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock",
+    "Pipfile.lock", "uv.lock", "pdm.lock", "Cargo.lock", "Gemfile.lock", "composer.lock",
+    "go.sum", "packages.lock.json", "flake.lock", "mix.lock", "pubspec.lock", "Podfile.lock",
+}
+GENERATED_SUFFIXES = (
+    ".min.js", ".min.css", ".map", "_pb2.py", "_pb2_grpc.py", ".pb.go", ".pb.h", ".pb.cc",
+    ".g.dart", ".designer.cs", ".snap",
+)
+GENERATED_DIRS = ("node_modules/", "vendor/", "third_party/", "dist/", "build/", "__generated__/", "site-packages/")
+GENERATED_MARKERS = ("@generated", "do not edit", "autogenerated", "auto-generated", "generated by")
+BINARY_SUFFIXES = (
+    ".png", ".jpg", ".jpeg", ".gif", ".ico", ".pdf", ".zip", ".gz", ".tar", ".whl", ".jar",
+    ".so", ".dll", ".exe", ".pyc", ".woff", ".woff2", ".ttf", ".db", ".sqlite",
+)
+
+SOURCE_SUFFIXES = (
+    ".py", ".js", ".ts", ".tsx", ".jsx", ".go", ".rs", ".java", ".kt", ".c", ".h", ".cpp",
+    ".hpp", ".cs", ".rb", ".php", ".swift", ".scala", ".sh", ".sql",
+)
+DOC_SUFFIXES = (".md", ".rst", ".txt", ".adoc")
+DEFINITION = re.compile(r"^[+-]\s*(async\s+def|def|class|function|func|fn|pub\s+fn|interface|struct|type)\b")
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+Hunk = namedtuple("Hunk", "file index header lines added removed")
+DiffContext = namedtuple("DiffContext", "text tokens raw_tokens files hunks_sent hunks_total summarized")
+
+
+class FileDiff:
+    """One file's part of a diff"""
+
+    __slots__ = ("path", "old_path", "status", "binary", "hunks", "added", "removed", "generated")
+
+    def __init__(self, path):
+        self.path = path
+        self.old_path = path
+        self.status = "modified"
+        self.binary = False
+        self.generated = False
+        self.hunks = []
+        self.added = 0
+        self.removed = 0
+
+    @property
+    def kind(self):
+        """'lockfile', 'binary', 'generated' or 'source'/'test'/'docs'/'other'"""
+        name = os.path.basename(self.path)
+        path = self.path.replace("\\", "/")
+        if name in LOCKFILES:
+            return "lockfile"
+        if self.binary or path.lower().endswith(BINARY_SUFFIXES):
+            return "binary"
+        if self.generated or path.endswith(GENERATED_SUFFIXES) or any(
+                path.startswith(d) or f"/{d}" in path for d in GENERATED_DIRS):
+            return "generated"
+        if path.startswith(("tests/", "test/")) or "/tests/" in path or name.startswith("test_") or \
+                name.endswith(("_test.py", "_test.go", ".test.js", ".test.ts", "_spec.js", ".spec.ts")):
+            return "test"
+        if path.endswith(DOC_SUFFIXES):
+            return "docs"
+        if path.endswith(SOURCE_SUFFIXES):
+            return "source"
+        return "other"
+
+    @property
+    def summarized(self):
+        return self.kind in ("lockfile", "binary", "generated")
+
+    def header(self):
+        label = {"renamed": f"{self.old_path} -> {self.path}"}.get(self.status, self.path)
+        return f"{self.status} {label} (+{self.added} -{self.removed})"
+
+
+def _strip_prefix(path):
+    path = path.strip()
+    if path.startswith('"') and path.endswith('"'):
+        path = path[1:-1]
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def parse_diff(diff):
+    """Split a unified diff (string or iterable of lines) into FileDiff records in one pass"""
+    lines = diff.splitlines() if isinstance(diff, str) else diff
+    files = []
+    current = None
+    hunk = None   # [header, lines, added, removed]
+    in_header = False  # between "diff --git" and the first hunk
+
+    def close_hunk():
+        if hunk is not None:
+            current.hunks.append(Hunk(current, len(current.hunks), hunk[0], hunk[1], hunk[2], hunk[3]))
+
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.startswith("diff --git "):
+            if current is not None:
+                close_hunk()
+            hunk = None
+            # "diff --git a/x b/x": the b/ path is refined by the ---/+++ or rename lines below
+            parts = line[len("diff --git "):].rsplit(" b/", 1)
+            current = FileDiff(parts[-1] if len(parts) == 2 else _strip_prefix(line.split()[-1]))
+            if len(parts) == 2:
+                current.old_path = _strip_prefix(parts[0])
+            files.append(current)
+            in_header = True
+            continue
+        if current is None:
+            continue
+        if in_header:
+            if line.startswith("@@"):
+                in_header = False
+            elif line.startswith("new file mode"):
+                current.status = "added"
+                continue
+            elif line.startswith("deleted file mode"):
+                current.status = "deleted"
+                continue
+            elif line.startswith("rename from "):
+                current.status, current.old_path = "renamed", line[len("rename from "):]
+                continue
+            elif line.startswith("rename to "):
+                current.path = line[len("rename to "):]
+                continue
+            elif line.startswith("Binary files ") or line.startswith("GIT binary patch"):
+                current.binary = True
+                continue
+            elif line.startswith("--- "):
+                if line[4:] != "/dev/null":
+                    current.old_path = _strip_prefix(line[4:])
+                continue
+            elif line.startswith("+++ "):
+                if line[4:] != "/dev/null":
+                    current.path = _strip_prefix(line[4:])
+                continue
+            else:
+                continue  # index, mode and similarity lines
+        if line.startswith("@@"):
+            close_hunk()
+            hunk = [line, [], 0, 0]
+            continue
+        if hunk is None:
+            continue
+        hunk[1].append(line)
+        if line.startswith("+"):
+            hunk[2] += 1
+            current.added += 1
+            if not current.generated and len(current.hunks) == 0 and len(hunk[1]) <= 10:
+                current.generated = any(m in line.lower() for m in GENERATED_MARKERS)
+        elif line.startswith("-"):
+            hunk[3] += 1
+            current.removed += 1
+    if current is not None:
+        close_hunk()
+    return files
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for code and English)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+_KIND_WEIGHT = {"source": 4.0, "other": 2.5, "test": 2.0, "docs": 1.5}
+
+
+def score_hunk(hunk):
+    """Higher is more useful to describe the change per token spent"""
+    changed = hunk.added + hunk.removed
+    if changed == 0:
+        return 0.0
+    score = _KIND_WEIGHT.get(hunk.file.kind, 1.0)
+    if any(DEFINITION.match(line) for line in hunk.lines):
+        score *= 1.5
+    if hunk.index == 0:
+        score *= 1.2  # imports and module headers often say what the file is about
+    # diminishing returns for long hunks: prefer several focused hunks over one big one
+    return score / (1 + len(hunk.lines) / 40)
+
+
+def _hunk_text(hunk):
+    return "\n".join([hunk.header] + hunk.lines)
+
+
+def build_context(diff, budget=TOKEN_BUDGET):
+    """Summarize and pack a diff into at most budget estimated tokens (a DiffContext)"""
+    files = parse_diff(diff)
+    raw_tokens = estimate_tokens(diff) if isinstance(diff, str) else None
+    summarized = [f for f in files if f.summarized]
+    kept = [f for f in files if not f.summarized]
+
+    header_lines = [f"{f.header()} [{f.kind}, omitted]" for f in summarized]
+    header_lines += [f.header() for f in kept]
+    # every string that ends up in the text is charged, with one token per joining newline(s)
+    used = estimate_tokens("Changed files:") + 1 if header_lines else 0
+    for n, line in enumerate(header_lines):
+        if used + estimate_tokens(line) + 1 > budget // 2:  # keep at least half of the budget for hunks
+            header_lines[n:] = [f"... {len(header_lines) - n} more file(s)"]
+            used += estimate_tokens(header_lines[n]) + 1
+            break
+        used += estimate_tokens(line) + 1
+
+    candidates = [h for f in kept for h in f.hunks]
+    candidates.sort(key=score_hunk, reverse=True)
+    chosen = set()
+    started = set()
+    for hunk in candidates:
+        f = hunk.file
+        cost = estimate_tokens(_hunk_text(hunk)) + 1
+        if id(f) not in started:
+            # the file's "--- path" line, plus its "... N more hunk(s) omitted" note if it may need one
+            cost += estimate_tokens(f"--- {f.path}") + 1
+            if len(f.hunks) > 1:
+                cost += estimate_tokens(f"... {len(f.hunks)} more hunk(s) omitted") + 1
+        if used + cost > budget:
+            continue  # a smaller, lower-ranked hunk may still fit
+        used += cost
+        started.add(id(f))
+        chosen.add((id(f), hunk.index))
+
+    sections = []
+    if header_lines:
+        sections.append("Changed files:\n" + "\n".join(header_lines))
+    for f in kept:
+        hunks = [h for h in f.hunks if (id(f), h.index) in chosen]
+        if not hunks:
+            continue
+        body = [f"--- {f.path}"] + [_hunk_text(h) for h in hunks]
+        left_out = len(f.hunks) - len(hunks)
+        if left_out:
+            body.append(f"... {left_out} more hunk(s) omitted")
+        sections.append("\n".join(body))
+    text = "\n\n".join(sections)
+    return DiffContext(text, estimate_tokens(text), raw_tokens, len(files), len(chosen), len(candidates),
+                       len(summarized))
@@ -1,35 +1,75 @@
+import hashlib
 import os
 import shutil
 import socket
 import json
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-import paramiko   # for SFTP
-import smbprotocol  # for SMB (Windows shares)
+from jarvis.utils import delta_utils, lan_utils
+from jarvis.utils.journal_utils import TransferJournal
+
+# paramiko (via sftp_utils) and smbprotocol are imported inside remote_transfer:
+# they are slow to import and only the remote mode needs them.
 
 CONFIG_FILE = Path.home() / ".jarvis" / "file_transfer.json"
-BUFFER_SIZE = 4096
 
 
 # ----------------- CONFIG MANAGEMENT ----------------- #
 
-def save_config(config: dict):
-    """Save transfer config to ~/.jarvis/file_transfer.json"""
+# The file holds named profiles: {"profiles": {"default": {...}, "backup": {...}}}.
+# A file written by older versions (one bare config) is read as the default profile.
+
+DEFAULT_PROFILE = "default"
+
+
+def list_profiles() -> dict:
+    """Return {profile name: config}"""
+    if not CONFIG_FILE.exists():
+        return {}
+    with open(CONFIG_FILE, "r") as f:
+        data = json.load(f)
+    if "profiles" not in data:
+        return {DEFAULT_PROFILE: data} if data else {}
+    return data["profiles"]
+
+
+def _write_profiles(profiles: dict):
     CONFIG_FILE.parent.mkdir(exist_ok=True)
     with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
+        json.dump({"profiles": profiles}, f, indent=4)
 
 
-def load_config():
-    """Load saved transfer config"""
-    if CONFIG_FILE.exists():
-        with open(CONFIG_FILE, "r") as f:
-            return json.load(f)
-    return None
+def save_config(config: dict, profile: str = DEFAULT_PROFILE):
+    """Save a transfer profile to ~/.jarvis/file_transfer.json"""
+    profiles = list_profiles()
+    profiles[profile] = config
+    _write_profiles(profiles)
+
+
+def load_config(profile: str = DEFAULT_PROFILE):
+    """Load a saved transfer profile"""
+    return list_profiles().get(profile)
 
 
-def setup_transfer(mode, source, destination=None, ip=None, username=None, password=None, protocol="sftp"):
-    """Store a transfer setup configuration"""
+def delete_profile(profile: str) -> bool:
+    profiles = list_profiles()
+    if profile not in profiles:
+        return False
+    del profiles[profile]
+    if profiles:
+        _write_profiles(profiles)
+    else:
+        CONFIG_FILE.unlink()
+    return True
+
+
+def setup_transfer(mode, source, destination=None, ip=None, username=None, password=None, protocol="sftp",
+                   streams=None, buffer_size=None, delta=False, workers=None, checksum=False, channels=None,
+                   compress="none", profile=DEFAULT_PROFILE):
+    """Store a transfer setup configuration under a profile name"""
     config = {
         "mode": mode,            # local | network | remote
         "protocol": protocol,    # sftp | smb
@@ -38,94 +78,480 @@ def setup_transfer(mode, source, destination=None, ip=None, username=None, passw
         "ip": ip,
         "username": username,
         "password": password,
+        "delta": delta,          # send only changed blocks of files that already exist
     }
-    save_config(config)
+    if mode in ("network", "remote"):
+        config["compress"] = compress  # auto | zstd | gzip | none
+    if mode == "network":
+        config["streams"] = streams or lan_utils.DEFAULT_STREAMS
+        config["buffer_size"] = buffer_size or lan_utils.BUFFER_SIZE
+    if mode == "remote" and channels:
+        config["channels"] = channels
+    if mode == "local":
+        config["workers"] = workers or LOCAL_WORKERS
+        config["checksum"] = checksum
+    save_config(config, profile)
     return config
 
 
+TransferResult = namedtuple("TransferResult", "mode protocol path stats")
+
+
+def run_transfer(config, source=None, compress=None, meter=None, log=None):
+    """
+    Run the transfer a profile describes (source overrides the saved one).
+    Remote transfers fall back to the other protocol; log(message) hears about it.
+    Returns TransferResult; raises on failure.
+    """
+    source = source or config["source"]
+    mode = config["mode"]
+    delta = config.get("delta", False)
+    compress = compress or config.get("compress", "none")
+
+    if mode == "local":
+        stats = local_transfer(
+            source,
+            config["destination"],
+            delta=delta,
+            workers=config.get("workers", LOCAL_WORKERS),
+            checksum=config.get("checksum", False),
+            meter=meter,
+        )
+        return TransferResult(mode, None, config["destination"], stats)
+
+    if mode == "network":
+        send_file_network(
+            source,
+            config["ip"],
+            streams=config.get("streams", lan_utils.DEFAULT_STREAMS),
+            buffer_size=config.get("buffer_size", lan_utils.BUFFER_SIZE),
+            delta=delta,
+            compress=compress,
+            meter=meter,
+        )
+        return TransferResult(mode, None, config["ip"], None)
+
+    if mode == "remote":
+        protocol = config.get("protocol", "sftp")
+        fallback = "smb" if protocol == "sftp" else "sftp"
+        for attempt in (protocol, fallback):
+            try:
+                remote_path = remote_transfer(
+                    source,
+                    config["destination"],
+                    config["ip"],
+                    config["username"],
+                    config["password"],
+                    attempt,
+                    delta=delta,
+                    channels=config.get("channels"),
+                    compress=compress,
+                    meter=meter,
+                )
+                return TransferResult(mode, attempt, remote_path, None)
+            except Exception as e:
+                if attempt == fallback:
+                    raise RuntimeError(f"Transfer failed with both protocols: {e}")
+                if log:
+                    log(f"[yellow]Transfer via {protocol.upper()} failed: {e}[/yellow]")
+                    log(f"[cyan]Trying fallback protocol: {fallback.upper()}[/cyan]")
+
+    raise ValueError("Invalid transfer mode")
+
+
+# ----------------- RESUMABLE / DELTA COPY ----------------- #
+# Files of at least RESUME_MIN_SIZE are written to "<dest>.jvpart" block by
+# block while a journal (journal_utils) records the verified offset and the
+# hash of every block. A rerun after an interruption resumes from that offset
+# (after re-checking the last block); with delta=True a rerun sends only the
+# blocks that changed. Smaller files are simply copied again.
+
+RESUME_MIN_SIZE = 8 * 1024 * 1024
+PART_SUFFIX = ".jvpart"
+
+
+class LocalFS:
+    """Destination filesystem for local paths (and SMB UNC paths)"""
+
+    id = "local"
+
+    def open(self, path, mode):
+        return open(path, mode)
+
+    def stat(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return [st.st_size, st.st_mtime]
+
+    def replace(self, src, dst):
+        os.replace(src, dst)
+
+
+class SftpFS:
+    """Destination filesystem over an open paramiko SFTPClient"""
+
+    def __init__(self, sftp, host):
+        self.sftp = sftp
+        self.id = f"sftp://{host}"
+
+    def open(self, path, mode):
+        f = self.sftp.open(path, mode.replace("b", ""))
+        if "r" not in mode or "+" in mode:
+            f.set_pipelined(True)  # don't wait for an ack per write
+        return f
+
+    def stat(self, path):
+        try:
+            st = self.sftp.stat(path)
+        except FileNotFoundError:
+            return None
+        return [st.st_size, st.st_mtime]
+
+    def replace(self, src, dst):
+        try:
+            self.sftp.posix_rename(src, dst)
+        except IOError:
+            # server without the posix-rename extension
+            if self.stat(dst) is not None:
+                self.sftp.remove(dst)
+            self.sftp.rename(src, dst)
+
+
+def _rolling_delta_local(src, dst, part):
+    """Local destination: rebuild dst from its own blocks plus changed data (rsync)"""
+    ops = list(delta_utils.compute_delta(src, delta_utils.file_signature(dst)))
+    delta_utils.apply_delta(src, dst, part, ops)
+    return sum(op[2] for op in ops if op[0] == "data")
+
+
+def _copy_stream(fin, fout, meter=None):
+    """copyfileobj that reports every 1 MiB written to meter(nbytes)"""
+    if meter is None:
+        shutil.copyfileobj(fin, fout, 1024 * 1024)
+        return
+    for data in iter(lambda: fin.read(1024 * 1024), b""):
+        fout.write(data)
+        meter(len(data))
+
+
+def transfer_file(src, dst, fs=None, delta=False, meter=None):
+    """
+    Copy src to dst on fs with resume support; returns the number of bytes written.
+
+    - Full copy: blocks go to dst + PART_SUFFIX and the journal checkpoints the
+      offset; a rerun of an interrupted copy continues from the last verified block.
+    - delta=True, local fs: rsync-style rolling delta against the existing dst.
+    - delta=True, remote fs: the journal of the last successful transfer holds
+      the hashes of what dst contains (checked against its size/mtime); only
+      blocks whose hash changed are rewritten in place.
+
+    meter(nbytes), if given, is called as data is written (progress / rate limits).
+    """
+    fs = fs or LocalFS()
+    st = os.stat(src)
+    source_id = {"size": st.st_size, "mtime": st.st_mtime}
+    part = dst + PART_SUFFIX
+    block = delta_utils.BLOCK_SIZE
+
+    if st.st_size < RESUME_MIN_SIZE:
+        with open(src, "rb") as fin, fs.open(dst, "wb") as fout:
+            _copy_stream(fin, fout, meter)
+        return st.st_size
+
+    journal = TransferJournal(fs.id, os.path.abspath(src), dst)
+    j = journal.data
+    dest_stat = fs.stat(dst)
+
+    if delta and dest_stat is not None:
+        if isinstance(fs, LocalFS):
+            sent = _rolling_delta_local(src, dst, part)
+            if meter:
+                meter(sent)
+            fs.replace(part, dst)
+            journal.reset(source=source_id, complete=True, dest_stat=fs.stat(dst),
+                          block_size=block, blocks=delta_utils.block_hashes(dst))
+            journal.save(force=True)
+            return sent
+
+        if j.get("complete") and j.get("block_size") == block and j.get("dest_stat") == dest_stat:
+            old = j["blocks"]
+            new = delta_utils.block_hashes(src)
+            changed = [i for i, h in enumerate(new) if i >= len(old) or old[i] != h]
+            sent = 0
+            with open(src, "rb") as fin, fs.open(dst, "r+b") as fout:
+                for i in changed:
+                    fin.seek(i * block)
+                    data = fin.read(block)
+                    fout.seek(i * block)
+                    fout.write(data)
+                    sent += len(data)
+                    if meter:
+                        meter(len(data))
+                fout.truncate(st.st_size)
+            journal.reset(source=source_id, complete=True, dest_stat=fs.stat(dst), block_size=block, blocks=new)
+            journal.save(force=True)
+            return sent
+
+    # Full copy, resuming a previous partial copy of the same source if possible
+    offset, blocks = 0, []
+    if j.get("source") == source_id and not j.get("complete") and j.get("block_size") == block:
+        part_stat = fs.stat(part)
+        if part_stat is not None:
+            offset = min(j.get("offset", 0), part_stat[0]) // block * block
+            blocks = j.get("blocks", [])[:offset // block]
+            if offset and len(blocks) == offset // block:
+                # Re-verify the last journaled block before trusting the part file
+                with fs.open(part, "rb") as f:
+                    f.seek(offset - block)
+                    if delta_utils.strong_hash(f.read(block)) != blocks[-1]:
+                        offset, blocks = 0, []
+            else:
+                offset, blocks = 0, []
+    journal.reset(source=source_id, complete=False, block_size=block, blocks=blocks, offset=offset)
+
+    sent = 0
+    try:
+        with open(src, "rb") as fin, fs.open(part, "r+b" if offset else "wb") as fout:
+            fin.seek(offset)
+            fout.seek(offset)
+            for data in iter(lambda: fin.read(block), b""):
+                fout.write(data)
+                blocks.append(delta_utils.strong_hash(data))
+                offset += len(data)
+                sent += len(data)
+                if meter:
+                    meter(len(data))
+                journal.data["offset"] = offset
+                journal.save()
+            fout.truncate(offset)
+    except BaseException:
+        journal.save(force=True)  # checkpoint what was written (also on Ctrl+C)
+        raise
+    fs.replace(part, dst)
+    journal.data.update(complete=True, dest_stat=fs.stat(dst))
+    journal.save(force=True)
+    return sent
+
+
 # ----------------- LOCAL TRANSFER ----------------- #
+# Incremental: a manifest (a TransferJournal keyed by source and destination)
+# remembers the size/mtime (and, with checksum, the content hash) of every file
+# copied last time. Unchanged files are skipped after one stat of each side; the
+# rest are copied by a thread pool, in-kernel where the OS allows it. Large files
+# go through transfer_file() only for --delta or when a .jvpart copy is pending.
+
+LOCAL_WORKERS = 8
+COPY_CHUNK = 64 * 1024 * 1024  # bytes per copy_file_range/sendfile call
+COPY_BATCH = 256               # max files per pool task
+
+LocalCopyStats = namedtuple("LocalCopyStats", "copied skipped bytes seconds")
+
+
+def _kernel_copy(src, dst, meter=None):
+    """Copy file contents with copy_file_range (reflink-capable) or sendfile, else userspace"""
+    step = COPY_CHUNK if meter is None else 1024 * 1024
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        size = os.fstat(fin.fileno()).st_size
+        for name in ("copy_file_range", "sendfile"):
+            func = getattr(os, name, None)
+            if func is None:
+                continue
+            try:
+                offset = 0
+                while offset < size:
+                    if name == "sendfile":
+                        n = func(fout.fileno(), fin.fileno(), offset, min(step, size - offset))
+                    else:
+                        n = func(fin.fileno(), fout.fileno(), min(step, size - offset), offset, offset)
+                    if n == 0:
+                        break  # source shrank underneath us
+                    offset += n
+                    if meter:
+                        meter(n)
+                return
+            except OSError:
+                # unsupported for this pair of filesystems: restart with the next method
+                fout.seek(0)
+                fout.truncate()
+        fin.seek(0)
+        _copy_stream(fin, fout, meter)
+
+
+def _file_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _scan_tree(source):
+    """Yield (relative path, stat) for every file under source, creating nothing"""
+    stack = [(source, "")]
+    while stack:
+        local_dir, rel_dir = stack.pop()
+        with os.scandir(local_dir) as it:
+            for entry in it:
+                rel = f"{rel_dir}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, rel + "/"))
+                    yield rel + "/", None
+                elif entry.is_file():
+                    yield rel, entry.stat()
+
+
+def _copy_one(src, dst, st, previous, delta, checksum, meter=None):
+    """Copy src to dst unless unchanged; returns (manifest record, bytes copied)"""
+    digest = _file_hash(src) if checksum else None
+    record = [st.st_size, st.st_mtime_ns, digest]
+    try:
+        dst_st = os.stat(dst)
+    except FileNotFoundError:
+        dst_st = None
+    if dst_st is not None and dst_st.st_size == st.st_size:
+        if checksum:
+            known = previous[2] if previous and previous[:2] == record[:2] else None
+            unchanged = (known or _file_hash(dst)) == digest
+        elif previous:
+            unchanged = previous[:2] == record[:2]
+        else:
+            # first run over an existing copy: fall back to the size/mtime quick check
+            unchanged = dst_st.st_mtime_ns == st.st_mtime_ns
+        if unchanged:
+            return record, None
+
+    # The journaled block loop only pays off for a delta against an existing copy
+    # or to finish an interrupted one; everything else is copied in-kernel
+    if st.st_size >= RESUME_MIN_SIZE and ((delta and dst_st is not None) or os.path.exists(dst + PART_SUFFIX)):
+        transfer_file(src, dst, delta=delta, meter=meter)
+    else:
+        _kernel_copy(src, dst, meter)
+    shutil.copystat(src, dst)
+    return record, st.st_size
+
+
+def _copy_batch(batch, previous, delta, checksum, meter=None):
+    """Run _copy_one over a batch; returns [(rel, record, bytes copied or None, error)]"""
+    results = []
+    for src, dst, rel, st in batch:
+        try:
+            record, n = _copy_one(src, dst, st, previous.get(rel), delta, checksum, meter)
+            results.append((rel, record, n, None))
+        except Exception as e:
+            results.append((rel, None, None, e))
+    return results
 
-def local_transfer(source, destination):
-    """Copy file/folder on the same machine"""
-    if os.path.isdir(source):
-        shutil.copytree(source, destination, dirs_exist_ok=True)
+
+def local_transfer(source, destination, delta=False, workers=LOCAL_WORKERS, checksum=False, meter=None):
+    """
+    Copy file/folder on the same machine, skipping files unchanged since the last run.
+    Returns LocalCopyStats.
+    """
+    start = time.perf_counter()
+    source = os.path.abspath(source)
+    is_tree = os.path.isdir(source)
+    if is_tree:
+        dest_root = destination
+        os.makedirs(dest_root, exist_ok=True)
+        files = []
+        for rel, st in _scan_tree(source):
+            if st is None:
+                os.makedirs(os.path.join(dest_root, rel), exist_ok=True)
+            else:
+                files.append((os.path.join(source, rel), os.path.join(dest_root, rel), rel, st))
+        manifest_key = source
     else:
-        shutil.copy2(source, destination)
-    return True
+        if os.path.isdir(destination) or destination.endswith(("/", os.sep)):
+            dest_root, name = destination, os.path.basename(source)
+        else:
+            dest_root, name = os.path.split(destination)
+        os.makedirs(dest_root or ".", exist_ok=True)
+        files = [(source, os.path.join(dest_root, name), name, os.stat(source))]
+        manifest_key = os.path.dirname(source)
+
+    manifest = TransferJournal("local", manifest_key, os.path.abspath(dest_root or "."))
+    previous = manifest.data.get("files", {})
+    current, errors = {}, []
+    copied = skipped = copied_bytes = 0
+
+    # Batches keep per-task overhead low for trees of many tiny files
+    size = max(1, min(COPY_BATCH, len(files) // (max(1, workers) * 4)))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(_copy_batch, files[i:i + size], previous, delta, checksum, meter)
+                   for i in range(0, len(files), size)]
+        for future in as_completed(futures):
+            for rel, record, n, error in future.result():
+                if error:
+                    errors.append(f"{rel}: {error}")
+                    continue
+                current[rel] = record
+                if n is None:
+                    skipped += 1
+                else:
+                    copied += 1
+                    copied_bytes += n
+
+    if is_tree:
+        manifest.reset(files=current)  # whole tree: forget files that no longer exist
+    else:
+        manifest.data.setdefault("files", {}).update(current)
+    manifest.save(force=True)
+    if errors:
+        raise RuntimeError(f"{len(errors)} file(s) failed to copy, first: {errors[0]}")
+    return LocalCopyStats(copied, skipped, copied_bytes, time.perf_counter() - start)
 
 
 # ----------------- NETWORK TRANSFER ----------------- #
+# The wire protocol lives in lan_utils; these wrappers keep the original API.
 
-def send_file_network(source, ip, port=5001):
-    """Send a file to another machine over LAN"""
-    filesize = os.path.getsize(source)
-    s = socket.socket()
-    s.connect((ip, port))
-    s.send(f"{os.path.basename(source)}:{filesize}".encode())
-
-    with open(source, "rb") as f:
-        while True:
-            bytes_read = f.read(BUFFER_SIZE)
-            if not bytes_read:
-                break
-            s.sendall(bytes_read)
-
-    s.close()
+def send_file_network(source, ip, port=5001, streams=lan_utils.DEFAULT_STREAMS, buffer_size=lan_utils.BUFFER_SIZE,
+                      delta=False, compress="none", meter=None):
+    """Send a file or directory tree to another machine over LAN using parallel streams"""
+    lan_utils.send(source, ip, port, streams=streams, buffer_size=buffer_size, delta=delta, compress=compress,
+                   meter=meter)
     return True
 
 
-def receive_file_network(destination_dir=".", port=5001):
-    """Receive a file over LAN"""
-    s = socket.socket()
-    s.bind(("", port))
-    s.listen(1)
-    client_socket, addr = s.accept()
-
-    received = client_socket.recv(BUFFER_SIZE).decode()
-    filename, filesize = received.split(":")
-    filesize = int(filesize)
-    filepath = os.path.join(destination_dir, filename)
+def receive_file_network(destination_dir=".", port=5001, buffer_size=lan_utils.BUFFER_SIZE):
+    """Receive a file over LAN (accepts both current and legacy senders)"""
+    return lan_utils.receive(destination_dir, port, buffer_size=buffer_size)
 
-    with open(filepath, "wb") as f:
-        bytes_received = 0
-        while bytes_received < filesize:
-            bytes_read = client_socket.recv(BUFFER_SIZE)
-            if not bytes_read:
-                break
-            f.write(bytes_read)
-            bytes_received += len(bytes_read)
 
-    client_socket.close()
-    s.close()
-    return filepath
+def receive_network_daemon(destination_dir=".", port=5001, buffer_size=lan_utils.BUFFER_SIZE, on_complete=None):
+    """Serve LAN transfers from any number of senders until interrupted"""
+    receiver = lan_utils.Receiver(destination_dir, port, buffer_size=buffer_size)
+    try:
+        receiver.serve_forever(on_complete or (lambda result: None))
+    finally:
+        receiver.close()
 
 
 # ----------------- REMOTE TRANSFER ----------------- #
 
-def remote_transfer(source, destination, ip, username, password, protocol="sftp"):
+def remote_transfer(source, destination, ip, username, password, protocol="sftp", delta=False, channels=None,
+                    compress="none", meter=None):
     """
-    Transfer file to remote system using SFTP (default) or SMB.
+    Transfer a file (or, over SFTP, a directory tree) to a remote system using SFTP (default) or SMB.
+    Large files resume after an interruption; with delta only changed blocks are sent.
+    compress applies to SFTP (SSH transport compression); SMB sends data as is.
     """
     if protocol == "sftp":
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(ip, username=username, password=password)
-
-        sftp = ssh.open_sftp()
-        try:
-            sftp.stat(destination)
-        except FileNotFoundError:
-            # Create destination folder if missing
-            sftp.mkdir(destination)
-
-        remote_path = os.path.join(destination, os.path.basename(source))
-        sftp.put(source, remote_path)
-
-        sftp.close()
-        ssh.close()
+        from jarvis.utils import sftp_utils
+
+        # reused for the rest of the run
+        client = sftp_utils.get_session(ip, username, password,
+                                        compress=sftp_utils.wants_compression(source, compress))
+        remote_path, _ = sftp_utils.upload(
+            client, ip, source, destination, channels=channels or sftp_utils.SFTP_CHANNELS, delta=delta,
+            meter=meter,
+        )
         return remote_path
 
     elif protocol == "smb":
+        import smbprotocol
+
         # SMB setup
         try:
             smbprotocol.ClientConfig(username=username, password=password)
@@ -141,8 +567,7 @@ def remote_transfer(source, destination, ip, username, password, protocol="sftp"
         remote_path = f"\\\\{ip}\\{share}\\{path}\\{os.path.basename(source)}"
 
         try:
-            with open(source, "rb") as src_file, open(remote_path, "wb") as dst_file:
-                shutil.copyfileobj(src_file, dst_file)
+            transfer_file(source, remote_path, LocalFS(), delta=delta, meter=meter)
         except Exception as e:
             raise RuntimeError(f"SMB transfer failed: {e}")
 
@@ -154,28 +579,15 @@ def remote_transfer(source, destination, ip, username, password, protocol="sftp"
 
 # ----------------- PROTOCOL DETECTION ----------------- #
 
-def detect_protocol(ip: str) -> str:
-    """Detect protocol by checking open ports on remote system."""
-    try:
-        # Check port 22 (SSH/SFTP)
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(1)
-        if s.connect_ex((ip, 22)) == 0:
-            s.close()
-            return "sftp"
-        s.close()
-    except Exception:
-        pass
+PROTOCOL_PORTS = (("sftp", 22), ("smb", 445))  # in order of preference
 
-    try:
-        # Check port 445 (SMB)
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(1)
-        if s.connect_ex((ip, 445)) == 0:
-            s.close()
-            return "smb"
-        s.close()
-    except Exception:
-        pass
 
+def detect_protocol(ip: str) -> str:
+    """Detect protocol by checking open ports on remote system (both probed at once)."""
+    from jarvis.utils import probe_utils
+
+    results = probe_utils.probe([(ip, port) for _, port in PROTOCOL_PORTS])
+    for protocol, port in PROTOCOL_PORTS:
+        if results[(ip, port)].state == "open":
+            return protocol
     return None
@@ -1,56 +1,255 @@
+import atexit
+import csv
+import json
 import sqlite3
+import subprocess
+import sys
+from pathlib import Path
 
 DB_NAME = "branches.db"
+STATUSES = ("open", "merged", "closed")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS branches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        commit_hash TEXT,
+        issue_id TEXT,
+        description TEXT,
+        status TEXT DEFAULT 'open'
+    )
+"""
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_branches_name ON branches (name)",
+    "CREATE INDEX IF NOT EXISTS idx_branches_issue_id ON branches (issue_id)",
+    "CREATE INDEX IF NOT EXISTS idx_branches_status ON branches (status)",
+)
+
+# Statements are kept as constants so sqlite3's statement cache reuses the
+# compiled (prepared) form across calls on the same connection.
+INSERT_SQL = "INSERT INTO branches (name, commit_hash, issue_id, description) VALUES (?, ?, ?, ?)"
+INSERT_WITH_STATUS_SQL = "INSERT INTO branches (name, commit_hash, issue_id, description, status) VALUES (?, ?, ?, ?, ?)"
+SELECT_ALL_SQL = "SELECT * FROM branches"
+UPDATE_COMMIT_SQL = "UPDATE branches SET commit_hash = ? WHERE id = ?"
+UPDATE_STATUS_SQL = "UPDATE branches SET status = ? WHERE id = ?"
+DELETE_SQL = "DELETE FROM branches WHERE id = ?"
+
+
+class BranchStore:
+    """
+    Branch records backed by a single long-lived SQLite connection.
+    Schema creation runs once per store, and the DB uses WAL with
+    synchronous=NORMAL so each commit costs one cheap WAL append.
+    """
+
+    def __init__(self, path=DB_NAME):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(SCHEMA)
+            for sql in INDEXES:
+                self.conn.execute(sql)
+
+    def add(self, name, commit_hash, issue_id, description):
+        with self.conn:
+            self.conn.execute(INSERT_SQL, (name, commit_hash, issue_id, description))
+
+    def add_many(self, records):
+        """Insert (name, commit_hash, issue_id, description[, status]) tuples in one transaction"""
+        plain, with_status = [], []
+        for r in records:
+            r = tuple(r)
+            if len(r) == 5 and r[4]:
+                with_status.append(r)
+            else:
+                plain.append(r[:4])
+        with self.conn:
+            self.conn.executemany(INSERT_SQL, plain)
+            self.conn.executemany(INSERT_WITH_STATUS_SQL, with_status)
+        return len(plain) + len(with_status)
+
+    def iter(self, status=None, issue_id=None, name_prefix=None, after_id=None, limit=None, offset=None):
+        """
+        Yield branch rows ordered by id, with every filter pushed down into SQL.
+        after_id gives keyset paging (cheap at any depth); offset is plain OFFSET.
+        """
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if issue_id:
+            where.append("issue_id = ?")
+            params.append(issue_id)
+        if name_prefix:
+            # Range scan instead of LIKE so the (binary) name index is used. Nothing
+            # sorts after U+10FFFF, so trailing ones are dropped before bumping the
+            # last character; a prefix of only U+10FFFF needs no upper bound.
+            where.append("name >= ?")
+            params.append(name_prefix)
+            stem = name_prefix.rstrip(chr(sys.maxunicode))
+            if stem:
+                where.append("name < ?")
+                params.append(stem[:-1] + chr(ord(stem[-1]) + 1))
+        if after_id is not None:
+            where.append("id > ?")
+            params.append(after_id)
+
+        sql = SELECT_ALL_SQL
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit if limit is not None else -1, offset or 0]
+        return self.conn.execute(sql, params)
+
+    def list(self, **filters):
+        return self.iter(**filters).fetchall()
+
+    def update_status(self, branch_id, status):
+        with self.conn:
+            self.conn.execute(UPDATE_STATUS_SQL, (status, branch_id))
+
+    def update_status_many(self, updates):
+        """Apply (branch_id, status) pairs in one transaction; returns rows changed"""
+        with self.conn:
+            cur = self.conn.executemany(UPDATE_STATUS_SQL, [(status, branch_id) for branch_id, status in updates])
+        return cur.rowcount
+
+    def sync_refs(self, refs):
+        """
+        Upsert {branch name: head commit} into the table in one transaction.
+        Only new names are inserted and only moved heads are updated; rows whose
+        commit already matches are left untouched. Returns (added, updated, unchanged).
+        """
+        existing = {}
+        for branch_id, name, commit_hash in self.conn.execute("SELECT id, name, commit_hash FROM branches ORDER BY id"):
+            existing[name] = (branch_id, commit_hash)  # latest row wins for duplicate names
+
+        inserts, updates = [], []
+        for name, commit_hash in refs.items():
+            row = existing.get(name)
+            if row is None:
+                inserts.append((name, commit_hash, None, None))
+            elif row[1] != commit_hash:
+                updates.append((commit_hash, row[0]))
+
+        with self.conn:
+            self.conn.executemany(INSERT_SQL, inserts)
+            self.conn.executemany(UPDATE_COMMIT_SQL, updates)
+        return len(inserts), len(updates), len(refs) - len(inserts) - len(updates)
+
+    def delete(self, branch_id):
+        with self.conn:
+            self.conn.execute(DELETE_SQL, (branch_id,))
+
+    def close(self):
+        self.conn.close()
+
+
+_store = None
+
+
+def get_store() -> BranchStore:
+    """Return the process-wide BranchStore, opening it on first use"""
+    global _store
+    if _store is None or _store.path != DB_NAME:
+        if _store is not None:
+            _store.close()
+        _store = BranchStore(DB_NAME)
+    return _store
+
+
+@atexit.register
+def _close_store():
+    if _store is not None:
+        _store.close()
+
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS branches (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            commit_hash TEXT,
-            issue_id TEXT,
-            description TEXT,
-            status TEXT DEFAULT 'open'
-        )
-    """)
-    conn.commit()
-    conn.close()
+    get_store()
 
 def add_branch(name, commit_hash, issue_id, description):
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO branches (name, commit_hash, issue_id, description) VALUES (?, ?, ?, ?)",
-        (name, commit_hash, issue_id, description)
-    )
-    conn.commit()
-    conn.close()
-
-def list_branches():
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT * FROM branches")
-    branches = c.fetchall()
-    conn.close()
-    return branches
+    get_store().add(name, commit_hash, issue_id, description)
+
+def list_branches(**filters):
+    """List branch rows; see BranchStore.iter for the supported filters"""
+    return get_store().list(**filters)
 
 def update_branch_status(branch_id, status):
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE branches SET status = ? WHERE id = ?", (status, branch_id))
-    conn.commit()
-    conn.close()
-    
+    get_store().update_status(branch_id, status)
+
 def delete_branch(branch_id: int):
     """Delete a branch from DB by ID"""
-    init_db()
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM branches WHERE id = ?", (branch_id,))
-    conn.commit()
-    conn.close()
+    get_store().delete(branch_id)
+
+
+def read_branch_records(path):
+    """
+    Parse a CSV (with header) or JSON (list of objects) file for `git-manager import`.
+    Rows with an `id` are status updates; all other rows are new branches.
+    Returns (new_branches, status_updates).
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if isinstance(records, dict):
+            records = [records]
+        elif not isinstance(records, list):
+            raise ValueError("Expected a JSON object or a list of objects")
+    else:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            records = list(csv.DictReader(f))
+
+    new_branches, status_updates = [], []
+    for i, rec in enumerate(records, start=1):
+        if not isinstance(rec, dict):
+            raise ValueError(f"Record {i}: expected an object, got {type(rec).__name__}")
+        for field in ("name", "commit_hash", "issue_id", "description", "status"):
+            if rec.get(field) is not None and not isinstance(rec[field], str):
+                raise ValueError(f"Record {i}: '{field}' must be a string")
+        if rec.get("id") not in (None, ""):
+            if not rec.get("status"):
+                raise ValueError(f"Record {i}: 'status' is required when 'id' is given")
+            status = rec["status"].lower()
+            if status not in STATUSES:
+                raise ValueError(f"Record {i}: unknown status '{rec['status']}'")
+            raw_id = rec["id"]
+            if isinstance(raw_id, str) and raw_id.strip().isdigit():
+                branch_id = int(raw_id.strip())
+            elif isinstance(raw_id, int) and not isinstance(raw_id, bool):
+                branch_id = raw_id
+            else:  # floats, booleans and other JSON values are not silently truncated
+                raise ValueError(f"Record {i}: 'id' must be an integer")
+            status_updates.append((branch_id, status))
+        elif rec.get("name"):
+            new_branches.append((
+                rec["name"],
+                rec.get("commit_hash") or None,
+                rec.get("issue_id") or None,
+                rec.get("description") or None,
+                (rec.get("status") or "").lower() or None,
+            ))
+            if new_branches[-1][4] not in (None,) + STATUSES:
+                raise ValueError(f"Record {i}: unknown status '{rec['status']}'")
+        else:
+            raise ValueError(f"Record {i}: needs either 'name' (new branch) or 'id' + 'status' (update)")
+    return new_branches, status_updates
+
+
+def read_git_refs(repo="."):
+    """Return {branch name: head commit} for all local branches with a single git call"""
+    out = subprocess.run(
+        ["git", "-C", str(repo), "for-each-ref", "--format=%(refname:short)%00%(objectname)", "refs/heads"],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    refs = {}
+    for line in out.splitlines():
+        name, _, commit_hash = line.partition("\0")
+        if name:
+            refs[name] = commit_hash
+    return refs
@@ -0,0 +1,54 @@
+"""
+Transfer-state journals under ~/.jarvis/transfers/.
+
+One JSON file per (mode, source, destination) key records what has been
+written so far (verified offsets / byte ranges) and the block hashes of the
+data, so an interrupted transfer can resume and the next transfer can send
+only the blocks that changed.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+JOURNAL_DIR = Path.home() / ".jarvis" / "transfers"
+SAVE_INTERVAL = 1.0  # seconds between throttled checkpoints
+
+
+class TransferJournal:
+    """A small JSON document persisted atomically, keyed by a tuple of strings"""
+
+    def __init__(self, *key_parts):
+        key = hashlib.sha1("\0".join(str(p) for p in key_parts).encode()).hexdigest()
+        self.path = JOURNAL_DIR / f"{key}.json"
+        self.data = {}
+        self._last_save = 0.0
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = {}  # unreadable journal: start over
+
+    def save(self, force=False):
+        """Write the journal; unless force, at most once per SAVE_INTERVAL"""
+        now = time.monotonic()
+        if not force and now - self._last_save < SAVE_INTERVAL:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+        self._last_save = now
+
+    def reset(self, **data):
+        self.data = dict(data)
+
+    def delete(self):
+        self.data = {}
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,805 @@
+"""
+LAN transfer protocol (v3) used by `file-transfer` network mode.
+
+A transfer is one control connection plus N parallel data connections to the
+receiver's port. Every connection starts with a preface:
+
+    MAGIC (b"JVT") | version (1 byte) | kind (b"C" control / b"D" data) | transfer id (16 bytes)
+
+Control connection: the sender sends a length-prefixed JSON header
+({"root", "streams", ...}) followed by the manifest as a series of JSON
+batches ({"files": [{"path", "size", "mtime"}, ...], "dirs": [...]}) ending
+with {"end": true}, so large trees never need one giant frame. The receiver
+creates the tree and answers with a JSON ack. When all data connections are
+finished the sender sends {"done": true} and the receiver answers with the
+final status.
+
+Data connections carry a sequence of chunk frames (CHUNK_HDR + payload), each
+chunk belonging to exactly one file and carrying the CRC-32 of its data, which
+the receiver checks before the chunk counts as written. Work items are pulled from a shared
+queue, so fast streams take more of the work; small files are grouped into one
+work item and written to the socket with a single send, so thousands of tiny
+files cost no per-file round trips. The sender uses socket.sendfile() (zero
+copy where the OS supports it); the receiver uses recv_into() into a
+preallocated memoryview and positional writes. A frame with file index
+END_OF_STREAM closes the data connection.
+
+Resume and delta (v3): the receiver writes every file to "<path>.jvpart" and
+journals each verified chunk (offset, length, crc) under ~/.jarvis/transfers,
+keyed by the sender's resume_key. When the same source is sent again the ack
+lists the chunks already on disk ("have", re-checked against their CRCs) and
+the sender skips them; files finished earlier are skipped whole. With
+{"delta": true} in the header the ack also carries block signatures of files
+that already exist at the destination, and the sender answers with COPY frames
+(payload: 8-byte offset into the old file) for matching blocks and ordinary
+chunks for the rest.
+
+Compression: the ack lists the codecs the receiver can decode. With
+--compress the sender compresses each chunk on its own (FLAG_ZLIB/FLAG_ZSTD,
+payload length < raw length) or sends it raw when it would not shrink; the
+CRC always covers the raw data. Nothing larger than one chunk is buffered.
+
+Senders that predate v2 ("name:size\\n" header, no framing; the oldest omit
+the newline) are detected by the missing MAGIC and handled by the legacy path.
+"""
+import json
+import mmap
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+from jarvis.utils import compress_utils, delta_utils
+from jarvis.utils.journal_utils import TransferJournal
+
+MAGIC = b"JVT"
+VERSION = 3
+KIND_CONTROL = b"C"
+KIND_DATA = b"D"
+PREFACE = struct.Struct("!3sBc16s")
+LENGTH = struct.Struct("!I")
+# file index, offset in file, raw length, payload length, flags, crc32 of the raw data
+CHUNK_HDR = struct.Struct("!IQIIBI")
+END_OF_STREAM = 0xFFFFFFFF
+FLAG_COPY = 0x01                  # payload is an offset into the receiver's old copy
+FLAG_ZLIB = 0x02                  # payload is the chunk compressed with zlib ("gzip" codec)
+FLAG_ZSTD = 0x04                  # payload is the chunk compressed with zstd
+CODEC_FLAGS = {"gzip": FLAG_ZLIB, "zstd": FLAG_ZSTD}
+COPY_PAYLOAD = struct.Struct("!Q")
+PART_SUFFIX = ".jvpart"
+
+DEFAULT_PORT = 5001
+DEFAULT_STREAMS = 4
+CHUNK_SIZE = 8 * 1024 * 1024      # max bytes per chunk frame
+SMALL_FILE = 64 * 1024            # files up to this size are batched together
+SMALL_BATCH_FILES = 512           # max small files per batch
+MANIFEST_BATCH = 5000             # manifest entries per control frame
+BUFFER_SIZE = 1024 * 1024         # receive buffer / socket buffer size
+LEGACY_BUFFER_SIZE = 4096
+
+
+# ----------------- framing helpers ----------------- #
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    _recv_into_exact(sock, memoryview(buf))
+    return bytes(buf)
+
+
+def _recv_into_exact(sock, view):
+    while len(view):
+        n = sock.recv_into(view)
+        if not n:
+            raise ConnectionError("connection closed mid-frame")
+        view = view[n:]
+
+
+def _peek(sock, n, timeout=5.0):
+    """The first n bytes without consuming them; fewer only at EOF (or after timeout on Windows)"""
+    # MSG_WAITALL makes a peek block until n bytes or EOF; Windows rejects it with MSG_PEEK, so poll there
+    waitall = 0 if sys.platform.startswith("win") else getattr(socket, "MSG_WAITALL", 0)
+    deadline = time.monotonic() + timeout
+    while True:
+        head = sock.recv(n, socket.MSG_PEEK | waitall)
+        if len(head) >= n or not head or waitall or time.monotonic() >= deadline:
+            return head
+        time.sleep(0.01)
+
+
+def _send_json(sock, obj):
+    data = json.dumps(obj).encode()
+    sock.sendall(LENGTH.pack(len(data)) + data)
+
+
+def _recv_json(sock):
+    (length,) = LENGTH.unpack(_recv_exact(sock, LENGTH.size))
+    return json.loads(_recv_exact(sock, length))
+
+
+def _tune_socket(sock, buffer_size):
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, buffer_size)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_size)
+    except OSError:
+        pass  # best effort; the OS may clamp or refuse
+
+
+def _pwrite(fd, data, offset, lock):
+    if hasattr(os, "pwrite"):
+        os.pwrite(fd, data, offset)
+    else:  # Windows: no pwrite, serialise seek+write per file
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            os.write(fd, data)
+
+
+def _safe_join(root, relpath):
+    """Join a manifest path under root, refusing absolute paths and '..'"""
+    parts = Path(relpath.replace("\\", "/")).parts
+    if not parts or Path(relpath).is_absolute() or ".." in parts:
+        raise ValueError(f"Refusing unsafe path in manifest: {relpath!r}")
+    return os.path.join(root, *parts)
+
+
+# ----------------- sender ----------------- #
+
+def build_manifest(source):
+    """
+    Walk source (a file or a directory tree) and return (entries, sources, dirs):
+    entries are {"path", "size", "mtime"} with paths relative to the parent of
+    source, sources the matching local paths, dirs every directory (so empty
+    ones are recreated too).
+    """
+    source = os.path.abspath(source)
+    root = os.path.basename(source.rstrip(os.sep)) or "root"
+    if os.path.isfile(source):
+        st = os.stat(source)
+        return [{"path": root, "size": st.st_size, "mtime": st.st_mtime}], [source], []
+    if not os.path.isdir(source):
+        raise FileNotFoundError(f"Source not found: {source}")
+
+    entries, sources, dirs = [], [], [root]
+    stack = [(source, root)]
+    while stack:
+        local_dir, rel_dir = stack.pop()
+        with os.scandir(local_dir) as it:
+            for entry in it:
+                rel = f"{rel_dir}/{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(rel)
+                    stack.append((entry.path, rel))
+                elif entry.is_file():
+                    st = entry.stat()
+                    entries.append({"path": rel, "size": st.st_size, "mtime": st.st_mtime})
+                    sources.append(entry.path)
+    return entries, sources, dirs
+
+
+def _plan_chunks(manifest, chunk_size, have=None, deltas=None):
+    """
+    Queue of work items; each is a list of (file index, offset, length, old offset)
+    chunks, old offset being None for data and set for COPY frames. Chunks the
+    receiver already has (exact (offset, length) matches) are left out.
+    """
+    have = have or {}
+    deltas = deltas or {}
+    chunks = queue.Queue()
+    batch, batch_bytes = [], 0
+
+    def add_small(chunk, cost):
+        nonlocal batch, batch_bytes
+        batch.append(chunk)
+        batch_bytes += cost
+        if batch_bytes >= chunk_size or len(batch) >= SMALL_BATCH_FILES:
+            chunks.put(batch)
+            batch, batch_bytes = [], 0
+
+    for idx, entry in enumerate(manifest):
+        size = entry["size"]
+        if size == 0:
+            continue  # created from the manifest alone
+        done = {tuple(r) for r in have.get(idx, ())}
+        if (0, size) in done:
+            continue
+        if size <= SMALL_FILE:
+            add_small((idx, 0, size, None), size)
+            continue
+        for op in deltas.get(idx) or [("data", 0, size)]:
+            if op[0] == "copy":
+                # cheap to send: batch them like small files
+                if (op[1], op[2]) not in done:
+                    add_small((idx, op[1], op[2], op[3]), 0)
+                continue
+            offset, end = op[1], op[1] + op[2]
+            while offset < end:
+                length = min(chunk_size, end - offset)
+                if (offset, length) not in done:
+                    chunks.put([(idx, offset, length, None)])
+                offset += length
+    if batch:
+        chunks.put(batch)
+    return chunks
+
+
+def _read_exact(f, offset, length, path):
+    f.seek(offset)
+    data = f.read(length)
+    if len(data) != length:
+        raise IOError(f"{path} changed size during transfer")
+    return data
+
+
+def _data_stream(ip, port, transfer_id, sources, chunks, buffer_size, errors, sent, codec=None, auto=False,
+                 meter=None):
+    n_sent = 0
+    compressor = compress_utils.Compressor(codec, auto) if codec else None
+    flag = CODEC_FLAGS.get(codec, 0)
+    try:
+        with socket.create_connection((ip, port)) as sock:
+            _tune_socket(sock, buffer_size)
+            sock.sendall(PREFACE.pack(MAGIC, VERSION, KIND_DATA, transfer_id))
+            files = {}
+            try:
+                while True:
+                    try:
+                        item = chunks.get_nowait()
+                    except queue.Empty:
+                        break
+                    if len(item) > 1 or item[0][2] <= SMALL_FILE or item[0][3] is not None:
+                        # Batch of small files / COPY frames: one buffer, one send
+                        out = bytearray()
+                        for idx, offset, length, old_offset in item:
+                            if old_offset is not None:
+                                out += CHUNK_HDR.pack(idx, offset, length, COPY_PAYLOAD.size, FLAG_COPY, 0)
+                                out += COPY_PAYLOAD.pack(old_offset)
+                                continue
+                            with open(sources[idx], "rb") as f:
+                                data = _read_exact(f, offset, length, sources[idx])
+                            packed = compressor.compress(data) if compressor else None
+                            if packed is None:
+                                out += CHUNK_HDR.pack(idx, offset, length, length, 0, zlib.crc32(data))
+                                out += data
+                            else:
+                                out += CHUNK_HDR.pack(idx, offset, length, len(packed), flag, zlib.crc32(data))
+                                out += packed
+                            n_sent += len(packed) if packed is not None else length
+                        sock.sendall(out)
+                        if meter:
+                            meter(len(out))
+                        continue
+                    idx, offset, length, _ = item[0]
+                    f = files.get(idx)
+                    if f is None:
+                        f = open(sources[idx], "rb")
+                        files[idx] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                    f, mapped = files[idx]
+                    # CRC straight from the page cache, then zero-copy send
+                    with memoryview(mapped) as view:
+                        crc = zlib.crc32(view[offset:offset + length])
+                        packed = compressor.compress(view[offset:offset + length]) if compressor else None
+                    if packed is not None:
+                        sock.sendall(CHUNK_HDR.pack(idx, offset, length, len(packed), flag, crc))
+                        sock.sendall(packed)
+                        n_sent += len(packed)
+                        if meter:
+                            meter(len(packed))
+                        continue
+                    sock.sendall(CHUNK_HDR.pack(idx, offset, length, length, 0, crc))
+                    n = sock.sendfile(f, offset, length)
+                    if n != length:
+                        raise ConnectionError(f"short sendfile: {n}/{length} bytes")
+                    n_sent += length
+                    if meter:
+                        meter(length)
+            finally:
+                for f, mapped in files.values():
+                    mapped.close()
+                    f.close()
+            sock.sendall(CHUNK_HDR.pack(END_OF_STREAM, 0, 0, 0, 0, 0))
+            # Wait for the receiver to close so every byte is known to be written
+            sock.recv(1)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        sent.append(n_sent)
+
+
+def _plan_deltas(manifest, sources, signatures):
+    """compute_delta() for every file the receiver sent a signature for"""
+    deltas = {}
+    for key, sig in signatures.items():
+        idx = int(key)
+        deltas[idx] = list(delta_utils.compute_delta(sources[idx], [tuple(s) for s in sig]))
+    return deltas
+
+
+def send(source, ip, port=DEFAULT_PORT, streams=DEFAULT_STREAMS, chunk_size=CHUNK_SIZE, buffer_size=BUFFER_SIZE,
+         delta=False, compress="none", meter=None):
+    """
+    Send a file or directory tree to a v3 receiver over `streams` parallel
+    connections. Chunks the receiver kept from an interrupted send of the same
+    source are skipped; with delta, files that already exist on the receiver
+    are sent as rsync-style deltas; compress is one of compress_utils.CODECS.
+    meter(nbytes), if given, is called from the data threads as frames go out.
+    Returns the number of data bytes put on the wire.
+    """
+    compress_utils.resolve(compress)  # fail before connecting if the codec is missing here
+    manifest, sources, dirs = build_manifest(source)
+    transfer_id = uuid.uuid4().bytes
+    total = sum(e["size"] for e in manifest)
+
+    with socket.create_connection((ip, port)) as ctrl:
+        _tune_socket(ctrl, buffer_size)
+        ctrl.sendall(PREFACE.pack(MAGIC, VERSION, KIND_CONTROL, transfer_id))
+        _send_json(ctrl, {
+            "root": dirs[0] if dirs else manifest[0]["path"],
+            "streams": streams,
+            "total_files": len(manifest),
+            "total_bytes": total,
+            "resume_key": f"{socket.gethostname()}:{os.path.abspath(source)}",
+            "delta": delta,
+        })
+        for i in range(0, max(len(manifest), len(dirs)), MANIFEST_BATCH):
+            _send_json(ctrl, {"files": manifest[i:i + MANIFEST_BATCH], "dirs": dirs[i:i + MANIFEST_BATCH]})
+        _send_json(ctrl, {"end": True})
+        ack = _recv_json(ctrl)
+        if not ack.get("ok"):
+            raise RuntimeError(f"Receiver rejected transfer: {ack.get('error')}")
+
+        codec = compress_utils.resolve(compress, ack.get("codecs", []))
+        have = {int(k): v for k, v in ack.get("have", {}).items()}
+        deltas = _plan_deltas(manifest, sources, ack.get("signatures", {})) if delta else None
+        chunks = _plan_chunks(manifest, chunk_size, have, deltas)
+        n_streams = max(1, min(streams, chunks.qsize()))
+        errors, sent = [], []
+        threads = [
+            threading.Thread(target=_data_stream,
+                             args=(ip, port, transfer_id, sources, chunks, buffer_size, errors, sent,
+                                   codec, compress == "auto", meter))
+            for _ in range(n_streams)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+
+        _send_json(ctrl, {"done": True})
+        result = _recv_json(ctrl)
+        if not result.get("ok"):
+            raise RuntimeError(f"Transfer failed on receiver: {result.get('error')}")
+    return sum(sent)
+
+
+def send_legacy(source, ip, port=DEFAULT_PORT):
+    """Original single-socket sender ("name:size\\n" header, 4 KiB reads)"""
+    filesize = os.path.getsize(source)
+    s = socket.socket()
+    s.connect((ip, port))
+    s.sendall(f"{os.path.basename(source)}:{filesize}\n".encode())
+
+    with open(source, "rb") as f:
+        while True:
+            bytes_read = f.read(LEGACY_BUFFER_SIZE)
+            if not bytes_read:
+                break
+            s.sendall(bytes_read)
+
+    s.close()
+    return True
+
+
+# ----------------- receiver ----------------- #
+
+def _verified_ranges(path, size, ranges):
+    """The journaled (offset, length, crc) ranges of a part file whose data still matches"""
+    try:
+        if os.path.getsize(path) != size:
+            return []
+        with open(path, "rb") as f:
+            good = []
+            for offset, length, crc in ranges:
+                f.seek(offset)
+                if zlib.crc32(f.read(length)) == crc:
+                    good.append([offset, length, crc])
+            return good
+    except OSError:
+        return []
+
+
+class _IncomingTransfer:
+    """
+    Receiver-side state for one transfer: open part files, byte accounting and
+    the resume journal. Files are written to <path>.jvpart and renamed into
+    place when their last chunk is verified.
+    """
+
+    def __init__(self, root, manifest, dirs=(), journal=None, delta=False):
+        self.root = root
+        self.manifest = manifest
+        self.paths = [_safe_join(root, e["path"]) for e in manifest]
+        self.parts = [p + PART_SUFFIX for p in self.paths]
+        self.remaining = [e["size"] for e in manifest]
+        self.fds = {}
+        self.locks = [threading.Lock() for _ in manifest]
+        self.lock = threading.Lock()
+        self.active_streams = 0
+        self.idle = threading.Condition(self.lock)
+        self.error = None
+        self.journal = journal
+        self.have = {}        # idx -> [[offset, length]] already written by an earlier attempt
+        self.signatures = {}  # idx -> block signature of the existing file (delta)
+
+        previous = journal.data.get("files", {}) if journal else {}
+        self.state = {}       # relpath -> {"size", "mtime", "ranges" | "complete"}
+        if journal:
+            journal.reset(files=self.state)
+
+        made = set()
+        for d in dirs:
+            path = _safe_join(root, d)
+            os.makedirs(path, exist_ok=True)
+            made.add(path)
+        for idx, (path, entry) in enumerate(zip(self.paths, manifest)):
+            parent = os.path.dirname(path) or "."
+            if parent not in made:
+                os.makedirs(parent, exist_ok=True)
+                made.add(parent)
+            size = entry["size"]
+            if size == 0:
+                open(path, "wb").close()
+                self._finish_file(path, entry)
+                continue
+            self.state[entry["path"]] = {"size": size, "mtime": entry["mtime"], "ranges": []}
+            prev = previous.get(entry["path"])
+            if prev and prev["size"] == size and prev["mtime"] == entry["mtime"]:
+                if prev.get("complete"):
+                    if self._unchanged(path, entry):
+                        self.have[idx] = [[0, size]]
+                        self.remaining[idx] = 0
+                        self.state[entry["path"]] = prev
+                        continue
+                else:
+                    ranges = _verified_ranges(self.parts[idx], size, prev.get("ranges", []))
+                    if ranges:
+                        self.have[idx] = [r[:2] for r in ranges]
+                        self.remaining[idx] -= sum(r[1] for r in ranges)
+                        self.state[entry["path"]]["ranges"] = ranges
+            if delta and size > SMALL_FILE and os.path.isfile(path):
+                self.signatures[idx] = delta_utils.file_signature(path)
+            if self.have.get(idx) and self.remaining[idx] == 0:
+                self._complete(idx)  # interrupted between the last chunk and the rename
+
+    @staticmethod
+    def _unchanged(path, entry):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return st.st_size == entry["size"] and abs(st.st_mtime - entry["mtime"]) < 1e-3
+
+    def _finish_file(self, path, entry):
+        if entry.get("mtime") is not None:
+            os.utime(path, (entry["mtime"], entry["mtime"]))
+
+    def _fd(self, idx):
+        with self.lock:
+            fd = self.fds.get(idx)
+            if fd is None:
+                flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+                if idx not in self.have:
+                    flags |= os.O_TRUNC
+                fd = os.open(self.parts[idx], flags, 0o644)
+                os.ftruncate(fd, self.manifest[idx]["size"])  # preallocate
+                self.fds[idx] = fd
+            return fd
+
+    def write(self, idx, data, offset):
+        _pwrite(self._fd(idx), data, offset, self.locks[idx])
+
+    def copy(self, idx, offset, length, old_offset, buf):
+        """Apply a COPY frame: length bytes of the existing file at old_offset; returns their crc"""
+        crc = 0
+        with open(self.paths[idx], "rb") as old:
+            old.seek(old_offset)
+            while length:
+                n = old.readinto(buf[:min(length, len(buf))])
+                if not n:
+                    raise IOError(f"{self.paths[idx]} is shorter than the delta expects")
+                self.write(idx, buf[:n], offset)
+                crc = zlib.crc32(buf[:n], crc)
+                offset += n
+                length -= n
+        return crc
+
+    def chunk_done(self, idx, offset, length, crc):
+        """Account for a verified chunk; the file is moved into place once complete"""
+        with self.lock:
+            self.remaining[idx] -= length
+            self.state[self.manifest[idx]["path"]]["ranges"].append([offset, length, crc])
+            if self.remaining[idx] == 0:
+                self._complete(idx)
+            elif self.journal:
+                self.journal.save()
+
+    def _complete(self, idx):
+        fd = self.fds.pop(idx, None)
+        if fd is not None:
+            os.close(fd)
+        entry = self.manifest[idx]
+        os.replace(self.parts[idx], self.paths[idx])
+        self._finish_file(self.paths[idx], entry)
+        self.state[entry["path"]] = {"size": entry["size"], "mtime": entry["mtime"], "complete": True}
+        if self.journal:
+            self.journal.save()
+
+    def stream_started(self):
+        with self.lock:
+            self.active_streams += 1
+
+    def stream_finished(self, error=None):
+        with self.lock:
+            self.active_streams -= 1
+            if error and not self.error:
+                self.error = error
+            self.idle.notify_all()
+
+    def wait_streams(self):
+        with self.lock:
+            while self.active_streams:
+                self.idle.wait()
+
+    def close(self):
+        with self.lock:
+            for fd in self.fds.values():
+                os.close(fd)
+            self.fds.clear()
+            if self.journal:
+                if self.check_complete():
+                    self.journal.save(force=True)  # keep what arrived for the next attempt
+                else:
+                    self.journal.delete()
+
+    def check_complete(self):
+        if self.error:
+            return str(self.error)
+        missing = [e["path"] for e, r in zip(self.manifest, self.remaining) if r]
+        return f"incomplete files: {', '.join(missing[:5])}" if missing else None
+
+
+class _StrayConnection(ValueError):
+    """A connection that is neither a v3 transfer nor a well-formed legacy one"""
+
+
+class Receiver:
+    """
+    Listening socket that accepts v3 (and legacy) transfers. Each connection is
+    served on its own thread, so any number of senders can run at once.
+    serve_one() returns after the first complete transfer; serve_forever()
+    keeps accepting and reports every finished transfer to a callback.
+    """
+
+    def __init__(self, destination_dir=".", port=DEFAULT_PORT, host="", buffer_size=BUFFER_SIZE):
+        self.destination_dir = destination_dir
+        self.buffer_size = buffer_size
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(64)
+        self.port = self.sock.getsockname()[1]
+        self.transfers = {}
+        self.lock = threading.Lock()
+        self.completed = queue.Queue()
+
+    def close(self):
+        self.sock.close()
+
+    def _accept_until(self, on_result):
+        self.sock.settimeout(0.2)  # poll so finished transfers are noticed promptly
+        while True:
+            while True:
+                try:
+                    result = self.completed.get_nowait()
+                except queue.Empty:
+                    break
+                if on_result(result):
+                    return
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def serve_one(self):
+        """Accept connections until one transfer completes; returns its result path"""
+        results = []
+        self._accept_until(lambda r: results.append(r) or True)
+        if isinstance(results[0], Exception):
+            raise results[0]
+        return results[0]
+
+    def serve_forever(self, on_complete):
+        """Serve until interrupted; on_complete(path or Exception) runs per transfer"""
+        def _report(result):
+            on_complete(result)
+            return False  # never stop
+
+        self._accept_until(_report)
+
+    def _handle(self, conn):
+        """
+        Route one connection. Only a control connection or a legacy session
+        reports a result: a failed data stream is recorded on its transfer
+        (and reported by the control connection), stray connections are dropped.
+        """
+        with conn:
+            try:
+                _tune_socket(conn, self.buffer_size)
+                head = _peek(conn, len(MAGIC))
+                if not head:
+                    return  # connected and closed without sending anything (e.g. a port probe)
+                if head != MAGIC:
+                    self._report(self._handle_legacy, conn)
+                    return
+                magic, version, kind, transfer_id = PREFACE.unpack(_recv_exact(conn, PREFACE.size))
+            except OSError:
+                return  # not a transfer: closed before a full preface
+            if version != VERSION:
+                error = f"unsupported protocol version {version}"
+                try:
+                    _send_json(conn, {"ok": False, "error": error})
+                except OSError:
+                    pass
+                if kind == KIND_CONTROL:
+                    self.completed.put(ValueError(error))
+            elif kind == KIND_CONTROL:
+                self._report(self._handle_control, conn, transfer_id)
+            elif kind == KIND_DATA:
+                try:
+                    self._handle_data(conn, transfer_id)
+                except Exception:
+                    pass  # kept in transfer.error by _handle_data; unknown transfer ids are strays
+
+    def _report(self, handler, *args):
+        try:
+            result = handler(*args)
+        except _StrayConnection:
+            return
+        except Exception as e:
+            result = e
+        self.completed.put(result)
+
+    def _handle_control(self, conn, transfer_id):
+        header = _recv_json(conn)
+        files, dirs = [], []
+        while True:
+            batch = _recv_json(conn)
+            if batch.get("end"):
+                break
+            files += batch.get("files", [])
+            dirs += batch.get("dirs", [])
+        try:
+            root = _safe_join(self.destination_dir, header["root"])
+            journal = None
+            if header.get("resume_key"):
+                journal = TransferJournal("lan", os.path.abspath(self.destination_dir), header["resume_key"])
+            transfer = _IncomingTransfer(self.destination_dir, files, dirs, journal, header.get("delta", False))
+        except (ValueError, OSError, KeyError) as e:
+            _send_json(conn, {"ok": False, "error": str(e)})
+            raise
+        with self.lock:
+            self.transfers[transfer_id] = transfer
+        _send_json(conn, {
+            "ok": True,
+            "have": transfer.have,
+            "signatures": transfer.signatures,
+            "codecs": compress_utils.available_codecs(),
+        })
+
+        try:
+            _recv_json(conn)  # {"done": true} once the sender's data streams are finished
+        finally:
+            # Also on a dropped sender: keep the journal of what was written
+            transfer.wait_streams()
+            transfer.close()
+            with self.lock:
+                self.transfers.pop(transfer_id, None)
+        error = transfer.check_complete()
+        _send_json(conn, {"ok": error is None, "error": error})
+        if error:
+            raise RuntimeError(error)
+        return root
+
+    def _handle_data(self, conn, transfer_id):
+        with self.lock:
+            transfer = self.transfers.get(transfer_id)
+        if transfer is None:
+            raise ConnectionError("data connection for unknown transfer")
+        transfer.stream_started()
+        error = None
+        try:
+            buf = memoryview(bytearray(self.buffer_size))
+            while True:
+                idx, offset, raw_len, payload_len, flags, crc = CHUNK_HDR.unpack(_recv_exact(conn, CHUNK_HDR.size))
+                if idx == END_OF_STREAM:
+                    break
+                if idx >= len(transfer.paths) or offset + raw_len > transfer.manifest[idx]["size"]:
+                    raise ValueError("chunk outside manifest bounds")
+                if flags & FLAG_COPY:
+                    (old_offset,) = COPY_PAYLOAD.unpack(_recv_exact(conn, payload_len))
+                    crc = transfer.copy(idx, offset, raw_len, old_offset, buf)
+                    transfer.chunk_done(idx, offset, raw_len, crc)
+                    continue
+                if flags & (FLAG_ZLIB | FLAG_ZSTD):
+                    if payload_len >= raw_len:
+                        raise ValueError("compressed chunk is not smaller than its data")
+                    codec = "zstd" if flags & FLAG_ZSTD else "gzip"
+                    data = compress_utils.decompress(codec, _recv_exact(conn, payload_len), raw_len)
+                    if zlib.crc32(data) != crc:
+                        raise IOError(f"checksum mismatch in {transfer.manifest[idx]['path']} at offset {offset}")
+                    transfer.write(idx, data, offset)
+                    transfer.chunk_done(idx, offset, raw_len, crc)
+                    continue
+                if payload_len != raw_len:
+                    raise ValueError("raw chunk payload length does not match its data length")
+                pos, actual = offset, 0
+                while payload_len:
+                    n = min(payload_len, len(buf))
+                    _recv_into_exact(conn, buf[:n])
+                    transfer.write(idx, buf[:n], pos)
+                    actual = zlib.crc32(buf[:n], actual)
+                    pos += n
+                    payload_len -= n
+                if actual != crc:
+                    raise IOError(f"checksum mismatch in {transfer.manifest[idx]['path']} at offset {offset}")
+                transfer.chunk_done(idx, offset, raw_len, crc)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            transfer.stream_finished(error)
+
+    def _handle_legacy(self, conn):
+        """Pre-v2 sender: "name:size\\n" header followed by the raw file bytes"""
+        # Senders before the newline terminator wrote the bare "name:size" in
+        # one send() and relied on it arriving alone. Either way only the
+        # header is consumed here: no byte of it is ever written to the file.
+        head = conn.recv(LEGACY_BUFFER_SIZE, socket.MSG_PEEK)
+        end = head.find(b"\n")
+        header = _recv_exact(conn, end + 1 if end >= 0 else len(head))
+        filename, sep, size = header.rstrip(b"\n").rpartition(b":")
+        if not sep or not filename or not size.isdigit():
+            raise _StrayConnection(f"malformed legacy header: {header[:80]!r}")
+        filesize = int(size)
+        filepath = _safe_join(self.destination_dir, os.path.basename(filename.decode()))
+
+        bytes_received = 0
+        with open(filepath, "wb") as f:
+            while bytes_received < filesize:
+                bytes_read = conn.recv(min(LEGACY_BUFFER_SIZE, filesize - bytes_received))
+                if not bytes_read:
+                    break
+                f.write(bytes_read)
+                bytes_received += len(bytes_read)
+        if bytes_received < filesize:
+            os.remove(filepath)
+            raise ConnectionError(f"legacy transfer of {os.path.basename(filepath)} ended after "
+                                  f"{bytes_received} of {filesize} bytes")
+        return filepath
+
+
+def receive(destination_dir=".", port=DEFAULT_PORT, buffer_size=BUFFER_SIZE):
+    """Receive a single transfer (v3 or legacy) and return the saved path"""
+    receiver = Receiver(destination_dir, port, buffer_size=buffer_size)
+    try:
+        return receiver.serve_one()
+    finally:
+        receiver.close()
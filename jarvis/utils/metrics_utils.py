@@ -0,0 +1,277 @@
+"""
+Headless metrics recording for `system-monitor record/replay/summarize`.
+
+File layout (append-only, columnar):
+
+    header   MAGIC, u32 meta length, JSON meta (columns, byte order, totals)
+    block*   BLOCK_HDR (magic, rows, first ts, last ts), then each column's
+             values back to back as a raw array.array buffer
+
+The recorder keeps at most BLOCK_ROWS samples in memory (one array per
+column) and appends a block when it is full or FLUSH_EVERY seconds old, so a
+killed recorder loses at most a few seconds. A torn final block is ignored on
+read. Readers skip blocks outside the requested time window by seeking past
+them using the block's first/last timestamps. When a file grows past its size
+limit it is rotated to FILE.1, FILE.2, ... (oldest dropped).
+"""
+import array
+import bisect
+import json
+import math
+import os
+import socket
+import struct
+import sys
+import time
+from collections import namedtuple
+
+MAGIC = b"JVMETR01"
+BLOCK_MAGIC = b"JVMB"
+BLOCK_HDR = struct.Struct("<4sIdd")   # magic, rows, first ts, last ts
+BLOCK_ROWS = 512
+FLUSH_EVERY = 5.0
+MAX_FILE_SIZE = 64 * 1024 * 1024
+KEEP_FILES = 5
+
+# (name, array typecode): fixed width per record (52 bytes)
+COLUMNS = (
+    ("ts", "d"),
+    ("cpu", "f"),
+    ("mem_used", "Q"),
+    ("disk_used", "Q"),
+    ("net_sent", "Q"),
+    ("net_recv", "Q"),
+    ("net_sent_rate", "f"),
+    ("net_recv_rate", "f"),
+)
+SUMMARY_COLUMNS = ("cpu", "mem_used", "disk_used", "net_sent_rate", "net_recv_rate")
+
+Series = namedtuple("Series", "meta columns")
+
+
+def _columns():
+    return {name: array.array(code) for name, code in COLUMNS}
+
+
+def rotated_files(path):
+    """path's rotated predecessors and path itself, oldest first (existing files only)"""
+    older = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        older.append(f"{path}.{n}")
+        n += 1
+    files = list(reversed(older))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+class MetricsWriter:
+    """Appends monitor_utils.Sample rows to a metrics file"""
+
+    def __init__(self, path, interval, max_size=MAX_FILE_SIZE, keep=KEEP_FILES):
+        self.path = path
+        self.interval = interval
+        self.max_size = max_size
+        self.keep = keep
+        self.meta = None
+        self.rows = 0
+        self._buf = _columns()
+        self._buf_since = None
+        self._f = None
+
+    def _open(self, sample):
+        self.meta = {
+            "version": 1,
+            "host": socket.gethostname(),
+            "byteorder": sys.byteorder,
+            "interval": self.interval,
+            "mem_total": sample.mem_total,
+            "disk_total": sample.disk_total,
+            "columns": [list(c) for c in COLUMNS],
+        }
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if exists:
+            end = _valid_end(self.path)
+            self._f = open(self.path, "r+b")
+            self._f.truncate(end)  # drop a block torn by a previous crash, or new blocks would be unreachable
+            self._f.seek(end)
+        else:
+            self._f = open(self.path, "wb")
+            meta = json.dumps(self.meta).encode()
+            self._f.write(MAGIC + struct.pack("<I", len(meta)) + meta)
+
+    def append(self, sample):
+        if self._f is None:
+            self._open(sample)
+        for name, _ in COLUMNS:
+            self._buf[name].append(getattr(sample, name))
+        self.rows += 1
+        now = time.monotonic()
+        if self._buf_since is None:
+            self._buf_since = now
+        if len(self._buf["ts"]) >= BLOCK_ROWS or now - self._buf_since >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        ts = self._buf["ts"]
+        if not ts or self._f is None:
+            return
+        parts = [BLOCK_HDR.pack(BLOCK_MAGIC, len(ts), ts[0], ts[-1])]
+        parts.extend(self._buf[name].tobytes() for name, _ in COLUMNS)
+        self._f.write(b"".join(parts))  # one write per block
+        self._f.flush()
+        self._buf = _columns()
+        self._buf_since = None
+        if self._f.tell() >= self.max_size:
+            self._rotate()
+
+    def _rotate(self):
+        self._f.close()
+        self._f = None
+        oldest = f"{self.path}.{self.keep}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for n in range(self.keep - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.keep > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self):
+        self.flush()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def _read_meta(f, path):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path} is not a jarvis metrics file")
+    (meta_len,) = struct.unpack("<I", f.read(4))
+    meta = json.loads(f.read(meta_len))
+    if [list(c) for c in meta["columns"]] != [list(c) for c in COLUMNS]:
+        raise ValueError(f"{path} was written with a different column layout")
+    return meta
+
+
+def _valid_end(path):
+    """Offset just past the last complete block"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        meta = _read_meta(f, path)
+        end = f.tell()
+        row_size = sum(array.array(code).itemsize for _, code in meta["columns"])
+        while True:
+            hdr = f.read(BLOCK_HDR.size)
+            if len(hdr) < BLOCK_HDR.size:
+                return end
+            magic, rows, _, _ = BLOCK_HDR.unpack(hdr)
+            block_end = end + BLOCK_HDR.size + rows * row_size
+            if magic != BLOCK_MAGIC or block_end > size:
+                return end
+            f.seek(block_end)
+            end = block_end
+
+
+def last_timestamp(path):
+    """Timestamp of the newest recorded sample, read from block headers only"""
+    for name in reversed(rotated_files(path)):
+        last = None
+        with open(name, "rb") as f:
+            meta = _read_meta(f, name)
+            row_size = sum(array.array(code).itemsize for _, code in meta["columns"])
+            end = _valid_end(name)
+            while f.tell() < end:
+                _, rows, _, last = BLOCK_HDR.unpack(f.read(BLOCK_HDR.size))
+                f.seek(rows * row_size, os.SEEK_CUR)
+        if last is not None:
+            return last
+    return None
+
+
+def _read_file(path, since, until, columns):
+    with open(path, "rb") as f:
+        meta = _read_meta(f, path)
+        layout = [(name, code) for name, code in meta["columns"]]
+        swap = meta.get("byteorder", sys.byteorder) != sys.byteorder
+        while True:
+            hdr = f.read(BLOCK_HDR.size)
+            if len(hdr) < BLOCK_HDR.size:
+                break
+            magic, rows, first, last = BLOCK_HDR.unpack(hdr)
+            if magic != BLOCK_MAGIC:
+                break  # torn write
+            sizes = [rows * array.array(code).itemsize for _, code in layout]
+            if (since is not None and last < since) or (until is not None and first > until):
+                f.seek(sum(sizes), os.SEEK_CUR)
+                continue
+            block = {}
+            for (name, code), size in zip(layout, sizes):
+                raw = f.read(size)
+                if len(raw) < size:
+                    return meta  # torn final block
+                col = array.array(code)
+                col.frombytes(raw)
+                if swap:
+                    col.byteswap()
+                block[name] = col
+            for name in columns:
+                if name in block:
+                    columns[name].extend(block[name])
+    return meta
+
+
+def read_series(path, since=None, until=None, rotated=True):
+    """Load the samples between since and until (epoch seconds) as Series(meta, {column: array})"""
+    files = rotated_files(path) if rotated else [path]
+    if not files:
+        raise FileNotFoundError(path)
+    columns = _columns()
+    meta = {}
+    for name in files:
+        meta = _read_file(name, since, until, columns)
+    # Blocks overlapping the window edges bring in a few samples outside it
+    ts = columns["ts"]
+    lo = bisect.bisect_left(ts, since) if since is not None else 0
+    hi = bisect.bisect_right(ts, until) if until is not None else len(ts)
+    if lo > 0 or hi < len(ts):
+        columns = {name: col[lo:hi] for name, col in columns.items()}
+    return Series(meta, columns)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(series, columns=SUMMARY_COLUMNS):
+    """{column: {min, avg, p95, p99, max}} over whole columns at a time"""
+    out = {}
+    for name in columns:
+        col = series.columns[name]
+        if not col:
+            continue
+        ordered = sorted(col)
+        out[name] = {
+            "min": ordered[0],
+            "avg": sum(col) / len(col),
+            "p95": percentile(ordered, 95),
+            "p99": percentile(ordered, 99),
+            "max": ordered[-1],
+        }
+    return out
+
+
+def parse_duration(text):
+    """'90' / '90s' / '5m' / '1h' / '1d' -> seconds"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
@@ -0,0 +1,215 @@
+"""
+Sampling engine for `system-monitor`.
+
+Collector.sample() reads every metric the monitor shows in one pass and turns
+cumulative kernel counters (network bytes) into per-second rates from the
+delta since the previous sample. Slow-changing values (filesystem usage) are
+refreshed every SLOW_EVERY seconds instead of on every sample, so sub-second
+intervals stay cheap. Per-core, per-disk and per-NIC figures are only read
+when asked for. ProcessSampler keeps a top-N process table up to date
+without re-reading every field of every process on each tick.
+OverheadMeter measures the monitor's own CPU usage.
+"""
+import heapq
+import time
+from collections import namedtuple
+
+import psutil
+
+SLOW_EVERY = 5.0  # seconds between filesystem usage reads / process name refreshes
+SKIP_DISKS = ("loop", "ram", "zram")  # virtual block devices
+
+Sample = namedtuple(
+    "Sample",
+    "ts cpu mem_used mem_total disk_used disk_total net_sent net_recv net_sent_rate net_recv_rate "
+    "percpu disks nics",
+    defaults=(None, None, None),
+)
+DiskRate = namedtuple("DiskRate", "read_iops write_iops read_rate write_rate")
+NicRate = namedtuple("NicRate", "sent_rate recv_rate")
+ProcRow = namedtuple("ProcRow", "pid name user cpu rss")
+
+
+def _rates(prev, cur, dt, fields):
+    """Per-second deltas of counter fields for every key in both snapshots"""
+    out = {}
+    for key, counters in cur.items():
+        before = prev.get(key)
+        if before is None or dt <= 0:
+            continue
+        out[key] = tuple(max(0, getattr(counters, f) - getattr(before, f)) / dt for f in fields)
+    return out
+
+
+class Collector:
+    """Samples CPU, memory, disk usage and network rates; not thread-safe"""
+
+    def __init__(self, disk_path="/", slow_every=SLOW_EVERY, percpu=False, disks=False, nics=False):
+        self.disk_path = disk_path
+        self.slow_every = slow_every
+        self.percpu = percpu
+        self._disk = None
+        self._disk_ts = float("-inf")
+        # prime: the first call has no previous reading
+        if percpu:
+            psutil.cpu_percent(interval=None, percpu=True)
+        else:
+            psutil.cpu_percent(interval=None)
+        self._disks = self._read_disks() if disks else None
+        self._nics = psutil.net_io_counters(pernic=True) if nics else None
+        self._net = psutil.net_io_counters()
+        self._ts = time.monotonic()
+
+    @staticmethod
+    def _read_disks():
+        counters = psutil.disk_io_counters(perdisk=True) or {}
+        return {name: c for name, c in counters.items() if not name.startswith(SKIP_DISKS)}
+
+    def sample(self):
+        now = time.monotonic()
+        dt = now - self._ts
+        percpu = disks = nics = None
+        if self.percpu:
+            # One /proc/stat read: the total is the mean over cores
+            percpu = psutil.cpu_percent(interval=None, percpu=True)
+            cpu = sum(percpu) / len(percpu) if percpu else 0.0
+        else:
+            cpu = psutil.cpu_percent(interval=None)
+        mem = psutil.virtual_memory()
+        if now - self._disk_ts >= self.slow_every:
+            self._disk = psutil.disk_usage(self.disk_path)
+            self._disk_ts = now
+        net = psutil.net_io_counters()
+        if self._disks is not None:
+            current = self._read_disks()
+            disks = {k: DiskRate(*v) for k, v in _rates(
+                self._disks, current, dt, ("read_count", "write_count", "read_bytes", "write_bytes")).items()}
+            self._disks = current
+        if self._nics is not None:
+            current = psutil.net_io_counters(pernic=True)
+            nics = {k: NicRate(*v) for k, v in _rates(self._nics, current, dt, ("bytes_sent", "bytes_recv")).items()}
+            self._nics = current
+
+        if dt > 0:
+            # max(): counters can go backwards when an interface disappears
+            sent_rate = max(0, net.bytes_sent - self._net.bytes_sent) / dt
+            recv_rate = max(0, net.bytes_recv - self._net.bytes_recv) / dt
+        else:
+            sent_rate = recv_rate = 0.0
+        self._net, self._ts = net, now
+
+        return Sample(
+            time.time(), cpu, mem.used, mem.total, self._disk.used, self._disk.total,
+            net.bytes_sent, net.bytes_recv, sent_rate, recv_rate, percpu, disks, nics,
+        )
+
+
+class ProcessSampler:
+    """
+    Top-N processes by "cpu" or "rss". psutil.Process objects are cached
+    across ticks (cpu_percent() needs the previous reading anyway). Each tick
+    reads only the sort key for every process (one small /proc read each).
+    The other columns are read for the N winners only. Names and users are
+    cached and refreshed every slow_every seconds.
+    """
+
+    def __init__(self, n=10, sort="cpu", slow_every=SLOW_EVERY):
+        self.n = n
+        self.sort = sort
+        self.slow_every = slow_every
+        self._procs = {}
+        self._labels = {}  # pid -> (name, user, read at)
+
+    def _sync_pids(self):
+        pids = set(psutil.pids())
+        for pid in self._procs.keys() - pids:
+            del self._procs[pid]
+            self._labels.pop(pid, None)
+        for pid in pids - self._procs.keys():
+            try:
+                proc = psutil.Process(pid)
+                if self.sort == "cpu":
+                    proc.cpu_percent(None)  # prime; the first real value comes next tick
+                self._procs[pid] = proc
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+
+    def _key(self, proc):
+        if self.sort == "cpu":
+            return proc.cpu_percent(None)
+        return proc.memory_info().rss
+
+    def _label(self, proc, now):
+        cached = self._labels.get(proc.pid)
+        if cached is None or now - cached[2] >= self.slow_every:
+            try:
+                user = proc.username()
+            except (psutil.AccessDenied, KeyError):
+                user = "?"
+            cached = (proc.name(), user, now)
+            self._labels[proc.pid] = cached
+        return cached[0], cached[1]
+
+    def sample(self):
+        self._sync_pids()
+        keyed = []
+        for pid, proc in list(self._procs.items()):
+            try:
+                keyed.append((self._key(proc), pid))
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                del self._procs[pid]
+            except psutil.AccessDenied:
+                continue
+
+        now = time.monotonic()
+        rows = []
+        for key, pid in heapq.nlargest(self.n, keyed):
+            proc = self._procs[pid]
+            try:
+                name, user = self._label(proc, now)
+                if self.sort == "cpu":
+                    cpu, rss = key, proc.memory_info().rss
+                else:
+                    cpu, rss = proc.cpu_percent(None), key
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            rows.append(ProcRow(pid, name, user, cpu, rss))
+        return rows
+
+
+class OverheadMeter:
+    """CPU% used by this process since the previous update() (100 = one full core)"""
+
+    def __init__(self):
+        self._proc = psutil.Process()
+        self._cpu = self._cpu_seconds()
+        self._ts = time.monotonic()
+        self._start_cpu, self._start_ts = self._cpu, self._ts
+
+    def _cpu_seconds(self):
+        t = self._proc.cpu_times()
+        return t.user + t.system
+
+    def update(self):
+        cpu, now = self._cpu_seconds(), time.monotonic()
+        dt = now - self._ts
+        percent = (cpu - self._cpu) / dt * 100 if dt > 0 else 0.0
+        self._cpu, self._ts = cpu, now
+        return percent
+
+    def average(self):
+        """CPU% since the meter was created"""
+        dt = time.monotonic() - self._start_ts
+        return (self._cpu_seconds() - self._start_cpu) / dt * 100 if dt > 0 else 0.0
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def format_rate(n):
+    return f"{format_bytes(n)}/s"
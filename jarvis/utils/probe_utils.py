@@ -0,0 +1,151 @@
+"""
+Concurrent TCP reachability probing (asyncio).
+
+probe() checks many host:port pairs at once, each with its own timeout, and
+classifies every pair as "open" (connected), "closed" (refused), "filtered"
+(no answer before the timeout) or "unreachable" (other network errors).
+Host names are resolved once per host, not once per port. Results of small
+probes are cached for CACHE_TTL seconds in ~/.jarvis/probe_cache.json so
+repeated checks (setup, then transfer, then diagnostics) do not re-probe.
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import namedtuple
+from pathlib import Path
+
+PROBE_TIMEOUT = 1.0
+PROBE_CONCURRENCY = 1000
+CACHE_FILE = Path.home() / ".jarvis" / "probe_cache.json"
+CACHE_TTL = 30.0
+CACHE_MAX_PAIRS = 4096  # full-range scans are not cached: loading them would slow every small probe
+
+ProbeResult = namedtuple("ProbeResult", "host port state latency")
+
+
+def parse_ports(spec):
+    """'22,80,8000-8100' -> sorted list of ports"""
+    ports = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, _, high = part.partition("-")
+        low, high = int(low), int(high or low)
+        if not (1 <= low <= high <= 65535):
+            raise ValueError(f"invalid port range: {part}")
+        ports.update(range(low, high + 1))
+    return sorted(ports)
+
+
+def _max_concurrency(requested):
+    """Stay under the open-file limit (each in-flight probe holds a socket)"""
+    try:
+        import resource
+
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            return max(1, min(requested, soft - 64))
+    except (ImportError, ValueError, OSError):
+        pass  # Windows: no RLIMIT_NOFILE
+    return requested
+
+
+# ----------------- cache ----------------- #
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    now = time.time()
+    cache = {k: v for k, v in cache.items() if now - v[2] < CACHE_TTL}
+    try:
+        CACHE_FILE.parent.mkdir(exist_ok=True)
+        tmp = CACHE_FILE.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, CACHE_FILE)
+    except OSError:
+        pass  # the cache is an optimisation only
+
+
+# ----------------- probing ----------------- #
+
+async def _resolve(loop, host):
+    try:
+        infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        return infos[0][0], infos[0][4][0]
+    except (socket.gaierror, OSError):
+        return None
+
+
+async def _probe_one(loop, host, target, port, timeout):
+    if target is None:
+        return ProbeResult(host, port, "unreachable", None)
+    family, address = target
+    # Raw non-blocking sockets: no stream reader/writer per probe
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (address, port)), timeout)
+        return ProbeResult(host, port, "open", time.perf_counter() - start)
+    except asyncio.TimeoutError:
+        return ProbeResult(host, port, "filtered", None)
+    except ConnectionRefusedError:
+        return ProbeResult(host, port, "closed", time.perf_counter() - start)
+    except OSError:
+        return ProbeResult(host, port, "unreachable", None)
+    finally:
+        sock.close()
+
+
+async def _probe_all(pairs, timeout, concurrency):
+    loop = asyncio.get_running_loop()
+    hosts = sorted({h for h, _ in pairs})
+    targets = dict(zip(hosts, await asyncio.gather(*(_resolve(loop, h) for h in hosts))))
+    results = []
+    todo = iter(pairs)
+
+    async def worker():
+        # A fixed pool of workers instead of one task per pair keeps scheduling
+        # overhead flat for 65535-port scans
+        for host, port in todo:
+            results.append(await _probe_one(loop, host, targets[host], port, timeout))
+
+    await asyncio.gather(*(worker() for _ in range(min(len(pairs), _max_concurrency(concurrency)))))
+    return results
+
+
+def probe(pairs, timeout=PROBE_TIMEOUT, concurrency=PROBE_CONCURRENCY, use_cache=True):
+    """Probe (host, port) pairs concurrently; returns {(host, port): ProbeResult}"""
+    pairs = list(dict.fromkeys((h, int(p)) for h, p in pairs))
+    results = {}
+    cache = _load_cache() if use_cache else {}
+    now = time.time()
+    todo = []
+    for host, port in pairs:
+        hit = cache.get(f"{host}:{port}")
+        if hit and now - hit[2] < CACHE_TTL:
+            results[(host, port)] = ProbeResult(host, port, hit[0], hit[1])
+        else:
+            todo.append((host, port))
+
+    if todo:
+        for r in asyncio.run(_probe_all(todo, timeout, concurrency)):
+            results[(r.host, r.port)] = r
+            cache[f"{r.host}:{r.port}"] = [r.state, r.latency, now]
+        if use_cache and len(todo) <= CACHE_MAX_PAIRS:
+            _save_cache(cache)
+    return results
+
+
+def is_open(host, port, timeout=PROBE_TIMEOUT, use_cache=True):
+    return probe([(host, port)], timeout, use_cache=use_cache)[(host, int(port))].state == "open"
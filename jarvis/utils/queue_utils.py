@@ -0,0 +1,233 @@
+"""
+Batch transfer queue for `file-transfer queue`.
+
+A queue is a list of (profile, source) jobs run concurrently with:
+- a global bandwidth cap shared by every job (token bucket, bytes/s),
+- a per-host limit on simultaneous jobs (local jobs count as host "local"),
+- retries with exponential backoff (interrupted large files resume, so a
+  retry only re-sends what is missing).
+
+Queue state is persisted to a journal under ~/.jarvis/transfers after every
+status change, so `queue --resume` continues a crashed or interrupted run.
+"""
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from jarvis.utils import file_utils, lan_utils
+from jarvis.utils.journal_utils import TransferJournal
+
+QUEUE_CONCURRENCY = 4
+PER_HOST_LIMIT = 2
+MAX_RETRIES = 3
+BACKOFF_BASE = 2.0     # seconds before the first retry, doubled per attempt
+BACKOFF_MAX = 60.0
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(text):
+    """'20M' / '512K' / '1000' (bytes per second, K/M/G = 1024 powers) -> int; None/0 = unlimited"""
+    if not text:
+        return None
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?(?:/S)?\s*", text.upper())
+    if not m:
+        raise ValueError(f"invalid rate {text!r} (use e.g. 500K, 20M, 1G)")
+    return int(float(m.group(1)) * _UNITS[m.group(2)]) or None
+
+
+def parse_jobs(lines):
+    """Parse 'PROFILE SOURCE' lines (blank lines and # comments ignored) into job dicts"""
+    jobs = []
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(None, 1)
+        if len(parts) != 2:
+            raise ValueError(f"line {lineno}: expected 'PROFILE SOURCE', got {line!r}")
+        jobs.append({"profile": parts[0], "source": parts[1]})
+    return jobs
+
+
+class RateLimiter:
+    """Token bucket shared by all transfer threads; consume() sleeps off any overdraft"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate or 0
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, n):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= n
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+class QueueStopped(Exception):
+    """Raised inside a running job when the queue is interrupted"""
+
+
+class TransferQueue:
+    """
+    Runs queued jobs. Optional hooks: on_start(job, total_bytes) and
+    on_bytes(job, n) are called from worker threads, on_retry(job, delay) and
+    on_finish(job) from the thread running run().
+    """
+
+    def __init__(self, concurrency=QUEUE_CONCURRENCY, per_host=PER_HOST_LIMIT, bwlimit=None,
+                 retries=MAX_RETRIES):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.limiter = RateLimiter(bwlimit)
+        self.retries = retries
+        self.journal = TransferJournal("queue")
+        self.lock = threading.Lock()
+        self.stop = threading.Event()  # set on Ctrl+C; running jobs abort at their next chunk
+
+    # ----------------- state ----------------- #
+
+    @property
+    def jobs(self):
+        return self.journal.data.get("jobs", [])
+
+    def create(self, jobs):
+        """Start a new queue (replacing any previous one)"""
+        self.journal.reset(jobs=[
+            {"id": i, "profile": j["profile"], "source": j["source"], "status": "pending",
+             "attempts": 0, "error": None}
+            for i, j in enumerate(jobs, 1)
+        ])
+        self._save()
+
+    def resume(self):
+        """Re-queue every unfinished job of the persisted queue; returns how many"""
+        todo = 0
+        for job in self.jobs:
+            if job["status"] != "done":
+                job.update(status="pending", attempts=0, error=None)
+                todo += 1
+        self._save()
+        return todo
+
+    def _save(self):
+        with self.lock:
+            self.journal.save(force=True)
+
+    # ----------------- running ----------------- #
+
+    @staticmethod
+    def _host(config):
+        return "local" if config.get("mode") == "local" else config.get("ip")
+
+    def _run_job(self, job, config, hooks):
+        try:
+            manifest, _, _ = lan_utils.build_manifest(job["source"])
+            total = sum(e["size"] for e in manifest)
+        except OSError:
+            total = 0
+        if hooks.get("on_start"):
+            hooks["on_start"](job, total)
+
+        on_bytes = hooks.get("on_bytes")
+
+        def meter(n):
+            if self.stop.is_set():
+                raise QueueStopped("queue interrupted")
+            self.limiter.consume(n)
+            if on_bytes:
+                on_bytes(job, n)
+
+        file_utils.run_transfer(config, source=job["source"], meter=meter)
+
+    def run(self, hooks=None):
+        """Run all pending jobs; returns (done, failed) counts for this run"""
+        hooks = hooks or {}
+        self.stop.clear()
+        profiles = file_utils.list_profiles()
+        pending = [j for j in self.jobs if j["status"] == "pending"]
+        not_before = {}
+        active = {}
+        running = {}
+        done = failed = 0
+
+        def finish(job, status, error=None):
+            job.update(status=status, error=error)
+            self._save()
+            if hooks.get("on_finish"):
+                hooks["on_finish"](job)
+
+        pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            while pending or running:
+                now = time.monotonic()
+                for job in list(pending):
+                    if len(running) >= self.concurrency:
+                        break
+                    config = profiles.get(job["profile"])
+                    if config is None:
+                        pending.remove(job)
+                        failed += 1
+                        finish(job, "failed", f"unknown profile '{job['profile']}'")
+                        continue
+                    host = self._host(config)
+                    if active.get(host, 0) >= self.per_host or not_before.get(job["id"], 0) > now:
+                        continue
+                    pending.remove(job)
+                    active[host] = active.get(host, 0) + 1
+                    job.update(status="running", attempts=job["attempts"] + 1)
+                    self._save()
+                    running[pool.submit(self._run_job, job, config, hooks)] = (job, host)
+
+                if not running:
+                    time.sleep(0.1)  # everything left is waiting out a backoff
+                    continue
+                finished, _ = wait(running, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job, host = running.pop(future)
+                    active[host] -= 1
+                    error = future.exception()
+                    if error is None:
+                        done += 1
+                        finish(job, "done")
+                    elif job["attempts"] <= self.retries:
+                        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (job["attempts"] - 1))
+                        delay *= random.uniform(0.8, 1.2)
+                        not_before[job["id"]] = time.monotonic() + delay
+                        job.update(status="pending", error=str(error))
+                        self._save()
+                        pending.append(job)
+                        if hooks.get("on_retry"):
+                            hooks["on_retry"](job, delay)
+                    else:
+                        failed += 1
+                        finish(job, "failed", str(error))
+        except KeyboardInterrupt:
+            # Don't wait for in-flight transfers: they stop at their next chunk
+            # (journaled, so --resume continues them) and are requeued.
+            self.stop.set()
+            # by status, not `running`: Ctrl+C can land between submit() and recording the future
+            for job in self.jobs:
+                if job["status"] == "running":
+                    job.update(status="pending", error="interrupted")
+            self._save()
+            if sys.version_info >= (3, 9):
+                pool.shutdown(wait=False, cancel_futures=True)
+            else:
+                for future in running:
+                    future.cancel()
+                pool.shutdown(wait=False)
+            raise
+        pool.shutdown()
+        return done, failed
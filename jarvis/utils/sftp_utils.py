@@ -0,0 +1,163 @@
+"""
+SFTP uploads for `file-transfer` remote mode.
+
+SSH sessions are cached per (host, port, username) for the life of the
+process, so a directory upload (or several transfers in one run) pays for the
+TCP connect, key exchange and authentication once. A directory is uploaded by
+SFTP_CHANNELS worker threads, each with its own SFTP channel on the shared
+transport: one channel waits on its server's acknowledgements while the others
+keep the pipe full. Channels are opened with a large window and the maximum
+SFTP packet size, and files are written in pipelined mode (no round trip per
+write request).
+
+SFTP servers store exactly the bytes they receive, so compression happens at
+the SSH transport layer (zlib, the only SSH compression paramiko speaks);
+sessions with and without compression are cached separately.
+"""
+import atexit
+import posixpath
+import queue
+import socket
+import stat
+import threading
+
+import paramiko
+
+from jarvis.utils import compress_utils, lan_utils
+from jarvis.utils.file_utils import SftpFS, transfer_file
+
+SFTP_CHANNELS = 4
+WINDOW_SIZE = 64 * 1024 * 1024   # per-channel flow-control window (paramiko default: 2 MiB)
+MAX_PACKET_SIZE = 32768          # largest data packet SFTP servers accept
+CONNECT_TIMEOUT = 15
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(host, username, password, port=22, compress=False):
+    """Return a connected SSHClient for (host, port, username), reusing a live one"""
+    key = (host, port, username, compress)
+    with _sessions_lock:
+        client = _sessions.get(key)
+        transport = client.get_transport() if client else None
+        if transport is not None and transport.is_active():
+            return client
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(host, port=port, username=username, password=password, timeout=CONNECT_TIMEOUT,
+                       compress=compress)
+        # SFTP is request/response: without NODELAY, Nagle + delayed ACK add ~40 ms per round trip
+        client.get_transport().sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        _sessions[key] = client
+        return client
+
+
+def open_sftp(client):
+    """New SFTP channel on the client's transport, with the tuned window/packet size"""
+    return paramiko.SFTPClient.from_transport(
+        client.get_transport(), window_size=WINDOW_SIZE, max_packet_size=MAX_PACKET_SIZE
+    )
+
+
+def close_sessions():
+    with _sessions_lock:
+        for client in _sessions.values():
+            client.close()
+        _sessions.clear()
+
+
+atexit.register(close_sessions)
+
+
+def wants_compression(source, compress):
+    """
+    Whether to enable SSH compression for --compress: any codec turns it on;
+    "auto" samples the start of the largest files and only enables it when
+    they compress (logs, dumps) rather than being media or archives.
+    """
+    if compress in (None, "none"):
+        return False
+    if compress != "auto":
+        return True
+    manifest, sources, _ = lan_utils.build_manifest(source)
+    largest = sorted(zip(manifest, sources), key=lambda pair: -pair[0]["size"])[:4]
+    raw = packed = 0
+    for entry, path in largest:
+        with open(path, "rb") as f:
+            sample = f.read(compress_utils.COMPRESS_SAMPLE)
+        raw += len(sample)
+        packed += len(sample) * compress_utils.sample_ratio(sample)
+    return raw > 0 and packed / raw <= compress_utils.SKIP_RATIO
+
+
+def makedirs(sftp, path):
+    """mkdir -p over SFTP"""
+    missing = []
+    while path not in ("", "/"):
+        try:
+            if stat.S_ISDIR(sftp.stat(path).st_mode):
+                break
+            raise NotADirectoryError(f"{path} exists and is not a directory")
+        except FileNotFoundError:
+            missing.append(path)
+            path = posixpath.dirname(path)
+    for d in reversed(missing):
+        try:
+            sftp.mkdir(d)
+        except IOError:
+            if not stat.S_ISDIR(sftp.stat(d).st_mode):  # created concurrently is fine
+                raise
+
+
+def _upload_worker(client, host, jobs, delta, errors, sent, meter):
+    n_sent = 0
+    sftp = open_sftp(client)
+    fs = SftpFS(sftp, host)
+    try:
+        while not errors:
+            try:
+                src, dst, mtime = jobs.get_nowait()
+            except queue.Empty:
+                break
+            n_sent += transfer_file(src, dst, fs, delta=delta, meter=meter)
+            sftp.utime(dst, (mtime, mtime))
+    except Exception as e:
+        errors.append(e)
+    finally:
+        sftp.close()
+        sent.append(n_sent)
+
+
+def upload(client, host, source, destination, channels=SFTP_CHANNELS, delta=False, meter=None):
+    """
+    Upload a file or directory tree into the remote directory destination over
+    `channels` concurrent SFTP channels. Returns (remote path, bytes sent).
+    """
+    manifest, sources, dirs = lan_utils.build_manifest(source)
+    sftp = open_sftp(client)
+    try:
+        makedirs(sftp, destination)
+        for d in dirs:  # parents come before children in build_manifest order
+            makedirs(sftp, posixpath.join(destination, d))
+    finally:
+        sftp.close()
+
+    jobs = queue.Queue()
+    # Largest first, so one big file does not end up alone at the tail
+    for entry, src in sorted(zip(manifest, sources), key=lambda pair: -pair[0]["size"]):
+        jobs.put((src, posixpath.join(destination, entry["path"]), entry["mtime"]))
+
+    errors, sent = [], []
+    threads = [
+        threading.Thread(target=_upload_worker, args=(client, host, jobs, delta, errors, sent, meter))
+        for _ in range(max(1, min(channels, jobs.qsize())))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    root = dirs[0] if dirs else manifest[0]["path"]
+    return posixpath.join(destination, root), sum(sent)
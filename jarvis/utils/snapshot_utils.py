@@ -0,0 +1,421 @@
+"""
+One-pass process-table snapshots for process-killer and port-checker.
+
+take() reads the process table once into a ProcessTable: parallel arrays
+(struct-of-arrays) of pids, ppids, uids and states plus a list of names.
+With sockets=True it also records which socket inodes each process holds.
+Name, user, port and tree queries are answered from indexes built lazily
+over that snapshot, so a query never goes back to the kernel per process.
+
+On Linux everything comes straight from /proc: one small read of
+/proc/PID/stat and one stat() per process, and an fd listing only when
+sockets are wanted. Elsewhere the same table is filled from
+psutil.process_iter() with a minimal attribute list, and port owners from
+psutil.net_connections().
+"""
+import array
+import os
+import socket
+import sys
+from collections import namedtuple
+
+import psutil
+
+PROC_ROOT = "/proc"
+SOCKET_TABLES = ("tcp", "tcp6", "udp", "udp6")
+TCP_LISTEN = "0A"
+COMM_LEN = 15  # /proc/PID/stat names longer than this are truncated
+
+# /proc/PID/stat state letters -> psutil status strings
+_STATES = {
+    "R": psutil.STATUS_RUNNING, "S": psutil.STATUS_SLEEPING, "D": psutil.STATUS_DISK_SLEEP,
+    "Z": psutil.STATUS_ZOMBIE, "T": psutil.STATUS_STOPPED, "t": psutil.STATUS_TRACING_STOP,
+    "X": psutil.STATUS_DEAD, "I": getattr(psutil, "STATUS_IDLE", "idle"),
+    "W": getattr(psutil, "STATUS_WAKING", "waking"), "P": getattr(psutil, "STATUS_PARKED", "parked"),
+}
+
+# /proc/net/tcp state codes -> psutil connection statuses
+_TCP_STATES = {
+    "01": psutil.CONN_ESTABLISHED, "02": psutil.CONN_SYN_SENT, "03": psutil.CONN_SYN_RECV,
+    "04": psutil.CONN_FIN_WAIT1, "05": psutil.CONN_FIN_WAIT2, "06": psutil.CONN_TIME_WAIT,
+    "07": psutil.CONN_CLOSE, "08": psutil.CONN_CLOSE_WAIT, "09": psutil.CONN_LAST_ACK,
+    TCP_LISTEN: psutil.CONN_LISTEN, "0B": psutil.CONN_CLOSING,
+}
+UDP_UNCONNECTED = "07"
+
+# One line of /proc/net/{tcp,udp}[6]: local port, TCP state, socket inode and
+# the local address as the kernel prints it (hex, decoded only when shown)
+SocketEntry = namedtuple("SocketEntry", "proto port state inode addr", defaults=("",))
+
+# A local socket as listed by port-checker: row is the owner's table row (None = not visible)
+LocalSocket = namedtuple("LocalSocket", "proto address port state row")
+
+# Shape of psutil.net_connections() entries, for per-process connections (which lack pid)
+_Conn = namedtuple("_Conn", "fd family type laddr raddr status pid")
+
+_user_cache = {}
+
+
+def user_name(uid):
+    """uid -> user name, looked up once per uid"""
+    if uid not in _user_cache:
+        try:
+            import pwd
+
+            _user_cache[uid] = pwd.getpwuid(uid).pw_name
+        except (ImportError, KeyError):
+            _user_cache[uid] = str(uid)
+    return _user_cache[uid]
+
+
+def read_socket_table(proc_root=PROC_ROOT):
+    """All sockets from /proc/net/{tcp,tcp6,udp,udp6} as SocketEntry rows"""
+    entries = []
+    for proto in SOCKET_TABLES:
+        try:
+            with open(os.path.join(proc_root, "net", proto)) as f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 10:
+                        continue
+                    addr, port = fields[1].rsplit(":", 1)
+                    entries.append(SocketEntry(proto, int(port, 16), fields[3], int(fields[9]), addr))
+        except OSError:
+            continue
+    return entries
+
+
+def decode_address(addr):
+    """Hex address from /proc/net/* -> printable IP (each 32-bit word is in host byte order)"""
+    raw = bytes.fromhex(addr)
+    if sys.byteorder == "little":
+        raw = b"".join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    return socket.inet_ntop(socket.AF_INET if len(raw) == 4 else socket.AF_INET6, raw)
+
+
+def _proc_connections(proc, kind):
+    # psutil >= 6 renamed Process.connections() to net_connections()
+    method = getattr(proc, "net_connections", None) or proc.connections
+    return method(kind=kind)
+
+
+def net_connections(kind="inet"):
+    """
+    All sockets in one kernel enumeration (psutil). Where the system-wide call
+    needs privileges (macOS), fall back to walking the processes we can see.
+    """
+    try:
+        return psutil.net_connections(kind=kind)
+    except psutil.AccessDenied:
+        conns = []
+        for proc in psutil.process_iter():
+            try:
+                conns.extend(_Conn(*c, pid=proc.pid) for c in _proc_connections(proc, kind))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return conns
+
+
+class ProcessTable:
+    """A snapshot of the process table; row i describes pids[i]"""
+
+    def __init__(self, proc_root=PROC_ROOT):
+        self.proc_root = proc_root
+        self.pids = array.array("i")
+        self.ppids = array.array("i")
+        self.uids = array.array("i")      # -1 when unknown
+        self.states = bytearray()         # /proc state letter, "?" when unknown
+        self.names = []
+        self.sock_inodes = array.array("Q")   # parallel with sock_rows: socket inode -> owning row
+        self.sock_rows = array.array("i")
+        self.sockets = None               # socket table read up front by take(ports=...)
+        self.port_pids = None             # non-Linux: port -> {pid} from psutil.net_connections
+        self.connections = None           # non-Linux: the psutil.net_connections() rows themselves
+        self.users = {}                   # non-POSIX: row -> user name
+        self._row_of = None
+        self._children = None
+        self._by_name = None
+        self._inode_row = None
+
+    def __len__(self):
+        return len(self.pids)
+
+    # ----------------- indexes (built on first use) ----------------- #
+
+    @property
+    def row_of(self):
+        if self._row_of is None:
+            self._row_of = {pid: row for row, pid in enumerate(self.pids)}
+        return self._row_of
+
+    @property
+    def children(self):
+        if self._children is None:
+            self._children = {}
+            for row, ppid in enumerate(self.ppids):
+                self._children.setdefault(ppid, []).append(row)
+        return self._children
+
+    @property
+    def by_name(self):
+        if self._by_name is None:
+            self._by_name = {}
+            for row, name in enumerate(self.names):
+                self._by_name.setdefault(name, []).append(row)
+        return self._by_name
+
+    # ----------------- queries ----------------- #
+
+    def user(self, row):
+        if row in self.users:
+            return self.users[row]
+        uid = self.uids[row]
+        return user_name(uid) if uid >= 0 else "N/A"
+
+    def status(self, row):
+        return _STATES.get(chr(self.states[row]), "N/A")
+
+    def info(self, row):
+        return {"pid": self.pids[row], "name": self.names[row], "user": self.user(row), "status": self.status(row)}
+
+    def match_names(self, pattern):
+        """Rows whose name matches a compiled regex (evaluated once per distinct name)"""
+        rows = []
+        for name, name_rows in self.by_name.items():
+            if pattern.search(name):
+                rows.extend(name_rows)
+        return sorted(rows)
+
+    def rows_for_user(self, user):
+        return [row for row in range(len(self.pids)) if self.user(row) == user]
+
+    def descendants(self, rows):
+        """rows plus every descendant of them (each once, parents first)"""
+        seen = set(rows)
+        order = list(rows)
+        for row in order:  # grows while iterating: breadth-first walk
+            for child in self.children.get(self.pids[row], ()):
+                if child not in seen:
+                    seen.add(child)
+                    order.append(child)
+        return order
+
+    def rows_for_ports(self, ports, listening=False, sockets=None):
+        """
+        port -> [rows] of the processes with a local socket on each port. A
+        None entry stands for sockets whose owner is not visible to us (other
+        users' processes without root).
+        """
+        ports = set(ports)
+        result = {port: [] for port in ports}
+        if self.port_pids is not None:
+            for port in ports:
+                owners = self.port_pids.get(port, ())
+                result[port] = sorted(self.row_of[p] for p in owners if p in self.row_of)
+                if any(p not in self.row_of for p in owners):
+                    result[port].append(None)
+            return result
+        if self._inode_row is None:
+            self._inode_row = dict(zip(self.sock_inodes, self.sock_rows))
+        if sockets is None:
+            sockets = self.sockets if self.sockets is not None else read_socket_table(self.proc_root)
+        for entry in sockets:
+            if entry.port not in ports or (listening and entry.proto.startswith("tcp") and entry.state != TCP_LISTEN):
+                continue
+            if entry.inode == 0:
+                continue  # TIME_WAIT and friends: no process holds them any more
+            row = self._inode_row.get(entry.inode)
+            if row not in result[entry.port]:
+                result[entry.port].append(row)
+        return result
+
+    def local_sockets(self, listening=False):
+        """
+        Every local socket as a LocalSocket, sorted by port. listening keeps
+        TCP sockets in LISTEN and unconnected UDP sockets only.
+        """
+        result = []
+        if self.connections is not None:
+            for c in self.connections:
+                if not c.laddr:
+                    continue
+                tcp = c.type == socket.SOCK_STREAM
+                if listening and not (c.status == psutil.CONN_LISTEN if tcp else not c.raddr):
+                    continue
+                row = self.row_of.get(c.pid)
+                state = c.status if c.status != psutil.CONN_NONE else ""
+                result.append(LocalSocket("tcp" if tcp else "udp", c.laddr.ip, c.laddr.port, state, row))
+        else:
+            if self._inode_row is None:
+                self._inode_row = dict(zip(self.sock_inodes, self.sock_rows))
+            for e in read_socket_table(self.proc_root):
+                tcp = e.proto.startswith("tcp")
+                if listening and e.state != (TCP_LISTEN if tcp else UDP_UNCONNECTED):
+                    continue
+                state = _TCP_STATES.get(e.state, "") if tcp else ""
+                result.append(LocalSocket(e.proto[:3], decode_address(e.addr), e.port, state,
+                                          self._inode_row.get(e.inode) if e.inode else None))
+        result.sort(key=lambda s: (s.port, s.proto, s.address))
+        return result
+
+
+# ----------------- loading ----------------- #
+
+def read_process(pid, proc_root=PROC_ROOT):
+    """(ppid, state letter, name, uid) of one process from /proc, or None when it is gone"""
+    path = os.path.join(proc_root, str(pid))
+    try:
+        with open(os.path.join(path, "stat"), "rb") as f:
+            stat = f.read()
+        uid = os.stat(path).st_uid
+    except OSError:
+        return None
+    # "pid (comm) state ppid ...": comm may itself contain spaces and parentheses
+    lpar, rpar = stat.index(b"("), stat.rindex(b")")
+    rest = stat[rpar + 2:].split(None, 2)
+    name = stat[lpar + 1:rpar].decode(errors="replace")
+    if len(name) >= COMM_LEN:
+        name = _full_name(path, name)
+    return int(rest[1]), rest[0][0], name, uid
+
+
+def _full_name(path, comm):
+    """The kernel cuts comm to 15 characters: recover the full name from argv[0] like psutil does"""
+    try:
+        with open(os.path.join(path, "cmdline"), "rb") as f:
+            argv0 = f.read().split(b"\0", 1)[0]
+    except OSError:
+        return comm
+    full = os.path.basename(argv0.decode(errors="replace"))
+    if not full.startswith(comm):
+        # some processes rewrite their cmdline into one space-separated string
+        full = os.path.basename(argv0.decode(errors="replace").split(" ", 1)[0])
+    return full if full.startswith(comm) else comm
+
+
+def process_info(pid, proc_root=PROC_ROOT):
+    """{pid, name, user, status} of one process, or None when it is gone"""
+    if sys.platform.startswith("linux") and os.path.isdir(proc_root):
+        fields = read_process(pid, proc_root)
+        if fields is None:
+            return None
+        _, state, name, uid = fields
+        return {"pid": pid, "name": name, "user": user_name(uid), "status": _STATES.get(chr(state), "N/A")}
+    try:
+        info = psutil.Process(pid).as_dict(attrs=["pid", "name", "username", "status"])
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+    info["user"] = info.pop("username") or "N/A"
+    return info
+
+
+def pid_set(proc_root=PROC_ROOT):
+    """Current pids: a single directory listing on Linux"""
+    if sys.platform.startswith("linux") and os.path.isdir(proc_root):
+        return {int(name) for name in os.listdir(proc_root) if name.isdigit()}
+    return set(psutil.pids())
+
+
+def find_socket_owners(inodes, proc_root=PROC_ROOT):
+    """socket inode -> pid for the given inodes, scanning fds only until all are found"""
+    wanted = set(inodes)
+    owners = {}
+    for pid in pid_set(proc_root):
+        if not wanted:
+            break
+        fd_dir = os.path.join(proc_root, str(pid), "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if target.startswith("socket:[") and int(target[8:-1]) in wanted:
+                inode = int(target[8:-1])
+                owners[inode] = pid
+                wanted.discard(inode)
+    return owners
+
+
+def _load_proc(table, proc_root, sockets, wanted=None):
+    """wanted: only these socket inodes matter; fd scanning stops once all are found"""
+    for entry in os.scandir(proc_root):
+        if not entry.name.isdigit():
+            continue
+        pid = int(entry.name)
+        fields = read_process(pid, proc_root)
+        if fields is None:
+            continue  # exited meanwhile
+        ppid, state, name, uid = fields
+        table.pids.append(pid)
+        table.ppids.append(ppid)
+        table.uids.append(uid)
+        table.states.append(state)
+        table.names.append(name)
+        if sockets and (wanted is None or wanted):
+            row = len(table.pids) - 1
+            fd_dir = os.path.join(entry.path, "fd")
+            try:
+                fds = os.listdir(fd_dir)
+            except OSError:
+                continue  # other users' processes without root
+            for fd in fds:
+                try:
+                    target = os.readlink(os.path.join(fd_dir, fd))
+                except OSError:
+                    continue
+                if target.startswith("socket:["):
+                    inode = int(target[8:-1])
+                    if wanted is not None:
+                        if inode not in wanted:
+                            continue
+                        wanted.discard(inode)
+                    table.sock_inodes.append(inode)
+                    table.sock_rows.append(row)
+
+
+def _load_psutil(table, sockets):
+    posix = os.name == "posix"
+    attrs = ["pid", "ppid", "name", "status"] + (["uids"] if posix else ["username"])
+    for proc in psutil.process_iter(attrs=attrs):
+        info = proc.info
+        row = len(table.pids)
+        table.pids.append(info["pid"])
+        table.ppids.append(info["ppid"] or 0)
+        uids = info.get("uids")
+        table.uids.append(uids.real if uids else -1)
+        letter = next((k for k, v in _STATES.items() if v == info["status"]), "?")
+        table.states.append(ord(letter))
+        table.names.append(info["name"] or "")
+        if not posix:
+            table.users[row] = info.get("username") or "N/A"
+    if sockets:
+        table.port_pids = {}
+        table.connections = conns = net_connections()
+        for conn in conns:
+            if conn.laddr:
+                table.port_pids.setdefault(conn.laddr.port, set()).add(conn.pid)
+
+
+def take(sockets=False, proc_root=PROC_ROOT, ports=None):
+    """
+    Snapshot the process table, and socket ownership when sockets=True.
+    Passing the ports that will be queried lets the fd scan stop as soon as
+    every socket on them has been attributed.
+    """
+    table = ProcessTable(proc_root)
+    if sys.platform.startswith("linux") and os.path.isdir(proc_root):
+        wanted = None
+        if sockets and ports is not None:
+            ports = set(ports)
+            table.sockets = [e for e in read_socket_table(proc_root) if e.port in ports and e.inode]
+            wanted = {e.inode for e in table.sockets}
+        _load_proc(table, proc_root, sockets, wanted)
+    else:
+        _load_psutil(table, sockets)
+    return table
+
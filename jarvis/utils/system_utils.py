@@ -1,55 +1,168 @@
 import os
 import psutil
-import platform
-import signal
+import re
+
+from jarvis.utils import snapshot_utils
 
 def search_process_by_name(name: str):
     """Find processes by name (case-insensitive)."""
+    if not name:
+        return []
+    table = snapshot_utils.take()
+    needle = name.lower()
+    rows = sorted(r for pname, name_rows in table.by_name.items() if needle in pname.lower() for r in name_rows)
     results = []
-    for proc in psutil.process_iter(attrs=["pid", "name", "username", "status"]):
-        try:
-            if name and name.lower() in proc.info["name"].lower():
-                results.append(proc.info)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
+    for row in rows:
+        info = table.info(row)
+        info["username"] = info.pop("user")
+        results.append(info)
     return results
 
+_UNKNOWN_OWNER = {"pid": None, "name": "Unknown", "user": "N/A", "status": "N/A"}
+
+
+def check_ports(ports):
+    """
+    port -> [process info] for every port (empty list = free), from one
+    process-table snapshot. Sockets whose owner we may not see (other users'
+    processes without root) are reported with pid None.
+    """
+    table = snapshot_utils.take(sockets=True, ports=ports)
+    owners = table.rows_for_ports(ports)
+    return {
+        port: [table.info(row) if row is not None else dict(_UNKNOWN_OWNER) for row in owners[port]]
+        for port in ports
+    }
+
+
+def check_port(port: int):
+    """Process using a port, or None when it is free"""
+    users = check_ports([port])[port]
+    return users[0] if users else None
+
+
 def search_process_by_port(port: int):
     """Find the process using a given port."""
-    matches = []
-    for conn in psutil.net_connections(kind="inet"):
-        if conn.laddr and conn.laddr.port == port:
-            pid = conn.pid
-            if pid is None:
-                continue
-            try:
-                proc = psutil.Process(pid)
-                matches.append({
-                    "pid": pid,
-                    "name": proc.name(),
-                    "user": proc.username(),
-                    "status": proc.status()
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                matches.append({
-                    "pid": pid,
-                    "name": "Unknown",
-                    "user": "N/A",
-                    "status": "N/A"
-                })
-    return matches
+    return [p for p in check_ports([port])[port] if p["pid"] is not None]
+
+
+def list_ports(listening=False):
+    """Every bound local port as rows of {proto, address, port, state, pid, name, user}"""
+    table = snapshot_utils.take(sockets=True)
+    rows = []
+    for sock in table.local_sockets(listening=listening):
+        proc = table.info(sock.row) if sock.row is not None else _UNKNOWN_OWNER
+        rows.append({
+            "proto": sock.proto,
+            "address": sock.address,
+            "port": sock.port,
+            "state": sock.state,
+            "pid": proc["pid"],
+            "name": proc["name"],
+            "user": proc["user"],
+        })
+    return rows
 
 def kill_process(pid: int) -> bool:
     """Kill a process by PID (cross-platform)."""
     try:
-        if platform.system() == "Windows":
-            os.system(f"taskkill /F /PID {pid} >nul 2>&1")
-        else:
-            os.kill(pid, signal.SIGKILL)
+        # SIGKILL on POSIX, TerminateProcess on Windows; no shelling out to taskkill
+        psutil.Process(pid).kill()
         return True
     except Exception:
         return False
-    
+
+
+def find_processes(name=None, cmdline=None, user=None, ports=None, tree=False):
+    """
+    Processes matching every given filter, from one process-table snapshot:
+    name and cmdline are regexes (case-insensitive), user is an exact
+    username, ports are local ports the process has a socket on. With tree,
+    every descendant of a match is included. Command lines are only read for
+    processes that pass the other filters. Jarvis itself and its ancestors
+    (e.g. the calling shell) are never returned.
+    Returns psutil.Process objects with .info = {pid, name, username, status}.
+    """
+    name_re = re.compile(name, re.IGNORECASE) if name else None
+    cmd_re = re.compile(cmdline, re.IGNORECASE) if cmdline else None
+    table = snapshot_utils.take(sockets=bool(ports), ports=ports or None)
+
+    rows = set(range(len(table)))
+    if ports:
+        rows &= {r for owners in table.rows_for_ports(ports).values() for r in owners if r is not None}
+    if name_re:
+        rows &= set(table.match_names(name_re))
+    if user:
+        rows &= set(table.rows_for_user(user))
+
+    me = os.getpid()
+    protected = {me}
+    row = table.row_of.get(me)
+    while row is not None and table.ppids[row] not in protected:
+        protected.add(table.ppids[row])
+        row = table.row_of.get(table.ppids[row])
+
+    matches = []
+    for row in sorted(rows):
+        pid = table.pids[row]
+        if pid in protected:
+            continue
+        try:
+            proc = psutil.Process(pid)
+            if cmd_re and not cmd_re.search(" ".join(proc.cmdline())):
+                continue
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+        matches.append(row)
+
+    if tree:
+        matches = table.descendants(matches)
+    procs = []
+    for row in matches:
+        if table.pids[row] in protected:
+            continue
+        try:
+            proc = psutil.Process(table.pids[row])
+        except psutil.NoSuchProcess:
+            continue
+        info = table.info(row)
+        info["username"] = info.pop("user")
+        proc.info = info
+        procs.append(proc)
+    return procs
+
+
+def terminate_processes(procs, timeout=5.0, kill_timeout=3.0):
+    """
+    Stop a set of processes as a batch: SIGTERM to all of them, wait up to
+    timeout for all of them together (psutil.wait_procs), then SIGKILL the
+    survivors and wait up to kill_timeout. Returns (terminated, killed,
+    failed) lists of processes.
+    """
+    failed = []
+    signalled = []
+    for proc in procs:
+        try:
+            proc.terminate()
+            signalled.append(proc)
+        except psutil.NoSuchProcess:
+            signalled.append(proc)  # already gone counts as terminated
+        except psutil.AccessDenied:
+            failed.append(proc)
+
+    terminated, alive = psutil.wait_procs(signalled, timeout=timeout)
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.AccessDenied:
+            failed.append(proc)
+    alive = [p for p in alive if p not in failed]
+    killed, survivors = psutil.wait_procs(alive, timeout=kill_timeout)
+    return terminated, killed, failed + survivors
+
+
 def get_system_stats():
     """Return current CPU, memory, disk, and network stats."""
     stats = {
@@ -0,0 +1,136 @@
+"""
+Change detection for `--watch` modes and `port-checker check --until-free`.
+
+Each poll compares cheap fingerprints with the previous tick instead of
+re-enumerating everything: the set of pids (one /proc listing) for process
+watches, and the set of socket inodes in /proc/net/{tcp,udp}[6] for port
+watches. Only entries that changed are hydrated: new pids get one
+/proc/PID/stat read, new sockets get an fd scan that stops once their owners
+are found. Other platforms compare psutil.pids() and net_connections().
+"""
+import socket
+import sys
+import time
+
+import psutil
+
+from jarvis.utils import snapshot_utils
+
+WATCH_INTERVAL = 1.0
+
+_LINUX = sys.platform.startswith("linux")
+
+
+class ProcessWatch:
+    """Reports processes (optionally only those match(info) accepts) starting and exiting"""
+
+    def __init__(self, match=None):
+        self.match = match or (lambda info: True)
+        self.pids = snapshot_utils.pid_set()
+        self.known = {}  # pid -> info, for matching processes only
+        for pid in self.pids:
+            self._hydrate(pid)
+
+    def _hydrate(self, pid):
+        info = snapshot_utils.process_info(pid)
+        if info is not None and self.match(info):
+            self.known[pid] = info
+            return info
+        return None
+
+    def poll(self):
+        """(started, exited) lists of info dicts since the previous poll"""
+        pids = snapshot_utils.pid_set()
+        started = [info for info in map(self._hydrate, sorted(pids - self.pids)) if info]
+        exited = [self.known.pop(pid) for pid in sorted(self.pids - pids) if pid in self.known]
+        self.pids = pids
+        return started, exited
+
+
+def _socket_entries(ports=None, listening=False):
+    """key -> SocketEntry for the sockets of interest (keys are stable while a socket lives)"""
+    if _LINUX:
+        entries = {}
+        for e in snapshot_utils.read_socket_table():
+            if e.inode == 0 or (ports is not None and e.port not in ports):
+                continue  # inode 0: TIME_WAIT etc., held by no process
+            if listening and e.proto.startswith("tcp") and e.state != snapshot_utils.TCP_LISTEN:
+                continue
+            entries[(e.proto, e.inode)] = e
+        return entries, None
+    entries, owners = {}, {}
+    for c in snapshot_utils.net_connections():
+        if not c.laddr or (ports is not None and c.laddr.port not in ports):
+            continue
+        if listening and c.status not in (psutil.CONN_LISTEN, psutil.CONN_NONE):
+            continue
+        proto = ("tcp" if c.type == socket.SOCK_STREAM else "udp") + ("6" if c.family == socket.AF_INET6 else "")
+        key = (proto, c.laddr.ip, c.laddr.port, c.raddr, c.pid)
+        entries[key] = snapshot_utils.SocketEntry(proto, c.laddr.port, c.status, 0)
+        owners[key] = c.pid
+    return entries, owners
+
+
+class PortWatch:
+    """Reports sockets on the given ports (None = all) opening and closing, with their owners"""
+
+    def __init__(self, ports=None, listening=False):
+        self.ports = set(ports) if ports is not None else None
+        self.listening = listening
+        self.entries, owners = _socket_entries(self.ports, listening)
+        self.owners = {}  # key -> owner info (None when not visible)
+        self._hydrate(self.entries, owners)
+
+    def _hydrate(self, entries, owners):
+        if owners is None:
+            inode_pid = snapshot_utils.find_socket_owners(key[1] for key in entries)
+            owners = {key: inode_pid.get(key[1]) for key in entries}
+        infos = {}
+        for key in entries:
+            pid = owners.get(key)
+            if pid is not None and pid not in infos:
+                infos[pid] = snapshot_utils.process_info(pid)
+            self.owners[key] = infos.get(pid)
+
+    def in_use(self):
+        """port -> [owner info or None] from the current state"""
+        usage = {}
+        for key, entry in self.entries.items():
+            usage.setdefault(entry.port, []).append(self.owners.get(key))
+        return usage
+
+    def poll(self):
+        """(opened, closed) lists of (SocketEntry, owner info or None) since the previous poll"""
+        entries, owners = _socket_entries(self.ports, self.listening)
+        new = {k: e for k, e in entries.items() if k not in self.entries}
+        self._hydrate(new, owners)
+        opened = [(e, self.owners.get(k)) for k, e in new.items()]
+        closed = [(e, self.owners.pop(k, None)) for k, e in self.entries.items() if k not in entries]
+        self.entries = entries
+        return opened, closed
+
+
+def stamp():
+    """Time prefix for one event line (rich markup)"""
+    return f"[dim]{time.strftime('%H:%M:%S')}[/dim]"
+
+
+def owner_label(info):
+    """'by PID NAME (USER)' for a process info dict, or a note when the owner is not visible"""
+    return f"by {info['pid']} {info['name']} ({info['user']})" if info else "(owner not visible)"
+
+
+def port_is_free(port):
+    """No live socket is bound to the port (TIME_WAIT leftovers do not count)"""
+    entries, _ = _socket_entries({port})
+    return not entries
+
+
+def wait_until_free(port, timeout=None, interval=0.2):
+    """Block until the port is free; False if timeout seconds pass first"""
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while not port_is_free(port):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from jarvis.utils import commit_utils, diff_utils
+
+DIFF = """\
+diff --git a/old/name.py b/new/name.py
+similarity index 90%
+rename from old/name.py
+rename to new/name.py
+index 1111111..2222222 100644
+--- a/old/name.py
++++ b/new/name.py
+@@ -1,3 +1,3 @@
+ import os
+-x = 1
++x = 2
+diff --git a/docs/logo.png b/docs/logo.png
+index 3333333..4444444 100644
+Binary files a/docs/logo.png and b/docs/logo.png differ
+diff --git a/pkg/added.py b/pkg/added.py
+new file mode 100644
+index 0000000..5555555
+--- /dev/null
++++ b/pkg/added.py
+@@ -0,0 +1,2 @@
++def main():
++    pass
+diff --git a/pkg/gone.py b/pkg/gone.py
+deleted file mode 100644
+index 6666666..0000000
+--- a/pkg/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-print("bye")
+diff --git a/web/package-lock.json b/web/package-lock.json
+index 7777777..8888888 100644
+--- a/web/package-lock.json
++++ b/web/package-lock.json
+@@ -1,2 +1,2 @@
+-  "version": "1.0.0"
++  "version": "1.0.1"
+"""
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_utils, "CACHE_FILE", tmp_path / "commit_cache.json")
+    monkeypatch.setattr(commit_utils, "CACHE_STATS_FILE", tmp_path / "commit_cache_stats.json")
+    return tmp_path / "commit_cache.json"
+
+
+def big_diff(files, hunks):
+    out = []
+    for f in range(files):
+        path = f"pkg/a_really_quite_long_directory_name/module_number_{f}.py"
+        out += [f"diff --git a/{path} b/{path}", f"--- a/{path}", f"+++ b/{path}"]
+        for h in range(hunks):
+            out.append(f"@@ -{1 + h * 20},4 +{1 + h * 20},4 @@")
+            out += [" context", f"-    value = {h}", f"+    value = {h + 1}", " context"]
+    return "\n".join(out)
+
+
+def test_parse_diff_kinds_and_statuses():
+    renamed, binary, added, deleted, lock = diff_utils.parse_diff(DIFF)
+
+    assert (renamed.status, renamed.old_path, renamed.path) == ("renamed", "old/name.py", "new/name.py")
+    assert (renamed.added, renamed.removed, len(renamed.hunks)) == (1, 1, 1)
+    assert renamed.header() == "renamed old/name.py -> new/name.py (+1 -1)"
+
+    assert (binary.path, binary.binary, binary.kind, binary.hunks) == ("docs/logo.png", True, "binary", [])
+    assert (added.status, added.path, added.added, added.kind) == ("added", "pkg/added.py", 2, "source")
+    assert (deleted.status, deleted.path, deleted.removed) == ("deleted", "pkg/gone.py", 1)
+    assert lock.kind == "lockfile" and lock.summarized and not added.summarized
+
+
+def test_build_context_summarizes_lockfiles_and_binaries():
+    context = diff_utils.build_context(DIFF)
+    assert (context.files, context.summarized, context.hunks_total, context.hunks_sent) == (5, 2, 3, 3)
+    assert "modified web/package-lock.json (+1 -1) [lockfile, omitted]" in context.text
+    assert "1.0.1" not in context.text
+    assert "--- pkg/added.py\n@@ -0,0 +1,2 @@\n+def main():" in context.text
+
+
+def test_build_context_stays_within_budget():
+    diff = big_diff(60, 6)
+    for budget in (100, 300, 800, 1500, 3000):
+        context = diff_utils.build_context(diff, budget)
+        assert context.tokens <= budget
+        assert 0 < context.hunks_sent < context.hunks_total
+        assert "more hunk(s) omitted" in context.text
+    # everything fits: nothing is left out
+    small = diff_utils.build_context(big_diff(2, 2), 3000)
+    assert small.hunks_sent == small.hunks_total == 4
+    assert "omitted" not in small.text
+
+
+def test_cache_hit_and_miss(cache):
+    assert commit_utils.cached_commit_message(DIFF) is None
+    assert not cache.exists()  # a miss with nothing to expire writes no messages
+
+    commit_utils.store_commit_message(DIFF, "feat: add main")
+    stored = cache.read_text()
+    # scope and budget are part of the key; misses leave the stored messages alone
+    assert commit_utils.cached_commit_message(DIFF, scope="api") is None
+    assert commit_utils.cached_commit_message(DIFF, token_budget=500) is None
+    assert cache.read_text() == stored
+    # index lines and trailing whitespace do not change the key
+    same = DIFF.replace("index 1111111..2222222 100644\n", "").replace("import os", "import os  ")
+    assert commit_utils.cached_commit_message(same) == "feat: add main"
+
+    stats = commit_utils.cache_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 3)
+    assert commit_utils.clear_cache() == 1
+    assert commit_utils.cache_stats()["hits"] == 0
+    assert commit_utils.cached_commit_message(DIFF) is None
+
+
+def test_cache_ttl_expiry(cache, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(commit_utils.time, "time", lambda: now[0])
+    commit_utils.store_commit_message(DIFF, "old message")
+    commit_utils.store_commit_message("other diff", "other message")
+
+    now[0] += commit_utils.CACHE_TTL - 1
+    assert commit_utils.cached_commit_message(DIFF) == "old message"
+    now[0] += 2
+    assert commit_utils.cached_commit_message(DIFF) is None
+    # the miss dropped both expired entries from the file
+    assert json.loads(cache.read_text())["entries"] == {}
+
+
+def test_cache_lru_eviction(cache, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(commit_utils.time, "time", lambda: now[0])
+    monkeypatch.setattr(commit_utils, "CACHE_MAX_ENTRIES", 3)
+    for i in range(3):
+        now[0] += 1
+        commit_utils.store_commit_message(f"diff {i}", f"message {i}")
+    now[0] += 1
+    assert commit_utils.cached_commit_message("diff 0") == "message 0"  # now the most recently used
+    now[0] += 1
+    commit_utils.store_commit_message("diff 3", "message 3")
+
+    assert commit_utils.cached_commit_message("diff 1") is None
+    assert [commit_utils.cached_commit_message(f"diff {i}") for i in (0, 2, 3)] == \
+        ["message 0", "message 2", "message 3"]
+    assert commit_utils.cache_stats()["entries"] == 3
@@ -0,0 +1,100 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from jarvis.utils import db_utils
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    path = tmp_path / "data.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, title TEXT, body TEXT, score INTEGER)")
+    conn.executemany(
+        "INSERT INTO notes (title, body, score) VALUES (?, ?, ?)",
+        [(f"note {i}", "alpha beta" if i % 2 else None, i) for i in range(25)],
+    )
+    conn.commit()
+    conn.close()
+    yield {"type": "sqlite", "path": str(path)}
+    db_utils.close_pools()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "json", "ndjson"])
+def test_export_round_trip(cfg, tmp_path, fmt):
+    out = tmp_path / f"notes.{fmt}"
+    with db_utils.stream_query("SELECT id, title, body, score FROM notes ORDER BY id", cfg,
+                               fetch_limit=17, batch_size=5) as (cols, rows):
+        db_utils.export_results(cols, rows, out, fmt)
+
+    if fmt == "csv":
+        with open(out, newline="") as f:
+            records = list(csv.DictReader(f))
+        records = [{**r, "id": int(r["id"]), "score": int(r["score"])} for r in records]
+    elif fmt == "json":
+        records = json.loads(out.read_text())
+    else:
+        records = [json.loads(line) for line in out.read_text().splitlines()]
+
+    assert len(records) == 17
+    assert records[0] == {"id": 1, "title": "note 0", "body": "", "score": 0}
+    assert records[16] == {"id": 17, "title": "note 16", "body": "", "score": 16}
+    assert records[3]["body"] == "alpha beta"
+
+
+def test_search_keyword_across_tables(cfg):
+    db_utils.run_query("CREATE TABLE tags (name TEXT, note_id INTEGER)", cfg)
+    db_utils.run_query("INSERT INTO tags VALUES ('beta-release', 1), ('other', 2)", cfg)
+
+    results = db_utils.search_keyword("beta", cfg, limit_per_table=5, workers=2)
+    assert sorted(results) == ["notes", "tags"]
+    assert len(results["notes"][1]) == 5
+    assert [tuple(r) for r in results["tags"][1]] == [("beta-release", 1)]
+    assert db_utils.search_keyword("missing", cfg) == {}
+
+
+def test_fts_index_kept_in_sync(cfg):
+    try:
+        assert db_utils.build_fts_index(["notes"], cfg) == {"notes": ["title", "body"]}
+    except RuntimeError as e:
+        pytest.skip(str(e))  # SQLite built without FTS5 trigram
+    assert db_utils.list_fts_indexes(cfg) == ["notes"]
+
+    def search(keyword):
+        return {res.method: sorted(r["id"] for r in res.rows)
+                for res in db_utils.iter_search_keyword(keyword, cfg, limit_per_table=100)}
+
+    assert search("alpha") == {"fts": list(range(2, 26, 2))}
+
+    db_utils.run_query("INSERT INTO notes (title, body) VALUES ('gamma ray', NULL)", cfg)
+    assert search("gamma") == {"fts": [26]}
+    db_utils.run_query("UPDATE notes SET title = 'delta wave' WHERE id = 26", cfg)
+    assert search("gamma") == {}
+    assert search("delta") == {"fts": [26]}
+    db_utils.run_query("DELETE FROM notes WHERE id IN (2, 26)", cfg)
+    assert search("delta") == {}
+    assert search("alpha") == {"fts": list(range(4, 26, 2))}
+
+    # FTS5 raises if the index disagrees with the table; a LIKE scan finds the same rows
+    with db_utils.pooled_connection(cfg) as conn:
+        conn.execute("INSERT INTO jarvis_fts_notes(jarvis_fts_notes) VALUES ('integrity-check')")
+    assert db_utils.drop_fts_index(None, cfg) == ["notes"]
+    assert search("alpha") == {"like": list(range(4, 26, 2))}
+
+
+def test_pooled_connection_reused(cfg):
+    with db_utils.pooled_connection(cfg) as first:
+        with db_utils.pooled_connection(cfg) as nested:
+            assert nested is not first  # borrowed concurrently: a second connection
+    with db_utils.pooled_connection(cfg) as again:
+        assert again in (first, nested)
+        # an uncommitted write is rolled back when the connection goes back to the pool
+        again.execute("DELETE FROM notes")
+    assert db_utils.run_query("SELECT COUNT(*) FROM notes", cfg)[1][0][0] == 25
+
+    db_utils.list_tables(cfg)
+    db_utils.run_query("SELECT 1", cfg)
+    with db_utils.pooled_connection(cfg) as conn:
+        assert conn in (first, nested)
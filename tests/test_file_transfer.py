@@ -0,0 +1,408 @@
+import _thread
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+
+import pytest
+
+from jarvis.utils import compress_utils, delta_utils, file_utils, journal_utils, lan_utils, queue_utils
+
+
+@pytest.fixture(autouse=True)
+def journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_utils, "JOURNAL_DIR", tmp_path / "journals")
+
+
+@pytest.fixture
+def receiver(tmp_path):
+    dest = tmp_path / "received"
+    dest.mkdir()
+    recv = lan_utils.Receiver(str(dest), port=0, host="127.0.0.1")
+    yield recv
+    recv.close()
+
+
+def serve_one(recv):
+    """Run recv.serve_one() on a thread; join() the returned thread, then read result[0]"""
+    result = []
+
+    def run():
+        try:
+            result.append(recv.serve_one())
+        except Exception as e:
+            result.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, result
+
+
+def dropped(sock):
+    """Block until the receiver closes sock (EOF, or a reset if it left data unread)"""
+    try:
+        return sock.recv(1) == b""
+    except ConnectionResetError:
+        return True
+
+
+def test_loopback_file_multi_stream(tmp_path, receiver):
+    src = tmp_path / "blob.bin"
+    data = os.urandom(300 * 1024 + 7)
+    src.write_bytes(data)
+
+    thread, result = serve_one(receiver)
+    sent = lan_utils.send(str(src), "127.0.0.1", receiver.port, streams=4, chunk_size=64 * 1024)
+    thread.join(10)
+    assert sent == len(data)
+    assert result == [os.path.join(receiver.destination_dir, "blob.bin")]
+    assert open(result[0], "rb").read() == data
+
+
+def test_legacy_sender_content_starting_with_digits(tmp_path, receiver):
+    src = tmp_path / "numbers.txt"
+    src.write_bytes(b"12345 numbers first\n")
+
+    thread, result = serve_one(receiver)
+    lan_utils.send_legacy(str(src), "127.0.0.1", receiver.port)
+    thread.join(10)
+    assert open(result[0], "rb").read() == b"12345 numbers first\n"
+
+
+def test_legacy_short_read_is_an_error(receiver):
+    thread, result = serve_one(receiver)
+    with socket.create_connection(("127.0.0.1", receiver.port)) as s:
+        s.sendall(b"short.txt:10\nabc")
+    thread.join(10)
+    assert isinstance(result[0], ConnectionError)
+    assert not os.path.exists(os.path.join(receiver.destination_dir, "short.txt"))
+
+
+def test_loopback_tree_with_empty_file(tmp_path, receiver):
+    src = tmp_path / "project"
+    (src / "pkg" / "sub").mkdir(parents=True)
+    (src / "empty_dir").mkdir()
+    files = {
+        "README.md": b"hello\n",
+        "empty.txt": b"",
+        "pkg/data.bin": os.urandom(200 * 1024),
+        "pkg/sub/module.py": b"x = 1\n" * 1000,
+    }
+    for rel, data in files.items():
+        (src / rel).write_bytes(data)
+
+    thread, result = serve_one(receiver)
+    lan_utils.send(str(src), "127.0.0.1", receiver.port, streams=3, chunk_size=32 * 1024)
+    thread.join(10)
+    root = result[0]
+    assert root == os.path.join(receiver.destination_dir, "project")
+    for rel, data in files.items():
+        assert open(os.path.join(root, rel), "rb").read() == data
+    assert os.path.isdir(os.path.join(root, "empty_dir"))
+    assert not [f for _, _, names in os.walk(root) for f in names if f.endswith(lan_utils.PART_SUFFIX)]
+
+
+def test_raw_frame_with_wrong_payload_length_rejected(receiver):
+    thread, result = serve_one(receiver)
+    transfer_id = uuid.uuid4().bytes
+    with socket.create_connection(("127.0.0.1", receiver.port)) as ctrl:
+        ctrl.sendall(lan_utils.PREFACE.pack(lan_utils.MAGIC, lan_utils.VERSION, lan_utils.KIND_CONTROL, transfer_id))
+        lan_utils._send_json(ctrl, {"root": "f.bin", "streams": 1})
+        lan_utils._send_json(ctrl, {"files": [{"path": "f.bin", "size": 10, "mtime": 0}], "dirs": []})
+        lan_utils._send_json(ctrl, {"end": True})
+        assert lan_utils._recv_json(ctrl)["ok"]
+        with socket.create_connection(("127.0.0.1", receiver.port)) as data:
+            data.sendall(lan_utils.PREFACE.pack(lan_utils.MAGIC, lan_utils.VERSION, lan_utils.KIND_DATA, transfer_id))
+            data.sendall(lan_utils.CHUNK_HDR.pack(0, 0, 10, 5, 0, zlib.crc32(b"01234")) + b"01234")
+            assert dropped(data)  # the receiver drops the stream...
+        assert thread.is_alive()  # ...but only the control connection ends the transfer
+        lan_utils._send_json(ctrl, {"done": True})
+        status = lan_utils._recv_json(ctrl)
+        thread.join(10)
+    assert not status["ok"] and "payload length" in status["error"]
+    assert isinstance(result[0], RuntimeError) and "payload length" in str(result[0])
+
+
+def test_stray_connections_do_not_end_serve_one(tmp_path, receiver):
+    thread, result = serve_one(receiver)
+    for junk in (b"", b"JVT\x03C", b"GET / HTTP/1.0\r\n\r\n"):
+        with socket.create_connection(("127.0.0.1", receiver.port)) as s:
+            s.sendall(junk)
+    # a data stream for a transfer nobody started
+    with socket.create_connection(("127.0.0.1", receiver.port)) as s:
+        s.sendall(lan_utils.PREFACE.pack(lan_utils.MAGIC, lan_utils.VERSION, lan_utils.KIND_DATA, uuid.uuid4().bytes))
+        assert dropped(s)
+    time.sleep(0.3)
+    assert thread.is_alive() and result == []
+
+    src = tmp_path / "after.txt"
+    src.write_bytes(b"still served\n")
+    lan_utils.send(str(src), "127.0.0.1", receiver.port)
+    thread.join(10)
+    assert result == [os.path.join(receiver.destination_dir, "after.txt")]
+
+
+def test_preface_split_across_packets(tmp_path, receiver):
+    thread, result = serve_one(receiver)
+    preface = lan_utils.PREFACE.pack(lan_utils.MAGIC, lan_utils.VERSION, lan_utils.KIND_CONTROL, uuid.uuid4().bytes)
+    with socket.create_connection(("127.0.0.1", receiver.port)) as ctrl:
+        ctrl.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        ctrl.sendall(preface[:1])  # a peek now sees b"J": still a v3 client, not a legacy one
+        time.sleep(0.2)
+        ctrl.sendall(preface[1:])
+        lan_utils._send_json(ctrl, {"root": "empty.txt", "streams": 0})
+        lan_utils._send_json(ctrl, {"files": [{"path": "empty.txt", "size": 0, "mtime": 0}], "dirs": []})
+        lan_utils._send_json(ctrl, {"end": True})
+        assert lan_utils._recv_json(ctrl)["ok"]
+        lan_utils._send_json(ctrl, {"done": True})
+        assert lan_utils._recv_json(ctrl)["ok"]
+    thread.join(10)
+    assert result == [os.path.join(receiver.destination_dir, "empty.txt")]
+
+
+def test_version_mismatch_is_reported(receiver):
+    thread, result = serve_one(receiver)
+    with socket.create_connection(("127.0.0.1", receiver.port)) as ctrl:
+        ctrl.sendall(lan_utils.PREFACE.pack(lan_utils.MAGIC, 2, lan_utils.KIND_CONTROL, uuid.uuid4().bytes))
+        reply = lan_utils._recv_json(ctrl)
+    thread.join(10)
+    assert reply == {"ok": False, "error": "unsupported protocol version 2"}
+    assert isinstance(result[0], ValueError) and "version 2" in str(result[0])
+
+
+def test_delta_after_insertion(tmp_path):
+    block = 4096
+    old = os.urandom(64 * block)
+    new = old[:10 * block + 123] + b"inserted bytes" * 20 + old[10 * block + 123:]
+    (tmp_path / "old.bin").write_bytes(old)
+    (tmp_path / "new.bin").write_bytes(new)
+
+    signature = delta_utils.file_signature(tmp_path / "old.bin", block)
+    ops = list(delta_utils.compute_delta(tmp_path / "new.bin", signature, block))
+    literal = sum(op[2] for op in ops if op[0] == "data")
+    assert literal < 2 * block  # only the block around the insertion is sent
+    assert sum(op[2] for op in ops) == len(new)
+
+    delta_utils.apply_delta(tmp_path / "new.bin", tmp_path / "old.bin", tmp_path / "out.bin", ops)
+    assert (tmp_path / "out.bin").read_bytes() == new
+
+
+def test_lan_delta_send_after_insertion(tmp_path, receiver):
+    src = tmp_path / "data.bin"
+    old = os.urandom(2 * delta_utils.BLOCK_SIZE + 999)
+    src.write_bytes(old)
+    thread, result = serve_one(receiver)
+    lan_utils.send(str(src), "127.0.0.1", receiver.port, delta=True)
+    thread.join(10)
+
+    new = old[:1000] + b"-- inserted --" + old[1000:]
+    src.write_bytes(new)
+    thread, result = serve_one(receiver)
+    sent = lan_utils.send(str(src), "127.0.0.1", receiver.port, delta=True)
+    thread.join(10)
+    assert sent < len(new) // 2
+    assert open(result[0], "rb").read() == new
+
+
+def test_transfer_resumes_from_journal(tmp_path, monkeypatch):
+    block = 4096
+    monkeypatch.setattr(delta_utils, "BLOCK_SIZE", block)
+    monkeypatch.setattr(file_utils, "RESUME_MIN_SIZE", block)
+    monkeypatch.setattr(journal_utils, "SAVE_INTERVAL", 0)
+    data = os.urandom(50 * block + 17)
+    src, dst = tmp_path / "big.bin", str(tmp_path / "copy.bin")
+    src.write_bytes(data)
+
+    written = []
+
+    def interrupt(n):
+        written.append(n)
+        if len(written) == 20:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        file_utils.transfer_file(str(src), dst, meter=interrupt)
+    assert not os.path.exists(dst)
+    assert os.path.getsize(dst + file_utils.PART_SUFFIX) == 20 * block
+
+    # the 20th block was written but interrupted before its checkpoint
+    sent = file_utils.transfer_file(str(src), dst)
+    assert sent == len(data) - 19 * block
+    assert open(dst, "rb").read() == data
+    assert not os.path.exists(dst + file_utils.PART_SUFFIX)
+
+    # a part file whose last checkpointed block no longer verifies is not trusted
+    written.clear()
+    src.write_bytes(data[::-1])
+    with pytest.raises(KeyboardInterrupt):
+        file_utils.transfer_file(str(src), dst, meter=interrupt)
+    with open(dst + file_utils.PART_SUFFIX, "r+b") as f:
+        f.seek(18 * block + 100)
+        f.write(b"corrupt")
+    assert file_utils.transfer_file(str(src), dst) == len(data)
+    assert open(dst, "rb").read() == data[::-1]
+
+
+def test_local_transfer_skips_unchanged(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    (src / "nested").mkdir(parents=True)
+    for i in range(20):
+        (src / f"f{i}.txt").write_text(f"file {i}\n")
+    (src / "nested" / "empty").write_bytes(b"")
+
+    first = file_utils.local_transfer(str(src), str(dst), workers=4)
+    assert (first.copied, first.skipped) == (21, 0)
+    second = file_utils.local_transfer(str(src), str(dst), workers=4)
+    assert (second.copied, second.skipped, second.bytes) == (0, 21, 0)
+
+    (src / "f3.txt").write_text("changed, and longer\n")
+    (src / "new.txt").write_text("new\n")
+    third = file_utils.local_transfer(str(src), str(dst), workers=4)
+    assert (third.copied, third.skipped) == (2, 20)
+    assert (dst / "f3.txt").read_text() == "changed, and longer\n"
+    assert (dst / "nested" / "empty").read_bytes() == b""
+
+
+def test_local_transfer_large_files_copy_in_kernel(tmp_path, monkeypatch):
+    block = 4096
+    monkeypatch.setattr(delta_utils, "BLOCK_SIZE", block)
+    monkeypatch.setattr(file_utils, "RESUME_MIN_SIZE", block)
+    calls = []
+
+    def spy(name):
+        real = getattr(file_utils, name)
+
+        def wrapper(*args, **kwargs):
+            calls.append(name)
+            return real(*args, **kwargs)
+
+        monkeypatch.setattr(file_utils, name, wrapper)
+
+    spy("_kernel_copy")
+    spy("transfer_file")
+    data = os.urandom(40 * block)
+    src, dst = tmp_path / "big.bin", tmp_path / "copy" / "big.bin"
+    src.write_bytes(data)
+
+    file_utils.local_transfer(str(src), str(dst))
+    assert calls == ["_kernel_copy"] and dst.read_bytes() == data
+
+    # --delta against an existing copy takes the block path
+    calls.clear()
+    src.write_bytes(data[:1000] + b"inserted" + data[1000:])
+    file_utils.local_transfer(str(src), str(dst), delta=True)
+    assert calls == ["transfer_file"] and dst.read_bytes() == src.read_bytes()
+
+    # so does finishing an interrupted journaled copy
+    src.write_bytes(data[::-1])
+
+    def interrupt(n):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        file_utils.transfer_file(str(src), str(dst), meter=interrupt)
+    assert os.path.exists(str(dst) + file_utils.PART_SUFFIX)
+    calls.clear()
+    file_utils.local_transfer(str(src), str(dst))
+    assert calls == ["transfer_file"] and dst.read_bytes() == data[::-1]
+    assert not os.path.exists(str(dst) + file_utils.PART_SUFFIX)
+
+
+def test_loopback_compressed_auto(tmp_path, receiver):
+    src = tmp_path / "mixed"
+    src.mkdir()
+    text = b"a compressible line of text\n" * 20000
+    noise = os.urandom(100 * 1024)
+    (src / "text.log").write_bytes(text)
+    (src / "noise.bin").write_bytes(noise)
+
+    thread, result = serve_one(receiver)
+    sent = lan_utils.send(str(src), "127.0.0.1", receiver.port, compress="auto", chunk_size=128 * 1024)
+    thread.join(10)
+    assert sent < len(text) // 4 + len(noise) + 4096  # text shrinks, noise goes raw
+    assert open(os.path.join(result[0], "text.log"), "rb").read() == text
+    assert open(os.path.join(result[0], "noise.bin"), "rb").read() == noise
+
+    with pytest.raises(ValueError):
+        compress_utils.decompress("gzip", compress_utils.Compressor("gzip").compress(text), len(text) - 1)
+
+
+def test_rate_limiter_token_bucket(monkeypatch):
+    now = [100.0]
+    slept = []
+    monkeypatch.setattr(queue_utils.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(queue_utils.time, "sleep", lambda s: slept.append(s))
+
+    limiter = queue_utils.RateLimiter(1000)
+    limiter.consume(1000)      # the bucket starts full: one second's worth is free
+    assert slept == []
+    limiter.consume(500)       # overdraft of 500 bytes at 1000 B/s
+    assert slept == [pytest.approx(0.5)]
+    now[0] += 2.0              # refills, but never beyond one second's worth
+    limiter.consume(1000)
+    assert slept == [pytest.approx(0.5)]
+    queue_utils.RateLimiter(None).consume(10 ** 9)
+    assert queue_utils.parse_rate("20M") == 20 * 1024 ** 2 and queue_utils.parse_rate("0") is None
+
+
+@pytest.fixture
+def local_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_utils, "CONFIG_FILE", tmp_path / "file_transfer.json")
+    file_utils.save_config({"mode": "local", "source": None, "destination": str(tmp_path / "out")}, "local")
+    (tmp_path / "job.txt").write_text("payload\n")
+    return str(tmp_path / "job.txt")
+
+
+def test_queue_retries_with_backoff(local_profile, monkeypatch):
+    monkeypatch.setattr(queue_utils, "BACKOFF_BASE", 0.05)
+    attempts = []
+
+    def flaky(config, source=None, meter=None, **kwargs):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(file_utils, "run_transfer", flaky)
+    delays = []
+    runner = queue_utils.TransferQueue(retries=3)
+    runner.create([{"profile": "local", "source": local_profile}, {"profile": "missing", "source": local_profile}])
+    done, failed = runner.run({"on_retry": lambda job, delay: delays.append(delay)})
+
+    assert (done, failed) == (1, 1)
+    assert [j["status"] for j in runner.jobs] == ["done", "failed"]
+    assert runner.jobs[0]["attempts"] == 3
+    assert 0.04 <= delays[0] <= 0.06 and 0.08 <= delays[1] <= 0.12  # doubled per attempt, with jitter
+    assert attempts[1] - attempts[0] >= delays[0] and attempts[2] - attempts[1] >= delays[1]
+
+    runner = queue_utils.TransferQueue(retries=1)
+    runner.create([{"profile": "local", "source": local_profile}])
+    attempts.clear()
+    assert runner.run() == (0, 1)
+    assert runner.jobs[0]["error"] == "connection reset"
+
+
+def test_queue_interrupt_does_not_wait_for_running_jobs(local_profile, monkeypatch):
+    stopped = threading.Event()
+
+    def slow(config, source=None, meter=None, **kwargs):
+        _thread.interrupt_main()  # Ctrl+C while this job is in flight
+        try:
+            for _ in range(200):
+                time.sleep(0.05)
+                meter(1)
+        except queue_utils.QueueStopped:
+            stopped.set()
+            raise
+
+    monkeypatch.setattr(file_utils, "run_transfer", slow)
+    runner = queue_utils.TransferQueue()
+    runner.create([{"profile": "local", "source": local_profile}])
+    start = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        runner.run()
+    assert time.monotonic() - start < 2
+    assert runner.jobs[0]["status"] == "pending" and runner.jobs[0]["error"] == "interrupted"
+    assert stopped.wait(2)
+    assert queue_utils.TransferQueue().resume() == 1
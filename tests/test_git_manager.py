@@ -0,0 +1,144 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from jarvis.commands.git_manager import git_manager
+from jarvis.utils import git_utils
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path / git_utils.DB_NAME
+    if git_utils._store is not None:
+        git_utils._store.close()
+        git_utils._store = None
+
+
+def test_store_reuses_one_connection(store_path):
+    git_utils.add_branch("feature/a", "abc1234", "JIRA-1", "first")
+    conn = git_utils.get_store().conn
+    git_utils.add_branch("feature/b", "def5678", "JIRA-2", "second")
+    assert git_utils.get_store().conn is conn
+    assert [b[1] for b in git_utils.list_branches()] == ["feature/a", "feature/b"]
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_bulk_add_and_update(store_path):
+    store = git_utils.get_store()
+    added = store.add_many([(f"b{i}", "c", None, None) for i in range(100)] + [("m", "c", None, None, "merged")])
+    assert added == 101
+    assert store.update_status_many([(1, "closed"), (2, "merged")]) == 2
+
+    rows = {b[0]: b[5] for b in store.list()}
+    assert rows[1] == "closed" and rows[2] == "merged" and rows[3] == "open" and rows[101] == "merged"
+
+
+def test_import_command(store_path):
+    git_utils.add_branch("existing", "c", None, None)
+    (store_path.parent / "branches.csv").write_text(
+        "name,commit_hash,issue_id,description\nfeature/x,aaa,ISS-1,x\nfeature/y,bbb,,\n"
+    )
+    (store_path.parent / "updates.json").write_text(json.dumps([{"id": 1, "status": "merged"}]))
+
+    runner = CliRunner()
+    result = runner.invoke(git_manager, ["import", "branches.csv"])
+    assert "Imported 2 branch(es)" in result.output
+    result = runner.invoke(git_manager, ["import", "updates.json"])
+    assert "updated 1 status(es)" in result.output
+
+    rows = git_utils.list_branches()
+    assert len(rows) == 3 and rows[0][5] == "merged"
+
+
+def test_import_rejects_bad_status(store_path):
+    (store_path.parent / "bad.json").write_text(json.dumps([{"id": 1, "status": "done"}]))
+    with pytest.raises(ValueError):
+        git_utils.read_branch_records(store_path.parent / "bad.json")
+
+
+@pytest.mark.parametrize("records, message", [
+    ([{"name": "ok"}, "feature/x"], "Record 2: expected an object, got str"),
+    ([{"id": 1, "status": 3}], "Record 1: 'status' must be a string"),
+    ([{"name": "feature/x", "status": ["open"]}], "Record 1: 'status' must be a string"),
+    ([{"id": "one", "status": "merged"}], "Record 1: 'id' must be an integer"),
+    ([{"id": 1.5, "status": "merged"}], "Record 1: 'id' must be an integer"),
+    ([{"id": True, "status": "merged"}], "Record 1: 'id' must be an integer"),
+    ([{"name": "feature/x", "issue_id": 42}], "Record 1: 'issue_id' must be a string"),
+    ([{"name": "feature/x", "commit_hash": ["abc"]}], "Record 1: 'commit_hash' must be a string"),
+    ([{"name": "feature/x", "description": {"text": "x"}}], "Record 1: 'description' must be a string"),
+    (42, "Expected a JSON object or a list of objects"),
+])
+def test_import_rejects_malformed_records(store_path, records, message):
+    path = store_path.parent / "bad.json"
+    path.write_text(json.dumps(records))
+    with pytest.raises(ValueError, match=message):
+        git_utils.read_branch_records(path)
+
+
+def test_import_command_reports_bad_fields(store_path):
+    (store_path.parent / "bad.json").write_text(json.dumps([{"name": "feature/x", "issue_id": 42}]))
+    result = CliRunner().invoke(git_manager, ["import", "bad.json"])
+    assert result.exception is None
+    assert "Invalid import file: Record 1: 'issue_id' must be a string" in result.output
+    assert git_utils.list_branches() == []
+
+    git_utils.add_branch("feature/a", "abc1234", "JIRA-1", "first")
+    (store_path.parent / "ok.json").write_text(json.dumps([{"id": " 1 ", "status": "merged"}]))
+    assert "updated 1 status(es)" in CliRunner().invoke(git_manager, ["import", "ok.json"]).output
+
+
+def test_list_filters_and_paging(store_path):
+    store = git_utils.get_store()
+    store.add_many([(f"feature/{i}", "c", f"ISS-{i % 3}", None) for i in range(10)] + [("fix/1", "c", None, None)])
+    store.update_status_many([(1, "merged"), (4, "merged")])
+
+    assert [b[0] for b in git_utils.list_branches(status="merged")] == [1, 4]
+    assert [b[0] for b in git_utils.list_branches(issue_id="ISS-0")] == [1, 4, 7, 10]
+    assert len(git_utils.list_branches(name_prefix="feature/")) == 10
+    assert [b[0] for b in git_utils.list_branches(limit=3, offset=2)] == [3, 4, 5]
+    assert [b[0] for b in git_utils.list_branches(after_id=8, limit=2)] == [9, 10]
+
+    top = chr(0x10FFFF)  # nothing sorts after it, so the prefix cannot be bumped
+    names = [f"x{top}", f"x{top}{top}a", "x\U0010fffe", "y", f"{top}z"]
+    store.add_many([(name, "c", None, None) for name in names])
+    assert [b[1] for b in git_utils.list_branches(name_prefix=f"x{top}")] == [f"x{top}", f"x{top}{top}a"]
+    assert [b[1] for b in git_utils.list_branches(name_prefix=f"x{top}{top}")] == [f"x{top}{top}a"]
+    assert [b[1] for b in git_utils.list_branches(name_prefix=top)] == [f"{top}z"]
+
+    plan = store.conn.execute("EXPLAIN QUERY PLAN SELECT * FROM branches WHERE status = 'open'").fetchall()
+    assert "idx_branches_status" in str(plan)
+
+
+def test_list_branches_json_format(store_path):
+    git_utils.add_branch("feature/a", "abc", None, "a\tb")
+    result = CliRunner().invoke(git_manager, ["list-branches", "--format", "json"])
+    assert json.loads(result.output)[0]["name"] == "feature/a"
+    result = CliRunner().invoke(git_manager, ["list-branches", "--format", "tsv"])
+    assert result.output.splitlines()[1] == "1\tfeature/a\tabc\t\ta b\topen"
+
+
+def test_sync_refs_from_repo(store_path, tmp_path):
+    import subprocess
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+
+    def git(*args):
+        subprocess.run(["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+                       check=True, capture_output=True)
+
+    git("init", "-q", "-b", "main")
+    git("commit", "-q", "--allow-empty", "-m", "init")
+    git("branch", "feature/a")
+
+    assert git_utils.get_store().sync_refs(git_utils.read_git_refs(repo)) == (2, 0, 0)
+
+    git("commit", "-q", "--allow-empty", "-m", "second")
+    git("branch", "feature/b")
+    refs = git_utils.read_git_refs(repo)
+    assert git_utils.get_store().sync_refs(refs) == (1, 1, 1)
+
+    rows = {b[1]: b[2] for b in git_utils.list_branches()}
+    assert rows == refs
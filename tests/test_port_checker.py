@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from jarvis.commands.port_checker import port_checker
+from jarvis.utils import probe_utils, snapshot_utils, system_utils, watch_utils
+
+
+@pytest.fixture
+def listener():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+def test_parse_ports():
+    assert probe_utils.parse_ports("80, 22,8000-8002,22") == [22, 80, 8000, 8001, 8002]
+    with pytest.raises(ValueError):
+        probe_utils.parse_ports("0-10")
+
+
+def test_probe_open_and_closed(listener, tmp_path, monkeypatch):
+    monkeypatch.setattr(probe_utils, "CACHE_FILE", tmp_path / "probe_cache.json")
+    free = socket.socket()
+    free.bind(("127.0.0.1", 0))
+    closed = free.getsockname()[1]
+    free.close()
+
+    results = probe_utils.probe([("127.0.0.1", listener), ("127.0.0.1", closed)])
+    assert results[("127.0.0.1", listener)].state == "open"
+    assert results[("127.0.0.1", closed)].state == "closed"
+
+    # a second probe within CACHE_TTL is answered from the cache
+    monkeypatch.setattr(probe_utils, "_probe_all", None)
+    assert probe_utils.is_open("127.0.0.1", listener)
+
+
+def test_scan_probes_fresh_unless_cached(listener, tmp_path, monkeypatch):
+    cache = tmp_path / "probe_cache.json"
+    monkeypatch.setattr(probe_utils, "CACHE_FILE", cache)
+    # a scan a few seconds ago, before the port was opened
+    cache.write_text(json.dumps({f"127.0.0.1:{listener}": ["closed", 0.001, time.time() - 5]}))
+
+    args = ["scan", "--ports", str(listener), "--all"]
+    result = CliRunner().invoke(port_checker, args)
+    assert "1 open" in result.output
+    result = CliRunner().invoke(port_checker, args + ["--cache"])
+    assert "closed" in result.output and "0 open" in result.output
+
+
+def test_check_ports_one_snapshot(listener, monkeypatch):
+    calls = []
+    take = snapshot_utils.take
+    monkeypatch.setattr(snapshot_utils, "take", lambda **kw: calls.append(1) or take(**kw))
+
+    usage = system_utils.check_ports([listener, 9])
+    assert calls == [1]
+    assert [p["pid"] for p in usage[listener]] == [os.getpid()]
+    assert usage[9] == []
+
+    result = CliRunner().invoke(port_checker, ["check", str(listener), "9"])
+    assert result.exit_code == 0
+    assert "in use" in result.output and "free" in result.output
+
+
+def test_list_ports_one_snapshot(listener, monkeypatch):
+    calls = []
+    take = snapshot_utils.take
+    monkeypatch.setattr(snapshot_utils, "take", lambda **kw: calls.append(kw) or take(**kw))
+
+    rows = system_utils.list_ports(listening=True)
+    assert calls == [{"sockets": True}]
+    mine = [r for r in rows if r["port"] == listener]
+    assert mine == [{"proto": "tcp", "address": "127.0.0.1", "port": listener, "state": "LISTEN",
+                     "pid": os.getpid(), "name": mine[0]["name"], "user": mine[0]["user"]}]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="/proc name truncation is Linux-only")
+def test_long_process_name(tmp_path):
+    name = "my-long-worker-process-name"
+    exe = tmp_path / name
+    shutil.copy(shutil.which("sleep"), exe)
+    proc = subprocess.Popen([str(exe), "30"])
+    try:
+        time.sleep(0.2)
+        assert [p["pid"] for p in system_utils.search_process_by_name(name)] == [proc.pid]
+        assert [p.pid for p in system_utils.find_processes(name=f"^{name}$")] == [proc.pid]
+        assert snapshot_utils.process_info(proc.pid)["name"] == name
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def listen(port):
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", port))
+    sock.listen()
+    return sock
+
+
+def test_port_watch_deltas():
+    port = free_port()
+    watch = watch_utils.PortWatch([port])
+    assert watch.in_use() == {} and watch.poll() == ([], [])
+
+    first = listen(port)
+    try:
+        opened, closed = watch.poll()
+        assert closed == []
+        assert [(e.port, owner["pid"]) for e, owner in opened] == [(port, os.getpid())]
+        assert [o["pid"] for o in watch.in_use()[port]] == [os.getpid()]
+        assert watch.poll() == ([], [])
+    finally:
+        first.close()
+
+    # a new socket on the same port between two polls is a different socket: one closed, one opened
+    second = listen(port)
+    try:
+        opened, closed = watch.poll()
+        assert [(e.port, o["pid"]) for e, o in closed] == [(port, os.getpid())]
+        assert [(e.port, o["pid"]) for e, o in opened] == [(port, os.getpid())]
+    finally:
+        second.close()
+    opened, closed = watch.poll()
+    assert opened == [] and [e.port for e, _ in closed] == [port]
+    assert watch.in_use() == {}
+
+
+def test_wait_until_free(listener):
+    assert not watch_utils.port_is_free(listener)
+    assert watch_utils.wait_until_free(listener, timeout=0.2, interval=0.05) is False
+
+    sock = listen(free_port())
+    port = sock.getsockname()[1]
+    threading.Timer(0.3, sock.close).start()
+    start = time.monotonic()
+    assert watch_utils.wait_until_free(port, timeout=5, interval=0.05) is True
+    assert 0.2 < time.monotonic() - start < 2
+    assert watch_utils.port_is_free(port)
+
+
+def test_check_until_free_exit_codes(listener, monkeypatch):
+    runner = CliRunner()
+    result = runner.invoke(port_checker, ["check", "--until-free", str(free_port())])
+    assert result.exit_code == 0 and "is free" in result.output
+
+    result = runner.invoke(port_checker, ["check", "--until-free", str(listener), "--timeout", "0.2",
+                                          "--interval", "0.05"])
+    assert result.exit_code == 1
+    assert f"Port {listener} is still in use after 0.2s" in result.output
+
+    result = runner.invoke(port_checker, ["check"])
+    assert result.exit_code == 2
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(watch_utils, "wait_until_free", interrupted)
+    result = runner.invoke(port_checker, ["check", "--until-free", str(listener)])
+    assert result.exit_code == 130
@@ -0,0 +1,174 @@
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+from click.testing import CliRunner
+
+from jarvis.commands import process_killer as process_killer_module
+from jarvis.commands.process_killer import process_killer
+from jarvis.utils import system_utils, watch_utils
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="spawns POSIX sleep/sh children")
+
+# Starts two plain `sleep` children and waits; argv[1] makes its command line unique to the test
+PARENT = "import subprocess, sys, time; [subprocess.Popen(['sleep', '300']) for _ in range(2)]; time.sleep(300)"
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "child processes did not start"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def spawn():
+    """spawn(*argv): a child that is killed (with its own children) at teardown"""
+    procs = []
+
+    def start(*argv):
+        proc = subprocess.Popen(list(argv))
+        procs.append(proc)
+        return proc
+
+    yield start
+    for proc in procs:
+        try:
+            for child in psutil.Process(proc.pid).children(recursive=True):
+                child.kill()
+        except psutil.NoSuchProcess:
+            pass
+        proc.kill()
+        proc.wait()
+
+
+@pytest.fixture
+def sleeper(tmp_path):
+    """A copy of sleep under tmp_path, so the tests' children are the only ones whose command line mentions it"""
+    exe = tmp_path / "jv-sleeper"
+    shutil.copy(shutil.which("sleep"), exe)
+    return str(exe)
+
+
+def start_sleepers(spawn, sleeper):
+    """One child that exits on SIGTERM and one that ignores it (SIG_IGN survives the exec)"""
+    polite = spawn(sleeper, "300")
+    stubborn = spawn("sh", "-c", f"trap '' TERM; exec {sleeper} 301")
+    wait_for(lambda: psutil.Process(stubborn.pid).cmdline()[:1] == [sleeper])
+    return polite, stubborn
+
+
+def test_terminate_escalates_to_sigkill(spawn, sleeper):
+    polite, stubborn = start_sleepers(spawn, sleeper)
+    procs = system_utils.find_processes(cmdline=re.escape(sleeper))
+    assert sorted(p.pid for p in procs) == sorted([polite.pid, stubborn.pid])
+
+    start = time.monotonic()
+    terminated, killed, failed = system_utils.terminate_processes(procs, timeout=0.5, kill_timeout=3)
+    assert [(p.pid, p.returncode) for p in terminated] == [(polite.pid, -signal.SIGTERM)]
+    assert [(p.pid, p.returncode) for p in killed] == [(stubborn.pid, -signal.SIGKILL)]
+    assert failed == []
+    assert time.monotonic() - start < 3  # one shared SIGTERM wait, not one per process
+
+
+def test_tree_includes_descendants(spawn, tmp_path):
+    parent = spawn(sys.executable, "-c", PARENT, str(tmp_path))
+    wait_for(lambda: len(psutil.Process(parent.pid).children()) == 2)
+    children = sorted(c.pid for c in psutil.Process(parent.pid).children())
+
+    token = re.escape(str(tmp_path))
+    assert [p.pid for p in system_utils.find_processes(cmdline=token)] == [parent.pid]
+    found = system_utils.find_processes(cmdline=token, tree=True)
+    assert sorted(p.pid for p in found) == sorted([parent.pid] + children)
+    assert {p.info["name"] for p in found if p.pid != parent.pid} == {"sleep"}
+
+
+def test_never_matches_self_or_ancestors():
+    me = psutil.Process()
+    protected = {me.pid} | {p.pid for p in me.parents()}
+    # everything this user runs, plus descendants: still not the test process or its parents
+    mine = system_utils.find_processes(user=me.username(), tree=True)
+    assert {p.pid for p in mine}.isdisjoint(protected)
+    pattern = "|".join(re.escape(p.name()) for p in [me] + me.parents())
+    assert {p.pid for p in system_utils.find_processes(name=pattern)}.isdisjoint(protected)
+
+
+def test_kill_matching_command(spawn, sleeper):
+    polite, stubborn = start_sleepers(spawn, sleeper)
+    runner = CliRunner()
+
+    result = runner.invoke(process_killer, ["kill-matching", "--cmdline", re.escape(sleeper), "--dry-run"])
+    assert "2 matching process(es)" in result.output
+    assert polite.poll() is None and stubborn.poll() is None
+
+    result = runner.invoke(process_killer, ["kill-matching", "--cmdline", re.escape(sleeper)], input="n\n")
+    assert "Stop 2 process(es)?" in result.output
+    assert polite.poll() is None and stubborn.poll() is None
+
+    result = runner.invoke(process_killer, ["kill-matching", "--cmdline", re.escape(sleeper),
+                                            "--timeout", "0.5", "-y"])
+    assert "1 exited after SIGTERM" in result.output
+    assert "1 killed with SIGKILL" in result.output
+    assert "could not be stopped" not in result.output
+    assert not psutil.pid_exists(polite.pid) and not psutil.pid_exists(stubborn.pid)
+
+
+def test_kill_matching_rejects_bad_input():
+    runner = CliRunner()
+    result = runner.invoke(process_killer, ["kill-matching", "--name", "(unclosed", "-y"])
+    assert result.exit_code == 0 and "Invalid regex" in result.output
+    result = runner.invoke(process_killer, ["kill-matching", "-y"])
+    assert "Give at least one filter" in result.output
+    result = runner.invoke(process_killer, ["kill-matching", "--cmdline", "no-such-process-" + os.urandom(4).hex()])
+    assert "No matching processes." in result.output
+
+
+def test_process_watch_deltas(spawn, sleeper):
+    watch = watch_utils.ProcessWatch(match=lambda info: info["name"] == "jv-sleeper")
+    assert watch.known == {} and watch.poll() == ([], [])
+
+    child = spawn(sleeper, "300")
+    other = spawn("sleep", "300")  # not matched: never reported
+    wait_for(lambda: psutil.Process(child.pid).name() == "jv-sleeper")
+    started, exited = watch.poll()
+    assert [(i["pid"], i["name"]) for i in started] == [(child.pid, "jv-sleeper")] and exited == []
+    assert watch.poll() == ([], [])
+
+    child.kill()
+    child.wait()
+    other.kill()
+    other.wait()
+    started, exited = watch.poll()
+    assert started == [] and [i["pid"] for i in exited] == [child.pid]
+    assert watch.known == {}
+
+
+def test_search_name_watch_command(spawn, sleeper, monkeypatch):
+    children = []
+    real_sleep = time.sleep  # the module is shared: patching process_killer's time patches ours too
+
+    def tick(seconds):
+        # one watch interval per call: start the child, stop it, then Ctrl+C
+        if not children:
+            children.append(spawn(sleeper, "300"))
+            while psutil.Process(children[0].pid).name() != "jv-sleeper":
+                real_sleep(0.02)
+        elif children[0].poll() is None:
+            children[0].kill()
+            children[0].wait()
+        else:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(process_killer_module.time, "sleep", tick)
+    result = CliRunner().invoke(process_killer, ["search-name", "jv-sleeper", "--watch", "--interval", "0.05"])
+    assert result.exit_code == 0
+    pid = children[0].pid
+    assert "none yet" in result.output
+    assert f"+ started {pid} jv-sleeper" in result.output
+    assert f"- exited  {pid} jv-sleeper" in result.output
@@ -0,0 +1,177 @@
+import io
+import os
+from collections import namedtuple
+
+import psutil
+import pytest
+from click.testing import CliRunner
+from rich.console import Console
+
+from jarvis.commands.system_monitor import Dashboard, system_monitor
+from jarvis.utils import metrics_utils, monitor_utils
+
+START = 1700000000.0
+ROWS = metrics_utils.BLOCK_ROWS
+
+
+def sample(i):
+    return monitor_utils.Sample(START + i, float(i % 100), 1000 * i, 10 ** 9, 5000 + i, 10 ** 10,
+                                10 * i, 20 * i, 1.5, 2.5)
+
+
+def record(path, rows, first=0, **kwargs):
+    writer = metrics_utils.MetricsWriter(str(path), 1.0, **kwargs)
+    for i in range(first, first + rows):
+        writer.append(sample(i))
+    writer.close()
+    return writer
+
+
+def render(dashboard):
+    out = io.StringIO()
+    Console(file=out, width=160, height=50).print(dashboard.layout)
+    return out.getvalue()
+
+
+def test_collector_rates_and_slow_disk_reads(monkeypatch):
+    Net = namedtuple("Net", "bytes_sent bytes_recv")
+    counters = iter([Net(1000, 5000), Net(3000, 5000), Net(2000, 9000)])
+    clock = iter([100.0, 102.0, 104.0])
+    disk_reads = []
+    real_disk_usage = psutil.disk_usage
+    monkeypatch.setattr(psutil, "net_io_counters", lambda: next(counters))
+    monkeypatch.setattr(psutil, "disk_usage", lambda path: disk_reads.append(path) or real_disk_usage(path))
+    monkeypatch.setattr(monitor_utils.time, "monotonic", lambda: next(clock))
+
+    collector = monitor_utils.Collector(slow_every=3.0)
+    first = collector.sample()
+    assert (first.net_sent_rate, first.net_recv_rate) == (1000.0, 0.0)
+    second = collector.sample()
+    assert (second.net_sent_rate, second.net_recv_rate) == (0.0, 2000.0)  # counters that go backwards give 0
+    assert disk_reads == ["/"]  # filesystem usage is re-read every slow_every seconds only
+    assert second.disk_total == first.disk_total > 0
+
+
+def test_dashboard_updates_in_place():
+    dashboard = Dashboard()
+    layout = dashboard.layout
+    dashboard.update(sample(42), overhead=0.4, max_overhead=1.0)
+    assert dashboard.layout is layout
+    text = render(dashboard)
+    assert "42.0/100.0 %" in text
+    assert "monitor overhead: 0.4% CPU (limit 1.0%)" in text
+
+
+def test_rates_per_device():
+    Disk = namedtuple("Disk", "read_bytes write_bytes")
+    before = {"sda": Disk(0, 100), "sdb": Disk(50, 50)}
+    after = {"sda": Disk(4096, 100), "sdc": Disk(1, 1)}
+    # devices missing from either snapshot are left out
+    assert monitor_utils._rates(before, after, 2.0, ("read_bytes", "write_bytes")) == {"sda": (2048.0, 0.0)}
+    assert monitor_utils._rates(before, after, 0.0, ("read_bytes",)) == {}
+
+
+def test_collector_detail_views():
+    collector = monitor_utils.Collector(percpu=True, disks=True, nics=True)
+    s = collector.sample()
+    assert len(s.percpu) == psutil.cpu_count()
+    assert s.cpu == pytest.approx(sum(s.percpu) / len(s.percpu))
+    assert not any(name.startswith(monitor_utils.SKIP_DISKS) for name in s.disks)
+    assert set(s.nics) <= set(psutil.net_io_counters(pernic=True))
+    assert all(isinstance(n, monitor_utils.NicRate) for n in s.nics.values())
+    assert monitor_utils.Collector().sample().percpu is None
+
+
+def test_process_sampler_top_by_rss():
+    sampler = monitor_utils.ProcessSampler(n=3, sort="rss")
+    rows = sampler.sample()
+    assert 0 < len(rows) <= 3
+    assert [r.rss for r in rows] == sorted((r.rss for r in rows), reverse=True)
+    me = monitor_utils.ProcessSampler(n=10 ** 6, sort="rss").sample()
+    assert os.getpid() in [r.pid for r in me]
+    # names are cached between ticks
+    sampler.sample()
+    assert set(r.pid for r in rows) & set(sampler._labels)
+
+
+def test_dashboard_detail_panels():
+    dashboard = Dashboard(cores=2, disks=True, nics=True, top=2)
+    s = sample(1)._replace(
+        percpu=[12.5, 87.5],
+        disks={"sda": monitor_utils.DiskRate(10, 20, 4096, 8192)},
+        nics={"eth0": monitor_utils.NicRate(100, 200), "lo": monitor_utils.NicRate(1, 1)},
+    )
+    procs = [monitor_utils.ProcRow(1, "init", "root", 0.5, 2048)]
+    dashboard.update(s, procs=procs)
+    assert dashboard.nics.rows[0][0] == "eth0"  # busiest interface first
+    text = render(dashboard)
+    for expected in ("87.5 %", "sda", "4.0 KB/s", "eth0", "init", "Top 2 by CPU"):
+        assert expected in text
+
+
+def test_round_trip_and_window(tmp_path):
+    path = tmp_path / "metrics.bin"
+    record(path, ROWS * 2 + 100)
+
+    series = metrics_utils.read_series(str(path))
+    cols = series.columns
+    assert len(cols["ts"]) == ROWS * 2 + 100
+    assert (series.meta["mem_total"], series.meta["interval"]) == (10 ** 9, 1.0)
+    assert list(cols["mem_used"][:3]) == [0, 1000, 2000]
+    assert cols["net_recv"][-1] == 20 * (ROWS * 2 + 99)
+    assert metrics_utils.last_timestamp(str(path)) == START + ROWS * 2 + 99
+
+    # a window cutting through blocks keeps exactly the samples inside it
+    window = metrics_utils.read_series(str(path), since=START + 500, until=START + 599)
+    assert list(window.columns["ts"]) == [START + i for i in range(500, 600)]
+
+    stats = metrics_utils.summarize(window)
+    assert (stats["cpu"]["min"], stats["cpu"]["max"], stats["cpu"]["avg"]) == (0.0, 99.0, 49.5)
+    assert (stats["cpu"]["p95"], stats["cpu"]["p99"]) == (94.0, 98.0)
+    assert stats["net_sent_rate"]["max"] == 1.5
+
+
+def test_torn_block_is_dropped_on_append(tmp_path):
+    path = tmp_path / "metrics.bin"
+    record(path, 10)
+    with open(path, "ab") as f:
+        f.write(metrics_utils.BLOCK_MAGIC + b"\x05\x00")  # a writer killed mid-block
+    assert len(metrics_utils.read_series(str(path)).columns["ts"]) == 10
+
+    record(path, 5, first=10)
+    assert list(metrics_utils.read_series(str(path)).columns["ts"]) == [START + i for i in range(15)]
+
+
+def test_rotation_keeps_newest_files(tmp_path):
+    path = tmp_path / "metrics.bin"
+    # every full block goes past max_size, so each one ends up in its own rotated file
+    record(path, ROWS * 4 + 10, max_size=ROWS * 40, keep=2)
+
+    assert metrics_utils.rotated_files(str(path)) == [f"{path}.2", f"{path}.1", str(path)]
+    assert not os.path.exists(f"{path}.3")
+    ts = metrics_utils.read_series(str(path)).columns["ts"]
+    assert list(ts) == [START + i for i in range(ROWS * 2, ROWS * 4 + 10)]
+    assert len(metrics_utils.read_series(str(path), rotated=False).columns["ts"]) == 10
+    assert metrics_utils.last_timestamp(str(path)) == START + ROWS * 4 + 9
+
+
+def test_summarize_command(tmp_path):
+    path = tmp_path / "metrics.bin"
+    record(path, 200)
+    result = CliRunner().invoke(system_monitor, ["summarize", str(path)])
+    assert result.exit_code == 0
+    assert "200 samples" in result.output
+    assert "CPU %" in result.output and "Net received" in result.output
+
+    result = CliRunner().invoke(system_monitor, ["summarize", str(path), "--last", "10s"])
+    assert "11 samples" in result.output
+
+
+def test_live_help_text():
+    result = CliRunner().invoke(system_monitor, ["live", "--help"])
+    assert "CPU% the monitor itself may use" in result.output
+
+
+@pytest.mark.parametrize("text, seconds", [("90", 90), ("90s", 90), ("5m", 300), ("1.5h", 5400), ("1d", 86400)])
+def test_parse_duration(text, seconds):
+    assert metrics_utils.parse_duration(text) == seconds